@@ -0,0 +1,89 @@
+"""Vazão de rajadas de transformações sobre uma mesma original: um task por
+job (cada um decodifica a original) contra um task agrupado pelo
+``TransformCoalescer`` (uma decodificação para todos).
+
+O cache de originais decodificadas fica desligado para medir só o efeito
+do agrupamento.
+
+Uso: python benchmarks/bench_coalesce.py --width 4000 --height 3000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image as PILImage
+
+from image_processing_service.settings import settings
+from image_processing_service.tasks import (
+    transform_stored_group,
+    transform_stored_image,
+)
+
+BURSTS = (1, 5, 10, 20, 40)
+
+
+def burst_jobs(size: int) -> list[dict]:
+    # Mistura típica: miniaturas, recortes e filtros sobre a mesma foto
+    variants = [
+        {'resize': {'width': 320, 'height': 240}},
+        {'resize': {'width': 1024, 'height': 768}, 'rotate': 90},
+        {
+            'resize': {'width': 800, 'height': 600},
+            'filters': {'grayscale': True},
+        },
+        {
+            'resize': {'width': 640, 'height': 480},
+            'crop': {'x': 0, 'y': 0, 'width': 320, 'height': 320},
+        },
+    ]
+    return [
+        {
+            'new_image_key': f'out/{index}.jpeg',
+            'transformations': {**variants[index % len(variants)]},
+        }
+        for index in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.UPLOAD_DIR = Path(directory)
+        settings.DECODED_CACHE_BYTES = 0
+        original = os.path.join(directory, 'original.jpeg')
+        PILImage.effect_mandelbrot(
+            (args.width, args.height), (-2, -1.5, 1, 1.5), 100
+        ).convert('RGB').save(original, quality=90)
+
+        print(
+            f'{"rajada":>6} {"um por job":>12} {"agrupado":>12} {"ganho":>7}'
+        )
+        for size in BURSTS:
+            jobs = burst_jobs(size)
+
+            start = time.perf_counter()
+            for job in jobs:
+                transform_stored_image(
+                    original, job['new_image_key'], job['transformations']
+                )
+            separate = time.perf_counter() - start
+
+            start = time.perf_counter()
+            transform_stored_group(original, jobs)
+            grouped = time.perf_counter() - start
+
+            print(
+                f'{size:>6} {size / separate:8.1f}/s   '
+                f'{size / grouped:8.1f}/s   {separate / grouped:5.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
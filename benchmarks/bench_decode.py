@@ -0,0 +1,123 @@
+"""Tempo de decodificação + resize e pico de memória por estratégia e
+escala.
+
+Cada medição roda em um subprocesso próprio. O ``ru_maxrss`` passa pelo
+fork+exec, então o filho zera o pico (``/proc/self/clear_refs``, Linux)
+e mede o crescimento do ``VmHWM`` sobre o RSS de partida; a imagem de
+origem também é gerada em outro processo. Só roda no Linux.
+
+Uso: python benchmarks/bench_decode.py --width 6000 --height 4000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image as PILImage
+
+from image_processing_service.processing.decode import (
+    STRATEGIES,
+    open_planned,
+)
+
+SCALES = (1, 2, 4, 8, 16)
+
+
+def _status_kb(field: str) -> int:
+    with open('/proc/self/status', encoding='ascii') as status:
+        for line in status:
+            if line.startswith(f'{field}:'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def reset_peak_rss() -> int:
+    """Zera o pico de RSS do processo e devolve o RSS atual, em KiB."""
+    with open('/proc/self/clear_refs', 'w', encoding='ascii') as clear:
+        clear.write('5')
+    return _status_kb('VmRSS')
+
+
+def make_source(path: str, width: int, height: int) -> None:
+    PILImage.effect_mandelbrot(
+        (width, height), (-2, -1.5, 1, 1.5), 100
+    ).convert('RGB').save(path, quality=90)
+
+
+def child(path: str, width: int, height: int, strategy: str) -> None:
+    baseline = reset_peak_rss()
+    start = time.perf_counter()
+    pil_image, plan = open_planned(
+        path, {'resize': {'width': width, 'height': height}}, strategy
+    )
+    plan.execute(pil_image)
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps({
+            'seconds': elapsed,
+            'decoded': plan.source_size,
+            'peak_mb': (_status_kb('VmHWM') - baseline) / 1024,
+        })
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--child', nargs=4)
+    parser.add_argument('--source', nargs=3)
+    args = parser.parse_args()
+
+    if args.child:
+        path, width, height, strategy = args.child
+        child(path, int(width), int(height), strategy)
+        return
+    if args.source:
+        path, width, height = args.source
+        make_source(path, int(width), int(height))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'source.jpg')
+        # Em outro processo: gerar a origem não infla o processo pai
+        subprocess.check_call([
+            sys.executable,
+            __file__,
+            '--source',
+            path,
+            str(args.width),
+            str(args.height),
+        ])
+
+        print(
+            f'{"escala":>6} {"estratégia":>10} {"decodificado":>13} '
+            f'{"tempo":>9} {"pico":>10}'
+        )
+        for scale in SCALES:
+            width, height = args.width // scale, args.height // scale
+            for strategy in STRATEGIES:
+                output = subprocess.check_output([
+                    sys.executable,
+                    __file__,
+                    '--child',
+                    path,
+                    str(width),
+                    str(height),
+                    strategy,
+                ])
+                result = json.loads(output)
+                decoded = 'x'.join(str(v) for v in result['decoded'])
+                print(
+                    f'{"1/" + str(scale):>6} {strategy:>10} {decoded:>13} '
+                    f'{result["seconds"] * 1000:7.0f}ms '
+                    f'{result["peak_mb"]:8.0f}MB'
+                )
+
+
+if __name__ == '__main__':
+    main()
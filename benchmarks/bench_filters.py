@@ -0,0 +1,74 @@
+"""Custo por megapixel do sepia antigo (loop por pixel) e da matriz fundida.
+
+Uso: python benchmarks/bench_filters.py --megapixels 2
+"""
+
+import argparse
+import time
+
+from PIL import Image as PILImage
+
+from image_processing_service.processing.filters import apply_filters
+
+
+def legacy_sepia(image: PILImage.Image) -> PILImage.Image:
+    sepia = PILImage.new('RGB', image.size)
+    pixels = image.convert('RGB').load()
+    for y in range(image.size[1]):
+        for x in range(image.size[0]):
+            r, g, b = pixels[x, y]
+            tr = int(0.393 * r + 0.769 * g + 0.189 * b)
+            tg = int(0.349 * r + 0.686 * g + 0.168 * b)
+            tb = int(0.272 * r + 0.534 * g + 0.131 * b)
+            sepia.putpixel((x, y), (min(tr, 255), min(tg, 255), min(tb, 255)))
+    return sepia
+
+
+def measure(label: str, func, image: PILImage.Image, repeat: int) -> None:
+    megapixels = image.width * image.height / 1_000_000
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(image)
+        best = min(best, time.perf_counter() - start)
+    print(f'{label:<32} {best * 1000 / megapixels:10.2f} ms/MP')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--megapixels', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    side = int((args.megapixels * 1_000_000) ** 0.5)
+    image = PILImage.effect_mandelbrot(
+        (side, side), (-2, -1.5, 1, 1.5), 100
+    ).convert('RGB')
+
+    if not args.skip_legacy:
+        measure('sepia (loop por pixel)', legacy_sepia, image, 1)
+    measure(
+        'sepia (matriz)',
+        lambda im: apply_filters(im, {'sepia': True}),
+        image,
+        args.repeat,
+    )
+    measure(
+        'grayscale+sepia+contraste+tint',
+        lambda im: apply_filters(
+            im,
+            {
+                'grayscale': True,
+                'sepia': True,
+                'contrast': 1.2,
+                'tint': {'color': '#3366ff', 'strength': 0.2},
+            },
+        ),
+        image,
+        args.repeat,
+    )
+
+
+if __name__ == '__main__':
+    main()
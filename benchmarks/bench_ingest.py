@@ -0,0 +1,91 @@
+"""Vazão da gravação de uploads grandes no UPLOAD_DIR.
+
+Compara a cópia antiga (``UploadFile.read`` em chunks de 1MB + aiofiles),
+sem e com SHA-256 no laço, com ``utils.files.ingest_upload``, que copia
+dentro do kernel e calcula o SHA-256 na mesma ida à thread. A origem é
+um SpooledTemporaryFile já em disco, como o Starlette entrega corpos
+grandes.
+
+Uso: python benchmarks/bench_ingest.py --megabytes 100 --rounds 5
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import aiofiles
+from starlette.datastructures import UploadFile
+
+from image_processing_service.utils.files import ingest_upload
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def chunked_copy(source: tempfile.SpooledTemporaryFile, path: str):
+    upload = UploadFile(source)
+    await upload.seek(0)
+    async with aiofiles.open(path, 'wb') as buffer:
+        while chunk := await upload.read(CHUNK_SIZE):
+            await buffer.write(chunk)
+
+
+async def chunked_sha256(source: tempfile.SpooledTemporaryFile, path: str):
+    digest = hashlib.sha256()
+    upload = UploadFile(source)
+    await upload.seek(0)
+    async with aiofiles.open(path, 'wb') as buffer:
+        while chunk := await upload.read(CHUNK_SIZE):
+            digest.update(chunk)
+            await buffer.write(chunk)
+
+
+async def zero_copy(source: tempfile.SpooledTemporaryFile, path: str):
+    await asyncio.to_thread(ingest_upload, source, path, sys.maxsize)
+
+
+async def measure(copy, source, directory: str, rounds: int) -> list[float]:
+    timings = []
+    for index in range(rounds):
+        path = os.path.join(directory, f'{copy.__name__}-{index}.bin')
+        start = time.perf_counter()
+        await copy(source, path)
+        timings.append(time.perf_counter() - start)
+        os.remove(path)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--megabytes', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument(
+        '--dir', help='destino (outro fs testa o fallback do sendfile)'
+    )
+    args = parser.parse_args()
+
+    size = args.megabytes * 1024 * 1024
+    with (
+        tempfile.TemporaryDirectory(dir=args.dir) as directory,
+        tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE) as source,
+    ):
+        for _ in range(args.megabytes):
+            source.write(os.urandom(CHUNK_SIZE))
+        source.flush()
+
+        print(f'{"cópia":>14} {"mediana":>9} {"vazão":>12}')
+        for copy in (chunked_copy, chunked_sha256, zero_copy):
+            timings = await measure(copy, source, directory, args.rounds)
+            median = statistics.median(timings)
+            print(
+                f'{copy.__name__:>14} {median * 1000:7.0f}ms '
+                f'{size / median / 1024 / 1024:8.0f}MB/s'
+            )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
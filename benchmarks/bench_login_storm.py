@@ -0,0 +1,123 @@
+"""Latência de um endpoint qualquer durante uma rajada de logins.
+
+Compara o Argon2 rodando dentro do event loop (comportamento antigo) com o
+pool limitado de ``utils.hashing``. Tudo roda em um único event loop, como
+um worker do uvicorn.
+
+Uso: python benchmarks/bench_login_storm.py --logins 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from image_processing_service.database import get_session
+from image_processing_service.main import app
+from image_processing_service.models import User, table_registry
+from image_processing_service.routers import auth_router
+from image_processing_service.utils.hashing import (
+    get_password_hash,
+    verify_password,
+    verify_password_async,
+)
+
+PROBE_INTERVAL = 0.01
+
+
+async def verify_password_inline(plain_password, hashed_password):
+    return verify_password(plain_password, hashed_password)
+
+
+async def storm(
+    client: httpx.AsyncClient, logins: int
+) -> tuple[list[float], list[int]]:
+    latencies = []
+    statuses = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get('/')
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    async def login():
+        response = await client.post(
+            '/login', data={'username': 'bench', 'password': 'password'}
+        )
+        statuses.append(response.status_code)
+
+    probing = asyncio.create_task(probe())
+    await asyncio.gather(*(login() for _ in range(logins)))
+    done.set()
+    await probing
+    return latencies, statuses
+
+
+async def run(url: str, logins: int) -> None:
+    engine = create_async_engine(url)
+
+    async def session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        print(
+            f'{"modo":>8} {"p50":>9} {"p99":>9} {"máx":>9} {"total":>8} '
+            f'{"503":>5}'
+        )
+        for mode, verify in (
+            ('inline', verify_password_inline),
+            ('pool', verify_password_async),
+        ):
+            auth_router.verify_password_async = verify
+            start = time.perf_counter()
+            latencies, statuses = await storm(client, logins)
+            total = time.perf_counter() - start
+            quantiles = statistics.quantiles(
+                latencies, n=100, method='inclusive'
+            )
+            print(
+                f'{mode:>8} {quantiles[49] * 1000:7.1f}ms '
+                f'{quantiles[98] * 1000:7.1f}ms '
+                f'{max(latencies) * 1000:7.1f}ms {total:7.2f}s '
+                f'{statuses.count(503):>5}'
+            )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        engine = create_engine(f'sqlite:///{path}')
+        table_registry.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                User.__table__.insert(),
+                {
+                    'username': 'bench',
+                    'password': get_password_hash('password'),
+                },
+            )
+        engine.dispose()
+        asyncio.run(run(f'sqlite+aiosqlite:///{path}', args.logins))
+
+
+if __name__ == '__main__':
+    main()
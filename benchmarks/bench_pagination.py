@@ -0,0 +1,110 @@
+"""Latência de GET /images por profundidade: OFFSET x cursor.
+
+Cria um SQLite temporário com ``--rows`` imagens de um mesmo usuário e mede
+``ImageService.get_images_for_user`` em páginas cada vez mais fundas.
+
+Uso: python benchmarks/bench_pagination.py --rows 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from image_processing_service.models import Image, User, table_registry
+from image_processing_service.services.image_service import (
+    ImageService,
+    encode_cursor,
+)
+
+LIMIT = 20
+DEPTHS = (1, 10, 100, 1_000, 10_000, 50_000)
+REPEAT = 5
+CHUNK = 50_000
+
+
+def populate(url: str, rows: int) -> None:
+    engine = create_engine(url)
+    table_registry.metadata.create_all(engine)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User), [{'id': 1, 'username': 'bench', 'password': '-'}]
+        )
+        for offset in range(0, rows, CHUNK):
+            # Três imagens por segundo: muitos empates em uploaded_at
+            connection.execute(
+                insert(Image),
+                [
+                    {
+                        'filename': f'{i}.png',
+                        'url': f'{i}.png',
+                        'user_id': 1,
+                        'uploaded_at': start + timedelta(seconds=i // 3),
+                    }
+                    for i in range(offset, min(offset + CHUNK, rows))
+                ],
+            )
+    engine.dispose()
+
+
+async def timed(coroutine_factory) -> float:
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        await coroutine_factory()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def measure(url: str, rows: int) -> None:
+    engine = create_async_engine(url)
+    async with AsyncSession(engine) as session:
+        service = ImageService(session)
+        print(f'{"página":>8} {"offset":>10} {"cursor":>10}')
+        for page in DEPTHS:
+            if (page - 1) * LIMIT >= rows:
+                break
+
+            # Cursor da última imagem da página anterior (fora da medição)
+            after = None
+            if page > 1:
+                result = await session.execute(
+                    select(Image)
+                    .order_by(Image.uploaded_at.desc(), Image.id.desc())
+                    .offset((page - 1) * LIMIT - 1)
+                    .limit(1)
+                )
+                after = encode_cursor(result.scalar_one())
+
+            offset_seconds = await timed(
+                lambda: service.get_images_for_user(1, page, LIMIT)
+            )
+            cursor_seconds = await timed(
+                lambda: service.get_images_for_user(1, 1, LIMIT, after=after)
+            )
+            print(
+                f'{page:>8} {offset_seconds * 1000:8.2f}ms '
+                f'{cursor_seconds * 1000:8.2f}ms'
+            )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        populate(f'sqlite:///{path}', args.rows)
+        asyncio.run(measure(f'sqlite+aiosqlite:///{path}', args.rows))
+
+
+if __name__ == '__main__':
+    main()
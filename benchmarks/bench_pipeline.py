@@ -0,0 +1,132 @@
+"""Pipeline completo (upload -> lote -> worker -> status) sem broker.
+
+Força ``TASK_EXECUTOR=local`` e um SQLite temporário, então não precisa de
+RabbitMQ nem de worker do Celery rodando.
+
+Uso: python benchmarks/bench_pipeline.py --images 40 --workers 4
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Os processos do executor (spawn) reimportam este módulo: herdam o
+# diretório do processo principal pelo ambiente
+DIRECTORY = os.environ.get('BENCH_PIPELINE_DIR') or tempfile.mkdtemp(
+    prefix='bench-pipeline-'
+)
+os.environ['BENCH_PIPELINE_DIR'] = DIRECTORY
+DATABASE = os.path.join(DIRECTORY, 'bench.db')
+os.environ.update({
+    'TASK_EXECUTOR': 'local',
+    'DATABASE_URL': f'sqlite+aiosqlite:///{DATABASE}',
+    'WORKER_DATABASE_URL': f'sqlite:///{DATABASE}',
+    'UPLOAD_DIR': DIRECTORY,
+})
+if '--workers' in sys.argv:
+    os.environ['LOCAL_EXECUTOR_WORKERS'] = sys.argv[
+        sys.argv.index('--workers') + 1
+    ]
+
+import httpx  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from image_processing_service.executor import task_executor  # noqa: E402
+from image_processing_service.main import app  # noqa: E402
+from image_processing_service.models import table_registry  # noqa: E402
+
+POLL_INTERVAL = 0.05
+
+
+def make_image(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.effect_mandelbrot(
+        (width, height), (-2, -1.5, 1, 1.5), 100
+    ).convert('RGB').save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+async def run(images: int, width: int, height: int) -> None:
+    content = make_image(width, height)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        response = await client.post(
+            '/register', json={'username': 'bench', 'password': 'password'}
+        )
+        headers = {
+            'Authorization': f'Bearer {response.json()["access_token"]}'
+        }
+
+        start = time.perf_counter()
+        image_ids = []
+        for index in range(images):
+            response = await client.post(
+                '/images',
+                files={'file': (f'{index}.jpg', content, 'image/jpeg')},
+                headers=headers,
+            )
+            image_ids.append(response.json()['id'])
+        uploaded = time.perf_counter()
+
+        response = await client.post(
+            '/images/transform:batch',
+            json={
+                'image_ids': image_ids,
+                'transformations': {
+                    'resize': {'width': width // 4, 'height': height // 4},
+                    'filters': {'sepia': True},
+                    'format': 'webp',
+                },
+            },
+            headers=headers,
+        )
+        batch_id = response.json()['id']
+        while True:
+            response = await client.get(
+                f'/images/batches/{batch_id}', headers=headers
+            )
+            progress = response.json()['progress']
+            finished = progress.get('succeeded', 0) + progress.get('failed', 0)
+            if finished == images:
+                break
+            await asyncio.sleep(POLL_INTERVAL)
+        done = time.perf_counter()
+
+    print(f'upload:      {uploaded - start:6.2f}s')
+    print(
+        f'processing:  {done - uploaded:6.2f}s '
+        f'({images / (done - uploaded):.1f} imagens/s, '
+        f'{task_executor.workers} processos)'
+    )
+    print(f'status:      {progress}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=40)
+    parser.add_argument('--width', type=int, default=3000)
+    parser.add_argument('--height', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    engine = create_engine(f'sqlite:///{DATABASE}')
+    table_registry.metadata.create_all(engine)
+    engine.dispose()
+
+    try:
+        asyncio.run(run(args.images, args.width, args.height))
+    finally:
+        task_executor.shutdown()
+        shutil.rmtree(DIRECTORY)
+
+
+if __name__ == '__main__':
+    main()
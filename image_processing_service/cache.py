@@ -0,0 +1,153 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+from image_processing_service.metrics import metrics
+from image_processing_service.processing.decode import image_nbytes
+from image_processing_service.settings import settings
+
+
+class TTLCache:
+    """LRU com expiração por entrada, em memória e por processo.
+
+    Cada worker do uvicorn tem a sua cópia: uma invalidação só vale no
+    processo que a fez, então o TTL é o limite de quanto tempo os outros
+    podem servir um valor antigo. Acertos e falhas vão para as métricas
+    ``<name>_hits`` e ``<name>_misses``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self._clock():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                metrics.increment(f'{self.name}_misses')
+                return None
+
+            self._entries.move_to_end(key)
+            metrics.increment(f'{self.name}_hits')
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SizedLRUCache:
+    """LRU limitado pela soma dos tamanhos das entradas (``sizeof``), não
+    pela quantidade.
+
+    Feito para os workers: uma entrada maior que o orçamento inteiro nem
+    é guardada. Acertos e falhas vão para as mesmas métricas do
+    ``TTLCache``; ``stats`` resume o estado deste processo.
+    """
+
+    def __init__(
+        self, name: str, max_bytes: int, sizeof: Callable[[Any], int]
+    ):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.increment(f'{self.name}_misses')
+                return None
+
+            self._entries.move_to_end(key)
+            metrics.increment(f'{self.name}_hits')
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        hits = metrics.get(f'{self.name}_hits')
+        misses = metrics.get(f'{self.name}_misses')
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Token -> username já validado (nunca além do exp do token)
+token_cache = TTLCache(
+    'token_cache', settings.TOKEN_CACHE_SIZE, settings.USER_CACHE_TTL
+)
+# Username -> User carregado do banco
+user_cache = TTLCache(
+    'user_cache', settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL
+)
+# (chave, versão do arquivo) -> original decodificada, nos workers
+decoded_image_cache = SizedLRUCache(
+    'decoded_image_cache', settings.DECODED_CACHE_BYTES, image_nbytes
+)
@@ -1,5 +1,9 @@
 from celery import Celery
+from celery.signals import worker_init
+from celery.worker.control import inspect_command
 
+from image_processing_service.cache import decoded_image_cache
+from image_processing_service.memory import memory_budget
 from image_processing_service.settings import settings
 
 celery_app = Celery(
@@ -12,6 +16,29 @@ celery_app.conf.update(
     task_serializer='json',
     accept_content=['json'],
     timezone='UTC',
+    worker_max_tasks_per_child=settings.WORKER_MAX_TASKS_PER_CHILD or None,
+    worker_max_memory_per_child=settings.WORKER_MAX_MEMORY_PER_CHILD or None,
 )
 
 celery_app.autodiscover_tasks(['image_processing_service.tasks'])
+
+
+@worker_init.connect
+def enable_memory_budget(**kwargs):
+    # No processo principal, antes do fork: os filhos do prefork dividem o
+    # orçamento
+    memory_budget.enable(settings.WORKER_MEMORY_BUDGET)
+
+
+@inspect_command()
+def decoded_cache(state):
+    """Acertos e bytes do cache de originais decodificadas do worker:
+    ``celery -A image_processing_service.celery inspect decoded_cache``."""
+    return decoded_image_cache.stats()
+
+
+@inspect_command()
+def memory(state):
+    """Orçamento de memória dos tasks do worker: limite, bytes reservados,
+    uso, pico e tasks devolvidos à fila (``inspect memory``)."""
+    return memory_budget.stats()
@@ -1,12 +1,34 @@
 from typing import AsyncGenerator
 
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 
 from image_processing_service.settings import settings
 
 engine = create_async_engine(settings.DATABASE_URL)
 
 
+def sync_database_url(database_url: str) -> str:
+    """A mesma URL com o driver síncrono padrão do dialeto
+    (``sqlite+aiosqlite`` vira ``sqlite``)."""
+    url = make_url(database_url)
+    return url.set(drivername=url.get_backend_name()).render_as_string(
+        hide_password=False
+    )
+
+
+# O worker do Celery é síncrono: usa uma engine própria (conecta no 1º uso)
+# no mesmo banco da API, a menos que WORKER_DATABASE_URL diga outro
+WorkerSession = sessionmaker(
+    create_engine(
+        settings.WORKER_DATABASE_URL
+        or sync_database_url(settings.DATABASE_URL)
+    ),
+    expire_on_commit=False,
+)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
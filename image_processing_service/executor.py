@@ -0,0 +1,168 @@
+"""Para onde vão os tasks do worker.
+
+``celery`` publica no broker (comportamento original). ``local`` roda a
+mesma função de task em um ``ProcessPoolExecutor`` dentro do processo da
+API, sem broker: o status continua sendo gravado pelo próprio task via
+``WorkerSession``, então a API não sabe a diferença.
+
+Transformações baratas nem chegam aqui: rodam em ``inline_pool``, dentro
+da própria requisição.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from importlib import import_module
+from threading import Lock
+from typing import Iterable
+
+from celery import Task
+
+from image_processing_service.routing import transform_queue
+from image_processing_service.services.exceptions import ExecutorBusyError
+from image_processing_service.settings import settings
+from image_processing_service.utils.concurrency import LoopSemaphore
+
+logger = logging.getLogger(__name__)
+
+
+def _run_task(name: str, args: tuple, kwargs: dict):
+    # Roda no processo filho, que ainda não importou o módulo dos tasks;
+    # chamar o task direto executa a função sem passar pelo broker
+    module, attribute = name.rsplit('.', 1)
+    return getattr(import_module(module), attribute)(*args, **kwargs)
+
+
+class CeleryExecutor:
+    """Publica no broker. Com TRANSFORM_QUEUES, cada task vai para a fila
+    da sua original (``original_image_key``, o primeiro argumento de todos
+    os tasks)."""
+
+    def ensure_capacity(self, count: int):
+        """O broker absorve a fila: nunca recusa."""
+
+    @staticmethod
+    def submit(task: Task, **kwargs):
+        queue = transform_queue(kwargs['original_image_key'])
+        if queue is None:
+            task.delay(**kwargs)
+        else:
+            task.apply_async(kwargs=kwargs, queue=queue)
+
+    @staticmethod
+    def submit_many(task: Task, calls: list[tuple], chunk_size: int):
+        # Um chunk é uma mensagem só: agrupa as chamadas por fila antes
+        by_queue: dict[str | None, list[tuple]] = {}
+        for args in calls:
+            by_queue.setdefault(transform_queue(args[0]), []).append(args)
+        for queue, queue_calls in by_queue.items():
+            options = {'queue': queue} if queue else {}
+            task.chunks(queue_calls, chunk_size).apply_async(**options)
+
+    def shutdown(self):
+        pass
+
+
+class LocalExecutor:
+    """Pool de processos com fila limitada a ``max_queue`` tasks.
+
+    ``ensure_capacity`` é chamado antes de criar as imagens derivadas, para
+    que um pedido recusado não deixe registros presos em ``queued``.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def ensure_capacity(self, count: int):
+        if self._pending + count > self.max_queue:
+            raise ExecutorBusyError('Processing queue is full.')
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+        if not future.cancelled() and future.exception():
+            # O task já gravou a falha no status da imagem
+            logger.warning('Local task failed: %s', future.exception())
+
+    def _submit(self, task: Task, args: tuple, kwargs: dict):
+        with self._lock:
+            if self._pool is None:
+                # spawn: o processo da API tem threads (anyio, hashing)
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            self._pending += 1
+        future = self._pool.submit(_run_task, task.name, args, kwargs)
+        future.add_done_callback(self._done)
+
+    def submit(self, task: Task, **kwargs):
+        self._submit(task, (), kwargs)
+
+    def submit_many(self, task: Task, calls: Iterable[tuple], chunk_size: int):
+        # Chunks só economizam mensagens no broker; aqui cada um é um job
+        for args in calls:
+            self._submit(task, args, {})
+
+    def shutdown(self):
+        """Espera os tasks já aceitos terminarem."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+class InlinePool:
+    """Threads para transformações baratas, rodadas dentro da requisição.
+
+    ``available`` diz se há thread livre agora; quem não achar vaga segue
+    pelo executor normal em vez de esperar.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots = LoopSemaphore(workers)
+
+    def available(self) -> bool:
+        return self.workers > 0 and not self._slots.get().locked()
+
+    async def run(self, func, *args):
+        async with self._slots.get():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix='inline-transform'
+                )
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._executor = None
+
+
+def create_executor() -> CeleryExecutor | LocalExecutor:
+    if settings.TASK_EXECUTOR == 'local':
+        return LocalExecutor(
+            settings.LOCAL_EXECUTOR_WORKERS, settings.LOCAL_EXECUTOR_MAX_QUEUE
+        )
+    return CeleryExecutor()
+
+
+task_executor = create_executor()
+inline_pool = InlinePool(settings.SYNC_TRANSFORM_WORKERS)
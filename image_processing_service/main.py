@@ -1,17 +1,31 @@
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
+from image_processing_service.executor import inline_pool, task_executor
+from image_processing_service.metrics import metrics
 from image_processing_service.routers.auth_router import auth_router
 from image_processing_service.routers.image_router import image_router
+from image_processing_service.services.job_notifier import job_notifier
+from image_processing_service.services.transform_coalescer import (
+    transform_coalescer,
+)
 from image_processing_service.settings import settings
+from image_processing_service.utils.hashing import hashing_pool
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     yield
+    await job_notifier.close()
+    # Antes do executor: os grupos pendentes ainda precisam ser publicados
+    await transform_coalescer.close()
+    hashing_pool.shutdown()
+    task_executor.shutdown()
+    inline_pool.shutdown()
 
 
 app = FastAPI(
@@ -21,6 +35,32 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Folga para os cabeçalhos do multipart além do próprio arquivo
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@app.middleware('http')
+async def reject_oversized_uploads(request: Request, call_next):
+    # O FastAPI lê o multipart inteiro antes de chamar o endpoint: recusa
+    # pelo Content-Length antes de receber o corpo
+    content_length = request.headers.get('content-length')
+    if (
+        request.method == 'POST'
+        and content_length
+        and content_length.isdigit()
+        and int(content_length)
+        > settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={
+                'detail': 'File exceeds the maximum upload size of '
+                f'{settings.MAX_UPLOAD_BYTES} bytes.'
+            },
+        )
+    return await call_next(request)
+
+
 app.include_router(auth_router, tags=['auth'])
 app.include_router(image_router, tags=['image'])
 
@@ -28,3 +68,8 @@ app.include_router(image_router, tags=['image'])
 @app.get('/')
 def read_root():
     return {'message': 'Hello World!'}
+
+
+@app.get('/metrics')
+def read_metrics():
+    return metrics.snapshot()
@@ -0,0 +1,144 @@
+"""Orçamento de memória dos workers.
+
+Cada task reserva, antes de decodificar, a memória estimada a partir do
+cabeçalho da original e das operações (``estimate_memory``). Vários tasks
+grandes ao mesmo tempo deixam de estourar o limite do container: quem não
+cabe no orçamento volta para a fila (ou espera, quando chamado direto).
+
+As reservas ficam em memória compartilhada criada no processo principal
+do worker, antes do fork (``enable``, no ``worker_init`` do Celery): os
+filhos do prefork dividem o mesmo orçamento. Cada processo tem seu slot
+(pid, bytes), e o slot de um filho morto no meio de um task é descartado
+na próxima reserva. Fora do worker do Celery (a API, os filhos do
+``LocalExecutor``) o orçamento fica desligado.
+"""
+
+import multiprocessing
+import os
+import time
+
+# Processos (filhos do prefork) acompanhados ao mesmo tempo
+SLOTS = 256
+
+# Intervalo entre tentativas de quem espera por espaço no orçamento
+WAIT_INTERVAL = 0.1
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MemoryBudget:
+    """Até ``limit`` bytes reservados pelos tasks do worker (0 desliga).
+
+    Um task sozinho sempre é admitido, mesmo maior que o orçamento: de
+    outro modo nunca rodaria.
+    """
+
+    def __init__(self, limit: int, slots: int = SLOTS):
+        self.limit = 0
+        self._size = slots
+        self._slots = None
+        self._counters = None
+        self.enable(limit)
+
+    def enable(self, limit: int):
+        """Passa a limitar em ``limit`` bytes (0 desliga), com memória
+        compartilhada nova: só os processos criados depois por fork a
+        dividem."""
+        self.limit = limit
+        if limit > 0:
+            self._slots = multiprocessing.Array('q', 2 * self._size)
+            # Maior total reservado e tasks recusados, desde o início
+            self._counters = multiprocessing.Array('q', 2)
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def _reserved(self) -> int:
+        # Chamado com o lock do array
+        total = 0
+        for index in range(0, len(self._slots), 2):
+            pid = self._slots[index]
+            if pid and not _alive(pid):
+                self._slots[index] = self._slots[index + 1] = 0
+            else:
+                total += self._slots[index + 1]
+        return total
+
+    def _slot(self, pid: int, create: bool) -> int | None:
+        free = None
+        for index in range(0, len(self._slots), 2):
+            if self._slots[index] == pid:
+                return index
+            if free is None and not self._slots[index]:
+                free = index
+        return free if create else None
+
+    def _add(self, nbytes: int) -> bool:
+        index = self._slot(os.getpid(), create=nbytes > 0)
+        if index is None:
+            return False
+        self._slots[index] = os.getpid()
+        self._slots[index + 1] += nbytes
+        if self._slots[index + 1] <= 0:
+            self._slots[index] = self._slots[index + 1] = 0
+        return True
+
+    @property
+    def reserved(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._slots.get_lock():
+            return self._reserved()
+
+    def try_reserve(self, nbytes: int) -> bool:
+        """Reserva ``nbytes`` se couberem; ``False`` caso contrário."""
+        if not self.enabled:
+            return True
+        with self._slots.get_lock():
+            reserved = self._reserved()
+            if reserved and reserved + nbytes > self.limit:
+                with self._counters.get_lock():
+                    self._counters[1] += 1
+                return False
+            # Sem slot livre, o task roda sem ser contado
+            if self._add(nbytes):
+                with self._counters.get_lock():
+                    self._counters[0] = max(
+                        self._counters[0], reserved + nbytes
+                    )
+        return True
+
+    def reserve(self, nbytes: int):
+        """Espera até ``nbytes`` caberem no orçamento e os reserva."""
+        while not self.try_reserve(nbytes):
+            time.sleep(WAIT_INTERVAL)
+
+    def release(self, nbytes: int):
+        if not self.enabled:
+            return
+        with self._slots.get_lock():
+            self._add(-nbytes)
+
+    def stats(self) -> dict:
+        reserved = self.reserved
+        peak, rejected = self._counters or (0, 0)
+        return {
+            'limit': self.limit,
+            'reserved': reserved,
+            'usage': reserved / self.limit if self.limit else 0.0,
+            'peak': peak,
+            'rejected': rejected,
+        }
+
+
+# Desligado até o worker_init do Celery chamar ``enable``
+memory_budget = MemoryBudget(0)
@@ -0,0 +1,25 @@
+from collections import Counter
+from threading import Lock
+
+
+class Metrics:
+    """Contadores em memória, por processo (cada worker do uvicorn tem os
+    seus)."""
+
+    def __init__(self):
+        self._counters: Counter[str] = Counter()
+        self._lock = Lock()
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, name: str) -> int:
+        return self._counters[name]
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+metrics = Metrics()
@@ -1,12 +1,20 @@
 from datetime import datetime
+from enum import StrEnum
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy import DateTime, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, registry
 
 table_registry = registry()
 
 
+class ImageStatus(StrEnum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
@@ -22,6 +30,17 @@ class User:
 @table_registry.mapped_as_dataclass
 class Image:
     __tablename__ = 'images'
+    __table_args__ = (
+        UniqueConstraint(
+            'original_image_id',
+            'transformation_key',
+            name='uq_images_original_image_id_transformation_key',
+        ),
+        # Listagem por usuário em ordem de upload (paginação por cursor)
+        Index(
+            'ix_images_user_id_uploaded_at_id', 'user_id', 'uploaded_at', 'id'
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     filename: Mapped[str]
@@ -30,6 +49,74 @@ class Image:
     original_image_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey('images.id'), default=None
     )
+    # sha256 do original + transformação canônica (só em imagens derivadas)
+    transformation_key: Mapped[Optional[str]] = mapped_column(default=None)
+    # Originais já nascem prontos; derivadas passam por queued -> running
+    status: Mapped[str] = mapped_column(default=ImageStatus.SUCCEEDED)
+    queued_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+    error: Mapped[Optional[str]] = mapped_column(default=None)
+    queue_wait_seconds: Mapped[Optional[float]] = mapped_column(default=None)
+    processing_seconds: Mapped[Optional[float]] = mapped_column(default=None)
+    # Lidos do cabeçalho no upload (originais) ou pelo worker (derivadas)
+    width: Mapped[Optional[int]] = mapped_column(default=None)
+    height: Mapped[Optional[int]] = mapped_column(default=None)
+    format: Mapped[Optional[str]] = mapped_column(default=None)
+    mode: Mapped[Optional[str]] = mapped_column(default=None)
+    frames: Mapped[Optional[int]] = mapped_column(default=None)
+    orientation: Mapped[Optional[int]] = mapped_column(default=None)
+    size_bytes: Mapped[Optional[int]] = mapped_column(default=None)
+    # Hash do conteúdo original, calculado na mesma passada da gravação
+    sha256: Mapped[Optional[str]] = mapped_column(default=None)
     uploaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), init=False, default=func.now()
     )
+
+
+@table_registry.mapped_as_dataclass
+class Batch:
+    __tablename__ = 'batches'
+
+    id: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    total: Mapped[int]
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), init=False, default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class BatchImage:
+    __tablename__ = 'batch_images'
+
+    batch_id: Mapped[str] = mapped_column(
+        ForeignKey('batches.id'), primary_key=True
+    )
+    image_id: Mapped[int] = mapped_column(
+        ForeignKey('images.id'), primary_key=True
+    )
+
+
+@table_registry.mapped_as_dataclass
+class UploadSession:
+    __tablename__ = 'upload_sessions'
+
+    id: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    filename: Mapped[str]
+    content_type: Mapped[str]
+    # Tamanho total declarado; o offset atual é o tamanho do arquivo em
+    # staging
+    size: Mapped[int]
+    # Renovado a cada chunk: sessões paradas além do TTL são descartadas
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), init=False, default=func.now()
+    )
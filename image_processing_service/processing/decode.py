@@ -0,0 +1,168 @@
+"""Decodificação reduzida da origem quando o resultado é bem menor.
+
+JPEG usa ``Image.draft`` (escala DCT de 1/2, 1/4 ou 1/8 direto no
+decodificador); os demais formatos usam ``Image.reduce`` com fator inteiro
+logo após a leitura, antes das outras operações.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import IO
+
+from PIL import Image as PILImage
+
+from image_processing_service.processing.planner import (
+    Plan,
+    plan_transformations,
+)
+
+# Abaixo disso reduzir na decodificação não compensa
+MIN_REDUCTION = 2
+
+# Modos que o ``reduce`` recusa; em paleta, a média dos índices nem seria
+# uma cor. Essas imagens são decodificadas inteiras, como antes
+_UNREDUCIBLE_MODES = {'1', 'P', 'PA', 'I;16', 'I;16L', 'I;16B', 'I;16N'}
+
+# O Pillow guarda pixels de mais de uma banda em 4 bytes, e os filtros
+# convertem para RGB: a estimativa de memória conta sempre 4
+PIXEL_BYTES = 4
+
+
+@dataclass(frozen=True)
+class DecodeStrategy:
+    # Quantas vezes a imagem decodificada deve ser maior que o necessário
+    # para o resize final (None desliga a decodificação reduzida)
+    margin: float | None
+    reducing_gap: float | None
+
+
+STRATEGIES = {
+    'quality': DecodeStrategy(margin=None, reducing_gap=None),
+    'balanced': DecodeStrategy(margin=2.0, reducing_gap=3.0),
+    'speed': DecodeStrategy(margin=1.0, reducing_gap=2.0),
+}
+
+
+def open_planned(
+    path: str, transformations: dict, strategy: str = 'balanced'
+) -> tuple[PILImage.Image, Plan]:
+    """Abre a imagem já reduzida o quanto o plano permite e devolve o plano
+    refeito para o tamanho efetivamente decodificado."""
+    return plan_decode(PILImage.open(path), transformations, strategy)
+
+
+def _reduction(plan: Plan, options: DecodeStrategy) -> float | None:
+    """Fator de redução na decodificação, ou ``None`` se não compensa."""
+    if options.margin is None:
+        return None
+    reduction = plan.decode_scale() / options.margin
+    return reduction if reduction >= MIN_REDUCTION else None
+
+
+def plan_decode(
+    pil_image: PILImage.Image,
+    transformations: dict,
+    strategy: str = 'balanced',
+) -> tuple[PILImage.Image, Plan]:
+    """Como ``open_planned``, para uma imagem já aberta. Se ela já foi
+    decodificada (veio do cache), o draft não se aplica mais e a redução
+    é feita com ``reduce``."""
+    options = STRATEGIES[strategy]
+    plan = plan_transformations(
+        transformations, pil_image.size, pil_image.mode, options.reducing_gap
+    )
+
+    reduction = _reduction(plan, options)
+    if reduction is None:
+        return pil_image, plan
+
+    if pil_image.format == 'JPEG' and pil_image.tile:
+        width, height = pil_image.size
+        pil_image.draft(
+            pil_image.mode,
+            (math.ceil(width / reduction), math.ceil(height / reduction)),
+        )
+    elif pil_image.mode in _UNREDUCIBLE_MODES:
+        return pil_image, plan
+    else:
+        pil_image = pil_image.reduce(int(reduction))
+
+    if pil_image.size != plan.source_size:
+        plan = plan_transformations(
+            transformations,
+            pil_image.size,
+            pil_image.mode,
+            options.reducing_gap,
+        )
+
+    return pil_image, plan
+
+
+def estimate_cost(path: str | IO[bytes], transformations: dict) -> int:
+    """Custo do plano em pixels lendo só o cabeçalho da imagem."""
+    with PILImage.open(path) as pil_image:
+        plan = plan_transformations(
+            transformations, pil_image.size, pil_image.mode
+        )
+    return plan.estimated_pixels()
+
+
+def estimate_memory(
+    path: str | IO[bytes],
+    transformations: list[dict],
+    strategy: str = 'balanced',
+    decode: dict | None = None,
+) -> int:
+    """Pico aproximado de memória, em bytes, lendo só o cabeçalho.
+
+    A origem é decodificada uma vez, reduzida o quanto ``decode`` permite
+    (por padrão a única transformação), e cada item de ``transformations``
+    roda sobre ela, um por vez. Fora do JPEG a redução é feita depois de
+    decodificar a imagem inteira, que também entra na conta.
+    """
+    options = STRATEGIES[strategy]
+    with PILImage.open(path) as pil_image:
+        full_pixels = pil_image.width * pil_image.height
+        plan = plan_transformations(
+            decode or transformations[0],
+            pil_image.size,
+            pil_image.mode,
+            options.reducing_gap,
+        )
+        reduction = _reduction(plan, options)
+        decoded = pil_image.size
+        if reduction is not None and pil_image.format == 'JPEG':
+            # Só calcula a escala do DCT, sem decodificar nada
+            pil_image.draft(
+                pil_image.mode,
+                tuple(math.ceil(side / reduction) for side in decoded),
+            )
+            decoded, full_pixels = pil_image.size, 0
+        elif (
+            reduction is not None and pil_image.mode not in _UNREDUCIBLE_MODES
+        ):
+            decoded = tuple(
+                math.ceil(side / int(reduction)) for side in decoded
+            )
+        else:
+            full_pixels = 0
+
+        peak = max(
+            plan_transformations(
+                job, decoded, pil_image.mode, options.reducing_gap
+            ).peak_pixels()
+            for job in transformations
+        )
+    return (full_pixels + peak) * PIXEL_BYTES
+
+
+def image_nbytes(pil_image: PILImage.Image) -> int:
+    """Memória ocupada pelos pixels decodificados."""
+    # O Pillow guarda pixels de mais de uma banda em 4 bytes
+    if pil_image.mode in {'I', 'F'} or len(pil_image.getbands()) > 1:
+        pixel_bytes = 4
+    elif pil_image.mode.startswith('I;16'):
+        pixel_bytes = 2
+    else:
+        pixel_bytes = 1
+    return pil_image.width * pil_image.height * pixel_bytes
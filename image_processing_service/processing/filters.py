@@ -0,0 +1,217 @@
+"""Filtros de cor expressos como matrizes afins 3x4.
+
+Cada filtro vira uma matriz ``((r0, r1, r2, o0), (g0, ...), (b0, ...))`` e a
+cadeia é fundida em uma matriz por passada antes de tocar nos pixels, que
+são processados por ``PIL.Image.convert(matrix=...)``.
+"""
+
+from PIL import Image as PILImage
+
+Matrix = tuple[
+    tuple[float, float, float, float],
+    tuple[float, float, float, float],
+    tuple[float, float, float, float],
+]
+
+IDENTITY: Matrix = (
+    (1.0, 0.0, 0.0, 0.0),
+    (0.0, 1.0, 0.0, 0.0),
+    (0.0, 0.0, 1.0, 0.0),
+)
+
+CHANNEL_MAX = 255.0
+# Folga para erros de arredondamento ao comparar com 0..255
+_RANGE_TOLERANCE = 1e-6
+
+# Pesos de luminância ITU-R 601-2, os mesmos do convert('L') do Pillow
+LUMA = (0.299, 0.587, 0.114)
+
+GRAYSCALE: Matrix = (
+    (*LUMA, 0.0),
+    (*LUMA, 0.0),
+    (*LUMA, 0.0),
+)
+
+SEPIA: Matrix = (
+    (0.393, 0.769, 0.189, 0.0),
+    (0.349, 0.686, 0.168, 0.0),
+    (0.272, 0.534, 0.131, 0.0),
+)
+
+INVERT: Matrix = (
+    (-1.0, 0.0, 0.0, 255.0),
+    (0.0, -1.0, 0.0, 255.0),
+    (0.0, 0.0, -1.0, 255.0),
+)
+
+
+def brightness(factor: float) -> Matrix:
+    return (
+        (factor, 0.0, 0.0, 0.0),
+        (0.0, factor, 0.0, 0.0),
+        (0.0, 0.0, factor, 0.0),
+    )
+
+
+def contrast(factor: float) -> Matrix:
+    offset = 128.0 * (1.0 - factor)
+    return (
+        (factor, 0.0, 0.0, offset),
+        (0.0, factor, 0.0, offset),
+        (0.0, 0.0, factor, offset),
+    )
+
+
+def saturation(factor: float) -> Matrix:
+    rows = []
+    for channel in range(3):
+        row = [(1.0 - factor) * weight for weight in LUMA]
+        row[channel] += factor
+        rows.append((*row, 0.0))
+    return tuple(rows)
+
+
+def tint(color: str, strength: float) -> Matrix:
+    target = [int(color[i : i + 2], 16) for i in (1, 3, 5)]
+    keep = 1.0 - strength
+    return tuple(
+        (
+            *(keep if column == channel else 0.0 for column in range(3)),
+            strength * target[channel],
+        )
+        for channel in range(3)
+    )
+
+
+def compose(first: Matrix, then: Matrix) -> Matrix:
+    """Matriz equivalente a aplicar ``first`` e depois ``then``."""
+    return tuple(
+        (
+            *(
+                sum(then[row][k] * first[k][column] for k in range(3))
+                for column in range(3)
+            ),
+            sum(then[row][k] * first[k][3] for k in range(3)) + then[row][3],
+        )
+        for row in range(3)
+    )
+
+
+def _output_ranges(
+    matrix: Matrix, ranges: list[tuple[float, float]]
+) -> list[tuple[float, float]]:
+    """Faixa de valores que cada canal pode assumir após a matriz."""
+    result = []
+    for row in matrix:
+        low = high = row[3]
+        for coefficient, (channel_low, channel_high) in zip(row[:3], ranges):
+            low += min(coefficient * channel_low, coefficient * channel_high)
+            high += max(coefficient * channel_low, coefficient * channel_high)
+        result.append((low, high))
+    return result
+
+
+def _color_steps(filters: dict) -> list[Matrix]:
+    steps: list[Matrix] = []
+
+    if filters.get('grayscale'):
+        steps.append(GRAYSCALE)
+    if filters.get('sepia'):
+        steps.append(SEPIA)
+    if filters.get('brightness') is not None:
+        steps.append(brightness(filters['brightness']))
+    if filters.get('contrast') is not None:
+        steps.append(contrast(filters['contrast']))
+    if filters.get('saturation') is not None:
+        steps.append(saturation(filters['saturation']))
+    if filters.get('tint'):
+        tint_options = filters['tint']
+        steps.append(tint(tint_options['color'], tint_options['strength']))
+    if filters.get('invert'):
+        steps.append(INVERT)
+
+    return steps
+
+
+def build_color_matrices(filters: dict) -> list[Matrix]:
+    """Funde os filtros pedidos, na ordem de FilterOptions, em matrizes.
+
+    Passos consecutivos são fundidos enquanto nenhum valor intermediário
+    puder sair de 0..255; um passo que pode saturar (ex.: sepia) fecha o
+    grupo, porque o Pillow satura o resultado ao fim de cada passada e a
+    fusão mudaria a imagem. Lista vazia quando nada altera as cores.
+    """
+    matrices: list[Matrix] = []
+    current: Matrix | None = None
+    ranges = [(0.0, CHANNEL_MAX)] * 3
+
+    for step in _color_steps(filters):
+        current = step if current is None else compose(current, step)
+        ranges = _output_ranges(step, ranges)
+        if any(
+            low < -_RANGE_TOLERANCE or high > CHANNEL_MAX + _RANGE_TOLERANCE
+            for low, high in ranges
+        ):
+            matrices.append(current)
+            current = None
+            ranges = [
+                (max(low, 0.0), min(high, CHANNEL_MAX)) for low, high in ranges
+            ]
+
+    if current is not None:
+        matrices.append(current)
+
+    return matrices
+
+
+def _is_gray(matrix: Matrix) -> bool:
+    return matrix[0] == matrix[1] == matrix[2]
+
+
+def _lut(gain: float, offset: float) -> list[int]:
+    return [
+        min(max(round(gain * value + offset), 0), int(CHANNEL_MAX))
+        for value in range(256)
+    ]
+
+
+def _apply_to_gray(
+    pil_image: PILImage.Image, matrix: Matrix
+) -> PILImage.Image:
+    # Com R = G = B cada linha vira ganho + offset: basta uma LUT por canal
+    luts = [_lut(sum(row[:3]), row[3]) for row in matrix]
+    if luts[0] == luts[1] == luts[2]:
+        return pil_image.point(luts[0])
+    return PILImage.merge('RGB', [pil_image.point(lut) for lut in luts])
+
+
+def apply_color_matrix(
+    pil_image: PILImage.Image, matrix: Matrix
+) -> PILImage.Image:
+    """Aplica a matriz em uma única passada.
+
+    Quando as três linhas são iguais (ex.: grayscale seguido de brilho ou
+    contraste) o resultado sai em modo ``L``, como no ``ImageOps.grayscale``.
+    Imagens ``L`` passam por LUTs em vez de serem expandidas para RGB.
+    """
+    if pil_image.mode == 'L':
+        return _apply_to_gray(pil_image, matrix)
+
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+
+    if _is_gray(matrix):
+        return pil_image.convert('L', matrix=matrix[0])
+
+    return pil_image.convert(
+        'RGB', matrix=tuple(value for row in matrix for value in row)
+    )
+
+
+def apply_filters(pil_image: PILImage.Image, filters: dict) -> PILImage.Image:
+    matrices = build_color_matrices(filters)
+    if matrices == [GRAYSCALE]:
+        return pil_image.convert('L')
+    for matrix in matrices:
+        pil_image = apply_color_matrix(pil_image, matrix)
+    return pil_image
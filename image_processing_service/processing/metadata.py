@@ -0,0 +1,72 @@
+"""Metadados da imagem lidos só do cabeçalho (sem decodificar pixels)."""
+
+import io
+import os
+
+from PIL import ExifTags
+from PIL import Image as PILImage
+
+# Assinaturas dos formatos aceitos no upload (WebP é tratado à parte)
+MAGIC_NUMBERS = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+
+# Suficiente para o cabeçalho de PNG/JPEG/WebP/GIF/TIFF/BMP usuais
+HEADER_BYTES = 64 * 1024
+
+METADATA_FIELDS = (
+    'width',
+    'height',
+    'format',
+    'mode',
+    'frames',
+    'orientation',
+    'size_bytes',
+)
+
+
+def read_metadata(path: str) -> dict:
+    """Dimensões, formato, modo, quadros, orientação EXIF e tamanho.
+
+    Levanta ``OSError`` se o arquivo não for uma imagem reconhecida.
+    """
+    with PILImage.open(path) as pil_image:
+        width, height = pil_image.size
+        return {
+            'width': width,
+            'height': height,
+            'format': pil_image.format.lower() if pil_image.format else None,
+            'mode': pil_image.mode,
+            'frames': getattr(pil_image, 'n_frames', 1),
+            'orientation': pil_image.getexif().get(ExifTags.Base.Orientation),
+            'size_bytes': os.path.getsize(path),
+        }
+
+
+def sniff_format(head: bytes) -> str | None:
+    """Formato pelos bytes iniciais, ignorando o content-type do cliente."""
+    # RIFF, 4 bytes de tamanho e então WEBP
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for magic, image_format in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return image_format
+    return None
+
+
+def read_header_size(head: bytes) -> tuple[int, int] | None:
+    """Dimensões declaradas no cabeçalho, se ele couber em ``head``.
+
+    Levanta ``DecompressionBombError`` acima de ``2 * MAX_IMAGE_PIXELS``.
+    """
+    try:
+        with PILImage.open(io.BytesIO(head)) as pil_image:
+            return pil_image.size
+    except OSError:
+        return None
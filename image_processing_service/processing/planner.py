@@ -0,0 +1,356 @@
+"""Planejamento das transformações executadas pelo worker.
+
+``build_ops`` traduz o dicionário de transformações na sequência literal
+(resize, crop, rotate, filtros) e ``optimize`` reescreve essa sequência em
+uma equivalente mais barata:
+
+* crop depois de resize vira um único ``resize(box=...)``, que só calcula
+  os pixels que sobrevivem ao recorte;
+* rotações múltiplas de 90 graus viram ``transpose``;
+* reduções grandes usam ``reducing_gap``;
+* filtros de cor ficam depois de reduções e vão para antes de ampliações,
+  sempre no ponto com menos pixels.
+"""
+
+import math
+from dataclasses import dataclass, field, replace
+
+from PIL import Image as PILImage
+
+from image_processing_service.processing.filters import apply_filters
+
+# Mesmo valor sugerido na documentação do Pillow para reducing_gap
+DEFAULT_REDUCING_GAP = 3.0
+
+_TRANSPOSE_BY_ANGLE = {
+    90: PILImage.Transpose.ROTATE_90,
+    180: PILImage.Transpose.ROTATE_180,
+    270: PILImage.Transpose.ROTATE_270,
+}
+
+# Modos em que o resize usa o filtro pedido; em outros (ex.: 'P') o Pillow
+# cai para NEAREST e trocar a ordem com filtros mudaria o resultado
+_RESAMPLED_MODES = {'RGB', 'L'}
+
+
+@dataclass(frozen=True)
+class Resize:
+    size: tuple[int, int]
+    box: tuple[float, float, float, float] | None = None
+    reducing_gap: float | None = None
+
+    def apply(self, pil_image: PILImage.Image) -> PILImage.Image:
+        return pil_image.resize(
+            self.size, box=self.box, reducing_gap=self.reducing_gap
+        )
+
+    def output_size(self, size: tuple[int, int]) -> tuple[int, int]:
+        return self.size
+
+    def describe(self) -> str:
+        details = [f'{self.size[0]}x{self.size[1]}']
+        if self.box:
+            details.append(
+                'box=(' + ', '.join(f'{v:g}' for v in self.box) + ')'
+            )
+        if self.reducing_gap:
+            details.append(f'reducing_gap={self.reducing_gap:g}')
+        return f'resize({", ".join(details)})'
+
+
+@dataclass(frozen=True)
+class Crop:
+    box: tuple[int, int, int, int]
+
+    def apply(self, pil_image: PILImage.Image) -> PILImage.Image:
+        return pil_image.crop(self.box)
+
+    def output_size(self, size: tuple[int, int]) -> tuple[int, int]:
+        return (self.box[2] - self.box[0], self.box[3] - self.box[1])
+
+    def describe(self) -> str:
+        return f'crop{self.box}'
+
+
+@dataclass(frozen=True)
+class Rotate:
+    angle: int
+
+    def apply(self, pil_image: PILImage.Image) -> PILImage.Image:
+        return pil_image.rotate(self.angle, expand=True)
+
+    def output_size(self, size: tuple[int, int]) -> tuple[int, int]:
+        # Estimativa (pode diferir em 1px do arredondamento do Pillow)
+        angle = math.radians(self.angle)
+        cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+        width, height = size
+        return (
+            math.ceil(width * cos + height * sin),
+            math.ceil(width * sin + height * cos),
+        )
+
+    def describe(self) -> str:
+        return f'rotate({self.angle})'
+
+
+@dataclass(frozen=True)
+class Transpose:
+    method: PILImage.Transpose
+
+    def apply(self, pil_image: PILImage.Image) -> PILImage.Image:
+        return pil_image.transpose(self.method)
+
+    def output_size(self, size: tuple[int, int]) -> tuple[int, int]:
+        if self.method == PILImage.Transpose.ROTATE_180:
+            return size
+        return (size[1], size[0])
+
+    def describe(self) -> str:
+        return f'transpose({self.method.name})'
+
+
+@dataclass(frozen=True)
+class ColorFilters:
+    filters: dict = field(hash=False)
+
+    def apply(self, pil_image: PILImage.Image) -> PILImage.Image:
+        return apply_filters(pil_image, self.filters)
+
+    @staticmethod
+    def output_size(size: tuple[int, int]) -> tuple[int, int]:
+        return size
+
+    def describe(self) -> str:
+        enabled = [
+            name for name, value in self.filters.items() if value is not False
+        ]
+        return f'filters({", ".join(enabled)})'
+
+
+Operation = Resize | Crop | Rotate | Transpose | ColorFilters
+
+
+@dataclass
+class Plan:
+    source_size: tuple[int, int]
+    operations: list[Operation]
+
+    def execute(self, pil_image: PILImage.Image) -> PILImage.Image:
+        for operation in self.operations:
+            pil_image = operation.apply(pil_image)
+        return pil_image
+
+    def output_size(self) -> tuple[int, int]:
+        size = self.source_size
+        for operation in self.operations:
+            size = operation.output_size(size)
+        return size
+
+    def estimated_pixels(self) -> int:
+        """Custo aproximado: pixels da origem mais os gerados por cada
+        operação."""
+        size = self.source_size
+        total = size[0] * size[1]
+        for operation in self.operations:
+            size = operation.output_size(size)
+            total += size[0] * size[1]
+        return total
+
+    def peak_pixels(self) -> int:
+        """Pixels vivos ao mesmo tempo no passo mais caro: a origem (que
+        quem chama mantém até o fim) mais a entrada e a saída da operação."""
+        size = self.source_size
+        source = size[0] * size[1]
+        peak, previous = source, 0
+        for operation in self.operations:
+            size = operation.output_size(size)
+            pixels = size[0] * size[1]
+            peak = max(peak, source + previous + pixels)
+            previous = pixels
+        return peak
+
+    def decode_scale(self) -> float:
+        """Quanto a origem é reduzida pela primeira operação.
+
+        Um valor 4 significa que decodificar a imagem a 1/4 da resolução
+        ainda fornece pixels suficientes para o resultado.
+        """
+        if not self.operations or not isinstance(self.operations[0], Resize):
+            return 1.0
+        return min(_resize_scale(self.operations[0], self.source_size))
+
+    def describe(self) -> str:
+        width, height = self.source_size
+        steps = ' -> '.join(op.describe() for op in self.operations)
+        return f'{width}x{height}: {steps or "no-op"}'
+
+    __str__ = describe
+
+
+def build_ops(transformations: dict) -> list[Operation]:
+    """Sequência literal, na ordem histórica do worker."""
+    operations: list[Operation] = []
+
+    if transformations.get('resize'):
+        resize = transformations['resize']
+        operations.append(Resize((resize['width'], resize['height'])))
+
+    if transformations.get('crop'):
+        crop = transformations['crop']
+        operations.append(
+            Crop((
+                crop['x'],
+                crop['y'],
+                crop['x'] + crop['width'],
+                crop['y'] + crop['height'],
+            ))
+        )
+
+    if transformations.get('rotate'):
+        operations.append(Rotate(transformations['rotate']))
+
+    if transformations.get('filters'):
+        operations.append(ColorFilters(transformations['filters']))
+
+    return operations
+
+
+def _fold_crop_into_resize(
+    operations: list[Operation], source_size: tuple[int, int]
+) -> list[Operation]:
+    result: list[Operation] = []
+    for operation in operations:
+        previous = result[-1] if result else None
+        if (
+            isinstance(operation, Crop)
+            and isinstance(previous, Resize)
+            and previous.box is None
+        ):
+            width, height = previous.size
+            left, top, right, bottom = operation.box
+            # Crop fora dos limites preenche com preto: não dá para fundir
+            if 0 <= left < right <= width and 0 <= top < bottom <= height:
+                scale_x = source_size[0] / width
+                scale_y = source_size[1] / height
+                result[-1] = Resize(
+                    size=(right - left, bottom - top),
+                    box=(
+                        left * scale_x,
+                        top * scale_y,
+                        right * scale_x,
+                        bottom * scale_y,
+                    ),
+                )
+                continue
+        result.append(operation)
+    return result
+
+
+def _rotations_to_transposes(
+    operations: list[Operation],
+) -> list[Operation]:
+    result: list[Operation] = []
+    for operation in operations:
+        if not isinstance(operation, Rotate):
+            result.append(operation)
+            continue
+        angle = operation.angle % 360
+        if angle in _TRANSPOSE_BY_ANGLE:
+            result.append(Transpose(_TRANSPOSE_BY_ANGLE[angle]))
+        elif angle:
+            result.append(operation)
+    return result
+
+
+def _resize_scale(
+    resize: Resize, input_size: tuple[int, int]
+) -> tuple[float, float]:
+    if resize.box:
+        left, top, right, bottom = resize.box
+        input_size = (right - left, bottom - top)
+    # Lado de tamanho 0 (o Pillow recusa depois): conta como sem redução
+    return tuple(
+        source / target if target else 1.0
+        for source, target in zip(input_size, resize.size)
+    )
+
+
+def _add_reducing_gap(
+    operations: list[Operation],
+    source_size: tuple[int, int],
+    reducing_gap: float | None,
+) -> list[Operation]:
+    if not reducing_gap:
+        return operations
+
+    result: list[Operation] = []
+    size = source_size
+    for operation in operations:
+        # Com fator menor que 2 * gap o Pillow não reduz nada antes
+        if (
+            isinstance(operation, Resize)
+            and min(_resize_scale(operation, size)) >= 2 * reducing_gap
+        ):
+            result.append(replace(operation, reducing_gap=reducing_gap))
+        else:
+            result.append(operation)
+        size = operation.output_size(size)
+    return result
+
+
+def _hoist_filters_before_upscale(
+    operations: list[Operation], source_size: tuple[int, int], mode: str
+) -> list[Operation]:
+    if mode not in _RESAMPLED_MODES:
+        return operations
+
+    if not operations or not isinstance(operations[-1], ColorFilters):
+        return operations
+    filters = operations[-1]
+
+    # Filtros só trocam de lugar com resize e transpose; rotação arbitrária
+    # preenche cantos com preto, que um filtro (ex.: invert) mudaria
+    size = source_size
+    for index, operation in enumerate(operations[:-1]):
+        if isinstance(operation, Resize):
+            # Com box o filtro roda na entrada inteira, não só no recorte
+            input_pixels = size[0] * size[1]
+            output_pixels = operation.size[0] * operation.size[1]
+            movable = all(
+                isinstance(later, (Resize, Transpose))
+                for later in operations[index:-1]
+            )
+            if movable and output_pixels > input_pixels:
+                return [
+                    *operations[:index],
+                    filters,
+                    *operations[index:-1],
+                ]
+        size = operation.output_size(size)
+
+    return operations
+
+
+def optimize(
+    operations: list[Operation],
+    source_size: tuple[int, int],
+    mode: str = 'RGB',
+    reducing_gap: float | None = DEFAULT_REDUCING_GAP,
+) -> list[Operation]:
+    operations = _fold_crop_into_resize(operations, source_size)
+    operations = _rotations_to_transposes(operations)
+    operations = _add_reducing_gap(operations, source_size, reducing_gap)
+    operations = _hoist_filters_before_upscale(operations, source_size, mode)
+    return operations
+
+
+def plan_transformations(
+    transformations: dict,
+    source_size: tuple[int, int],
+    mode: str = 'RGB',
+    reducing_gap: float | None = DEFAULT_REDUCING_GAP,
+) -> Plan:
+    operations = optimize(
+        build_ops(transformations), source_size, mode, reducing_gap
+    )
+    return Plan(source_size=source_size, operations=operations)
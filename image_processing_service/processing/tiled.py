@@ -0,0 +1,361 @@
+"""Execução em faixas para imagens enormes, com memória limitada.
+
+O caminho normal decodifica a origem inteira e cada operação aloca outra
+imagem do mesmo tamanho. Aqui a origem é lida em faixas horizontais de
+``strip_pixels`` pixels, cada faixa passa por filtros, resize/crop e
+transposições, e o resultado é colado na posição final da saída. O pico
+de memória fica em uma faixa mais a imagem de saída, que o codificador do
+Pillow precisa inteira: por isso só vão em faixas saídas de até
+``max_output_pixels`` (miniaturas e recortes); filtros sobre a imagem
+inteira e afins ficam no caminho normal, que o orçamento de memória do
+worker conta pela decodificação completa.
+
+Só funciona para origens com pixels crus no arquivo (TIFF sem compressão,
+BMP, PPM, sem paleta), em que uma faixa é lida sem decodificar as
+anteriores: os bytes dela vão direto para o decodificador ``raw`` de
+``Image.frombytes``. Para as demais ``open_strips`` devolve ``None`` e o
+worker segue pelo caminho normal (JPEG grande já decodifica reduzido pelo
+draft). Rotações fora de múltiplos de 90 graus também ficam no caminho
+normal.
+"""
+
+import io
+import math
+
+from PIL import ExifTags, ImageMode
+from PIL import Image as PILImage
+
+from image_processing_service.processing.decode import PIXEL_BYTES
+from image_processing_service.processing.planner import (
+    ColorFilters,
+    Crop,
+    Operation,
+    Plan,
+    Resize,
+    Transpose,
+    plan_transformations,
+)
+
+# Alcance do filtro padrão do resize (BICUBIC), em pixels da origem
+RESAMPLE_SUPPORT = 2.0
+
+# Mapeamento de cada transposição sobre coordenadas de borda de pixel
+_TRANSPOSE_POINT = {
+    PILImage.Transpose.FLIP_LEFT_RIGHT: lambda x, y, w, h: (w - x, y),
+    PILImage.Transpose.FLIP_TOP_BOTTOM: lambda x, y, w, h: (x, h - y),
+    PILImage.Transpose.ROTATE_90: lambda x, y, w, h: (y, w - x),
+    PILImage.Transpose.ROTATE_180: lambda x, y, w, h: (w - x, h - y),
+    PILImage.Transpose.ROTATE_270: lambda x, y, w, h: (h - y, x),
+    PILImage.Transpose.TRANSPOSE: lambda x, y, w, h: (y, x),
+    PILImage.Transpose.TRANSVERSE: lambda x, y, w, h: (h - y, w - x),
+}
+
+
+def _row_bytes(rawmode: str, width: int) -> int | None:
+    if rawmode == '1':
+        return math.ceil(width / 8)
+    try:
+        mode = ImageMode.getmode(rawmode)
+    except KeyError:
+        return None
+    return width * len(mode.bands) * int(mode.typestr[2:])
+
+
+def _raw_args(args) -> tuple[str, int, int]:
+    """``(rawmode, stride, ystep)`` com os padrões do decodificador raw."""
+    if isinstance(args, str):
+        args = (args,)
+    stride = args[1] if len(args) > 1 else 0
+    ystep = args[2] if len(args) > 2 else 1  # noqa: PLR2004
+    return args[0], stride, ystep or 1
+
+
+class StripReader:
+    """Lê faixas de linhas de uma imagem com pixels crus no arquivo."""
+
+    def __init__(self, path: str, size: tuple[int, int], mode: str, tiles):
+        self.path = path
+        self.size = size
+        self.mode = mode
+        self._tiles = tiles
+
+    def read(self, top: int, bottom: int) -> PILImage.Image:
+        """Linhas ``[top, bottom)``, decodificando só os blocos delas."""
+        size = (self.size[0], bottom - top)
+        pieces = []
+        with open(self.path, 'rb') as file:
+            for (
+                left,
+                tile_top,
+                right,
+                tile_bottom,
+                offset,
+                args,
+            ) in self._tiles:
+                first, last = max(top, tile_top), min(bottom, tile_bottom)
+                if first >= last:
+                    continue
+                rawmode, stride, ystep = args
+                row = stride or _row_bytes(rawmode, right - left)
+                # Com ystep -1 as linhas ficam de baixo para cima no arquivo
+                skipped = first - tile_top if ystep > 0 else tile_bottom - last
+                file.seek(offset + skipped * row)
+                piece = PILImage.frombytes(
+                    self.mode,
+                    (right - left, last - first),
+                    file.read((last - first) * row),
+                    'raw',
+                    rawmode,
+                    stride,
+                    ystep,
+                )
+                pieces.append((piece, (left, first - top)))
+
+        if len(pieces) == 1 and pieces[0][0].size == size:
+            return pieces[0][0]
+        strip = PILImage.new(self.mode, size)
+        for piece, position in pieces:
+            strip.paste(piece, position)
+        return strip
+
+
+def _strip_tiles(pil_image: PILImage.Image) -> list | None:
+    """Blocos crus da imagem, ou ``None`` se as faixas não puderem ser
+    lidas separadamente."""
+    tiles = []
+    for name, (left, top, right, bottom), offset, raw in pil_image.tile:
+        if name != 'raw':
+            return None
+        args = _raw_args(raw)
+        if not args[1] and _row_bytes(args[0], right - left) is None:
+            return None
+        tiles.append((left, top, right, bottom, offset, args))
+    # Depois dos blocos: no PNG, por exemplo, getexif() carrega a imagem
+    if not tiles or getattr(pil_image, 'n_frames', 1) > 1:
+        return None
+    # A paleta só é lida junto com a imagem inteira
+    if pil_image.mode in {'P', 'PA'}:
+        return None
+    # O TIFF aplica a orientação do EXIF ao carregar, faixa por faixa
+    if pil_image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        return None
+    return tiles
+
+
+def can_tile(head: bytes, min_pixels: int) -> bool:
+    """Se o cabeçalho em ``head`` é de uma imagem com ao menos
+    ``min_pixels`` pixels que pode ser lida em faixas."""
+    try:
+        with PILImage.open(io.BytesIO(head)) as pil_image:
+            return (
+                pil_image.width * pil_image.height >= min_pixels
+                and _strip_tiles(pil_image) is not None
+            )
+    except OSError:
+        return False
+
+
+def estimate_tiled_memory(
+    head: bytes,
+    transformations: list[dict],
+    strip_pixels: int,
+    max_output_pixels: int,
+) -> int | None:
+    """Pico aproximado, em bytes, para rodar ``transformations`` uma a uma
+    em faixas; ``None`` se alguma delas não puder ser executada assim.
+
+    Por faixa: os pixels lidos, os filtrados e a banda redimensionada, mais
+    a saída inteira e a banda transposta a colar nela.
+    """
+    with PILImage.open(io.BytesIO(head)) as pil_image:
+        size, mode = pil_image.size, pil_image.mode
+    peak = 0
+    for job in transformations:
+        plan = plan_transformations(job, size, mode, reducing_gap=None)
+        try:
+            check_tiled(plan, max_output_pixels)
+        except ValueError:
+            return None
+        width, height = plan.output_size()
+        peak = max(peak, 3 * strip_pixels + 2 * width * height)
+    return peak * PIXEL_BYTES
+
+
+def open_strips(path: str) -> StripReader | None:
+    """``StripReader`` para a imagem, ou ``None`` se as faixas não puderem
+    ser lidas separadamente."""
+    with PILImage.open(path) as pil_image:
+        tiles = _strip_tiles(pil_image)
+        if tiles is None:
+            return None
+        return StripReader(path, pil_image.size, pil_image.mode, tiles)
+
+
+def _transpose_box(
+    method: PILImage.Transpose,
+    box: tuple[int, int, int, int],
+    size: tuple[int, int],
+) -> tuple[tuple[int, int, int, int], tuple[int, int]]:
+    point = _TRANSPOSE_POINT[method]
+    x0, y0 = point(box[0], box[1], *size)
+    x1, y1 = point(box[2], box[3], *size)
+    box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+    if method in {
+        PILImage.Transpose.ROTATE_90,
+        PILImage.Transpose.ROTATE_270,
+        PILImage.Transpose.TRANSPOSE,
+        PILImage.Transpose.TRANSVERSE,
+    }:
+        size = (size[1], size[0])
+    return box, size
+
+
+def split_plan(
+    plan: Plan,
+) -> tuple[list[ColorFilters], Resize | Crop | None, list[Operation]]:
+    """Filtros antes da geometria, a operação que muda a geometria (no
+    máximo uma) e as transposições e filtros depois dela; ``ValueError``
+    se o plano não puder ser executado em faixas."""
+    before: list[ColorFilters] = []
+    geometry: Resize | Crop | None = None
+    after: list[Operation] = []
+    for operation in plan.operations:
+        if isinstance(operation, (Resize, Crop)):
+            if geometry is not None or after:
+                raise ValueError('Only one resize or crop before rotations.')
+            geometry = operation
+        elif (
+            isinstance(operation, ColorFilters)
+            and geometry is None
+            and not after
+        ):
+            before.append(operation)
+        elif isinstance(operation, (Transpose, ColorFilters)):
+            after.append(operation)
+        else:
+            raise ValueError(f'Cannot run {operation.describe()} in strips.')
+    return before, geometry, after
+
+
+def check_tiled(plan: Plan, max_output_pixels: int):
+    """``ValueError`` se o plano não puder ser executado em faixas, ou se a
+    saída, que fica inteira em memória, passar de ``max_output_pixels``."""
+    split_plan(plan)
+    width, height = plan.output_size()
+    if width * height > max_output_pixels:
+        raise ValueError(
+            f'Output of {width}x{height} is too large to run in strips.'
+        )
+
+
+def _band(
+    reader: StripReader,
+    geometry: Resize | Crop | None,
+    before: list[ColorFilters],
+    first: int,
+    last: int,
+) -> PILImage.Image:
+    """Linhas ``[first, last)`` da imagem depois da geometria."""
+    width, height = reader.size
+
+    if isinstance(geometry, Crop):
+        left, top, right, bottom = geometry.box
+        source_top = min(max(top + first, 0), height)
+        source_bottom = min(max(top + last, 0), height)
+        if source_top >= source_bottom:
+            # Faixa toda fora da origem: o crop do Pillow preenche de preto
+            return PILImage.new(reader.mode, (right - left, last - first))
+        strip = reader.read(source_top, source_bottom)
+        for operation in before:
+            strip = operation.apply(strip)
+        return strip.crop((
+            left,
+            top + first - source_top,
+            right,
+            top + last - source_top,
+        ))
+
+    if geometry is None:
+        strip = reader.read(first, last)
+        for operation in before:
+            strip = operation.apply(strip)
+        return strip
+
+    left, top, right, bottom = geometry.box or (0, 0, width, height)
+    scale = (bottom - top) / geometry.size[1]
+    # Linhas vizinhas que o filtro do resize alcança, com folga
+    support = RESAMPLE_SUPPORT * max(scale, 1.0) + 1
+    box_top = top + first * scale
+    box_bottom = top + last * scale
+    source_top = max(0, math.floor(box_top - support))
+    source_bottom = min(height, math.ceil(box_bottom + support))
+    strip = reader.read(source_top, source_bottom)
+    for operation in before:
+        strip = operation.apply(strip)
+    return strip.resize(
+        (geometry.size[0], last - first),
+        box=(left, box_top - source_top, right, box_bottom - source_top),
+    )
+
+
+def _band_size(
+    reader: StripReader, geometry: Resize | Crop | None
+) -> tuple[int, int, float]:
+    """Largura e altura da imagem depois da geometria, e linhas da origem
+    por linha dela."""
+    width, height = reader.size
+    if isinstance(geometry, Resize):
+        box = geometry.box or (0, 0, width, height)
+        return (*geometry.size, (box[3] - box[1]) / geometry.size[1])
+    if isinstance(geometry, Crop):
+        left, top, right, bottom = geometry.box
+        return right - left, bottom - top, 1.0
+    return width, height, 1.0
+
+
+def execute_tiled(
+    reader: StripReader, plan: Plan, strip_pixels: int
+) -> PILImage.Image:
+    """Executa ``plan`` lendo a origem em faixas de ~``strip_pixels``."""
+    before, geometry, after = split_plan(plan)
+    band_width, band_height, scale = _band_size(reader, geometry)
+
+    # Limita a faixa da origem e a faixa resultante
+    rows = min(
+        strip_pixels // max(band_width, 1),
+        int(strip_pixels / reader.size[0] / max(scale, 1e-9)),
+    )
+    rows = max(rows, 1)
+
+    output = None
+    for first in range(0, band_height, rows):
+        last = min(first + rows, band_height)
+        band = _band(reader, geometry, before, first, last)
+        box, size = (0, first, band_width, last), (band_width, band_height)
+        for operation in after:
+            band = operation.apply(band)
+            if isinstance(operation, Transpose):
+                box, size = _transpose_box(operation.method, box, size)
+        if output is None:
+            output = PILImage.new(band.mode, size)
+        output.paste(band, box[:2])
+    return output
+
+
+def plan_tiled(
+    reader: StripReader, transformations: dict, max_output_pixels: int
+) -> Plan | None:
+    """Plano para ``execute_tiled``, ou ``None`` se ele não se aplica (veja
+    ``check_tiled``).
+
+    Sem ``reducing_gap``: cada faixa é reduzida direto para o tamanho
+    final, o que não custa memória extra.
+    """
+    plan = plan_transformations(
+        transformations, reader.size, reader.mode, reducing_gap=None
+    )
+    try:
+        check_tiled(plan, max_output_pixels)
+    except ValueError:
+        return None
+    return plan
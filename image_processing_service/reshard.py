@@ -0,0 +1,161 @@
+"""Move os arquivos do diretório plano antigo para o layout em shards.
+
+Sem downtime: cada arquivo ganha primeiro um hard link no shard, a linha
+passa a apontar para a chave e o nome antigo só é removido depois do
+commit, então a linha sempre aponta para um arquivo que existe. Pode ser
+interrompido e rodado de novo; só linhas com caminho absoluto são
+tocadas. Imagens ainda na fila, e originais com derivações pendentes (o
+task leva o caminho antigo como ``original_image_key``), ficam para a
+próxima rodada.
+
+Uso: python -m image_processing_service.reshard --workers 8
+"""
+
+import argparse
+import contextlib
+import errno
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import exists, select
+
+from image_processing_service.database import WorkerSession
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.storage import LocalStorage, shard_key
+from image_processing_service.utils.files import temporary_path
+
+FINISHED_STATUSES = (ImageStatus.SUCCEEDED, ImageStatus.FAILED)
+
+# Caminhos absolutos só existem no backend local
+storage = LocalStorage()
+
+Derived = aliased(Image)
+
+
+def _pending_derivatives(original_id):
+    return (
+        exists()
+        .where(
+            Derived.original_image_id == original_id,
+            Derived.status.not_in(FINISHED_STATUSES),
+        )
+        .correlate_except(Derived)
+    )
+
+
+@dataclass
+class ReshardReport:
+    moved: int = 0
+    missing: int = 0
+    # Movidos, mas com o nome antigo mantido para uma derivação enfileirada
+    # durante a rodada
+    kept: int = 0
+
+
+def link_into_shard(path: str) -> str | None:
+    """Cria o arquivo no shard sem tirar o antigo e devolve a chave, ou
+    ``None`` se o arquivo antigo não existe."""
+    key = shard_key(os.path.basename(path))
+    target = storage.writable_path(key)
+    try:
+        os.link(path, target)
+    except FileExistsError:
+        # Rodada anterior interrompida entre o link e o commit
+        pass
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Diretório antigo em outro sistema de arquivos: copia e renomeia
+        partial_path = temporary_path(target)
+        shutil.copy2(path, partial_path)
+        os.replace(partial_path, target)
+    return key
+
+
+def remove_legacy_file(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def reshard(
+    session_factory: Callable[[], Session] = WorkerSession,
+    workers: int = 4,
+    batch_size: int = 500,
+) -> ReshardReport:
+    report = ReshardReport()
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            with session_factory() as session:
+                images = (
+                    session.execute(
+                        select(Image)
+                        .where(
+                            Image.id > last_id,
+                            Image.url.startswith('/'),
+                            Image.status.in_(FINISHED_STATUSES),
+                            ~_pending_derivatives(Image.id),
+                        )
+                        .order_by(Image.id)
+                        .limit(batch_size)
+                    )
+                    .scalars()
+                    .all()
+                )
+                if not images:
+                    return report
+                last_id = images[-1].id
+
+                legacy_paths = [image.url for image in images]
+                keys = list(pool.map(link_into_shard, legacy_paths))
+                moved = {}
+                for image, path, key in zip(images, legacy_paths, keys):
+                    if key is None:
+                        report.missing += 1
+                        continue
+                    image.url = key
+                    moved[image.id] = path
+                session.commit()
+
+                # Derivação pedida entre a consulta e o commit ainda leva o
+                # caminho antigo: ele fica, é só outro link para o arquivo
+                busy = set(
+                    session.execute(
+                        select(Image.id).where(
+                            Image.id.in_(moved), _pending_derivatives(Image.id)
+                        )
+                    ).scalars()
+                )
+
+            list(
+                pool.map(
+                    remove_legacy_file,
+                    [path for id_, path in moved.items() if id_ not in busy],
+                )
+            )
+            report.moved += len(moved)
+            report.kept += len(busy)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    report = reshard(workers=args.workers, batch_size=args.batch_size)
+    print(
+        f'{report.moved} files moved to shards, '
+        f'{report.missing} missing on disk, '
+        f'{report.kept} old names kept for queued tasks'
+    )
+
+
+if __name__ == '__main__':
+    main()
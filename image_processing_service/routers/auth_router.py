@@ -8,15 +8,24 @@ from image_processing_service.schemas.user_schemas import UserCreateSchema
 from image_processing_service.security import (
     create_access_token,
 )
+from image_processing_service.services.exceptions import HashingBusyError
 from image_processing_service.services.user_service import (
     UserService,
     get_user_service,
 )
-from image_processing_service.utils.hashing import verify_password
+from image_processing_service.utils.hashing import verify_password_async
 
 auth_router = APIRouter()
 
 
+def busy_exception(error: HashingBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={'Retry-After': '1'},
+    )
+
+
 @auth_router.post(
     '/register',
     status_code=status.HTTP_201_CREATED,
@@ -30,6 +39,14 @@ auth_router = APIRouter()
                 }
             },
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            'description': 'Too many concurrent password checks',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Password hashing is saturated.'}
+                }
+            },
+        },
     },
 )
 async def register(
@@ -43,6 +60,8 @@ async def register(
             status_code=status.HTTP_409_CONFLICT,
             detail='Username already exists',
         )
+    except HashingBusyError as e:
+        raise busy_exception(e)
 
     access_token = create_access_token(data={'sub': user.username})
 
@@ -62,6 +81,14 @@ async def register(
                 }
             },
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            'description': 'Too many concurrent password checks',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Password hashing is saturated.'}
+                }
+            },
+        },
     },
 )
 async def login(
@@ -70,7 +97,14 @@ async def login(
 ):
     user = await user_service.get_user(login_data.username)
 
-    if not user or not verify_password(login_data.password, user.password):
+    try:
+        valid = user is not None and await verify_password_async(
+            login_data.password, user.password
+        )
+    except HashingBusyError as e:
+        raise busy_exception(e)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Incorrect username or password',
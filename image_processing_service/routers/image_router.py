@@ -1,35 +1,166 @@
+import asyncio
+import logging
 import os
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Query,
     Request,
+    Response,
     UploadFile,
     status,
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import (
+    FileResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
+from limits import parse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from image_processing_service.models import User
-from image_processing_service.schemas.image_schemas import ImageSchema
+from image_processing_service.models import (
+    Image,
+    ImageStatus,
+    UploadSession,
+    User,
+)
+from image_processing_service.schemas.image_schemas import (
+    BatchSchema,
+    ImageSchema,
+    JobStatsSchema,
+    JobStatusSchema,
+    UploadSessionCreateSchema,
+    UploadSessionSchema,
+)
 from image_processing_service.schemas.image_transform_schemas import (
+    BatchTransformationSchema,
+    RenditionsSchema,
     TransformationSchema,
 )
 from image_processing_service.security import get_current_user
 from image_processing_service.services.exceptions import (
+    ExecutorBusyError,
     ImageSaveError,
     InvalidImageError,
+    InvalidTransformationError,
+    UploadOffsetError,
+    UploadTooLargeError,
 )
 from image_processing_service.services.image_service import (
     ImageService,
     get_image_service,
 )
+from image_processing_service.services.job_notifier import (
+    JobNotifier,
+    get_job_notifier,
+)
+from image_processing_service.services.upload_service import (
+    UploadService,
+    get_upload_service,
+    staged_bytes,
+)
+from image_processing_service.settings import settings
+from image_processing_service.storage import storage
+from image_processing_service.utils.http import (
+    image_file_response,
+    media_type,
+)
 
+logger = logging.getLogger(__name__)
 image_router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
+# Lotes são limitados pelo número de imagens, não pelo número de chamadas
+batch_rate_limit = parse(settings.BATCH_RATE_LIMIT)
+
+queue_full_response = {
+    'description': 'Processing queue is full',
+    'content': {
+        'application/json': {
+            'example': {'detail': 'Processing queue is full.'}
+        }
+    },
+}
+
+
+def queue_full_exception(error: ExecutorBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={'Retry-After': '1'},
+    )
+
+
+async def create_upload_renditions(image_service: ImageService, image: Image):
+    if not settings.UPLOAD_RENDITIONS:
+        return
+    try:
+        await image_service.create_renditions(
+            image, settings.UPLOAD_RENDITIONS
+        )
+    except ExecutorBusyError:
+        # O upload já foi salvo; as renditions podem ser pedidas depois
+        logger.warning('Skipping upload renditions for image %s', image.id)
+
+
+def upload_session_response(
+    upload: UploadSession, offset: int
+) -> UploadSessionSchema:
+    return UploadSessionSchema(
+        id=upload.id,
+        filename=upload.filename,
+        size=upload.size,
+        offset=offset,
+        chunk_size=settings.UPLOAD_SESSION_CHUNK_SIZE,
+        expires_at=upload.expires_at,
+    )
+
+
+upload_session_not_found_response = {
+    'description': 'Upload session not found or expired',
+    'content': {
+        'application/json': {'example': {'detail': 'Upload session not found'}}
+    },
+}
+
+
+async def download_response(image: Image, request: Request) -> Response:
+    # No S3 o cliente baixa direto do bucket, sem passar pela API
+    url = await asyncio.to_thread(
+        storage.presigned_url, image.url, image.filename, media_type(image)
+    )
+    if url:
+        return RedirectResponse(
+            url, status_code=status.HTTP_307_TEMPORARY_REDIRECT
+        )
+
+    try:
+        path = storage.path(image.url)
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Image file not found',
+        )
+    return image_file_response(image, path, stat_result, request.headers)
+
+
+async def get_upload_session_or_404(
+    session_id: str, user: User, upload_service: UploadService
+) -> UploadSession:
+    upload = await upload_service.get_session(
+        session_id=session_id, user_id=user.id
+    )
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Upload session not found',
+        )
+    return upload
 
 
 @image_router.post(
@@ -45,6 +176,17 @@ limiter = Limiter(key_func=get_remote_address)
                 }
             },
         },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            'description': 'File or image dimensions above the limits',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'Image exceeds the maximum of 50000000'
+                        ' pixels.'
+                    }
+                }
+            },
+        },
         status.HTTP_500_INTERNAL_SERVER_ERROR: {
             'description': 'Error while saving the image',
             'content': {
@@ -66,18 +208,255 @@ async def upload_image(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
     except ImageSaveError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
+    await create_upload_renditions(image_service, image)
     return image
 
 
+@image_router.post(
+    '/images/uploads',
+    status_code=status.HTTP_201_CREATED,
+    response_model=UploadSessionSchema,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            'description': 'Invalid image',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Only images are allowed.'}
+                }
+            },
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            'description': 'File above the resumable upload limit',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'File exceeds the maximum upload size of'
+                        ' 1073741824 bytes.'
+                    }
+                }
+            },
+        },
+    },
+)
+async def create_upload_session(
+    user: Annotated[User, Depends(get_current_user)],
+    upload_service: Annotated[UploadService, Depends(get_upload_service)],
+    upload: UploadSessionCreateSchema,
+):
+    try:
+        new_upload = await upload_service.create_session(
+            user_id=user.id,
+            filename=upload.filename,
+            content_type=upload.content_type,
+            size=upload.size,
+        )
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+
+    return upload_session_response(new_upload, 0)
+
+
+@image_router.get(
+    '/images/uploads/{session_id}',
+    response_model=UploadSessionSchema,
+    responses={status.HTTP_404_NOT_FOUND: upload_session_not_found_response},
+)
+async def get_upload_session(
+    session_id: str,
+    user: Annotated[User, Depends(get_current_user)],
+    upload_service: Annotated[UploadService, Depends(get_upload_service)],
+):
+    upload = await get_upload_session_or_404(session_id, user, upload_service)
+    return upload_session_response(upload, staged_bytes(upload))
+
+
+@image_router.put(
+    '/images/uploads/{session_id}',
+    response_model=UploadSessionSchema,
+    responses={
+        status.HTTP_404_NOT_FOUND: upload_session_not_found_response,
+        status.HTTP_409_CONFLICT: {
+            'description': 'Chunk does not start at the current offset',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'Chunk must start at offset 8388608, not 0.'
+                    }
+                }
+            },
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            'description': 'Chunk above the chunk size or the declared size',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'Chunk exceeds the limit of 8388608 bytes.'
+                    }
+                }
+            },
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            'description': 'The first bytes are not a supported image',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Unsupported image format.'}
+                }
+            },
+        },
+    },
+)
+async def upload_chunk(
+    session_id: str,
+    offset: Annotated[int, Query(ge=0)],
+    user: Annotated[User, Depends(get_current_user)],
+    upload_service: Annotated[UploadService, Depends(get_upload_service)],
+    request: Request,
+):
+    """Corpo cru (sem multipart) gravado a partir de ``offset``."""
+    upload = await get_upload_session_or_404(session_id, user, upload_service)
+
+    try:
+        new_offset = await upload_service.write_chunk(
+            upload, offset, request.stream()
+        )
+    except UploadOffsetError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(e)
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+
+    return upload_session_response(upload, new_offset)
+
+
+@image_router.post(
+    '/images/uploads/{session_id}/complete',
+    status_code=status.HTTP_201_CREATED,
+    response_model=ImageSchema,
+    responses={
+        status.HTTP_404_NOT_FOUND: upload_session_not_found_response,
+        status.HTTP_409_CONFLICT: {
+            'description': 'Not all bytes were uploaded',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'Upload is incomplete: 8388608 of 314572800'
+                        ' bytes.'
+                    }
+                }
+            },
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            'description': 'Invalid image',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Invalid image file.'}
+                }
+            },
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            'description': 'Image dimensions above the limits',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'Image exceeds the maximum of 50000000'
+                        ' pixels.'
+                    }
+                }
+            },
+        },
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {
+            'description': 'Error while saving the image',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Error while saving the image'}
+                }
+            },
+        },
+    },
+)
+async def complete_upload(
+    session_id: str,
+    user: Annotated[User, Depends(get_current_user)],
+    upload_service: Annotated[UploadService, Depends(get_upload_service)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+):
+    upload = await get_upload_session_or_404(session_id, user, upload_service)
+
+    try:
+        image = await upload_service.complete(upload)
+    except UploadOffsetError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(e)
+        )
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except ImageSaveError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+    await create_upload_renditions(image_service, image)
+    return image
+
+
+@image_router.delete(
+    '/images/uploads/{session_id}',
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_404_NOT_FOUND: upload_session_not_found_response},
+)
+async def delete_upload_session(
+    session_id: str,
+    user: Annotated[User, Depends(get_current_user)],
+    upload_service: Annotated[UploadService, Depends(get_upload_service)],
+):
+    upload = await get_upload_session_or_404(session_id, user, upload_service)
+    await upload_service.delete_session(upload)
+
+
 @image_router.post(
     '/images/{id}/transform',
     response_model=ImageSchema,
     responses={
+        status.HTTP_200_OK: {
+            'description': (
+                'Derived image; with download=true and a transformation that'
+                ' finished inline, the file itself'
+            ),
+            'content': {'image/*': {}},
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: queue_full_response,
         status.HTTP_404_NOT_FOUND: {
             'description': 'Image not found',
             'content': {
@@ -103,12 +482,13 @@ async def upload_image(
     },
 )
 @limiter.limit('5/minute')
-async def transform_image(
+async def transform_image(  # noqa: PLR0913, PLR0917
     id: int,
     user: Annotated[User, Depends(get_current_user)],
     image_service: Annotated[ImageService, Depends(get_image_service)],
     transformations: TransformationSchema,
     request: Request,
+    download: bool = False,
 ):
     image = await image_service.get_image_by_id_and_user(
         image_id=id, user_id=user.id
@@ -116,13 +496,258 @@ async def transform_image(
     if not image:
         raise HTTPException(status_code=404, detail='Image not found')
 
-    new_image = await image_service.apply_transformations(
-        image, transformations
-    )
+    try:
+        new_image = await image_service.apply_transformations(
+            image, transformations
+        )
+    except InvalidTransformationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+    except ExecutorBusyError as e:
+        raise queue_full_exception(e)
+
+    # Transformações baratas terminam na própria requisição: com download
+    # os bytes já vão na resposta, sem precisar de um GET depois
+    if download and new_image.status == ImageStatus.SUCCEEDED:
+        return await download_response(new_image, request)
 
     return new_image
 
 
+@image_router.post(
+    '/images/{id}/renditions',
+    response_model=list[ImageSchema],
+    responses={
+        status.HTTP_503_SERVICE_UNAVAILABLE: queue_full_response,
+        status.HTTP_404_NOT_FOUND: {
+            'description': 'Image not found',
+            'content': {
+                'application/json': {'example': {'detail': 'Image not found'}}
+            },
+        },
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            'description': 'Rate limit exceeded',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Rate limit exceeded'}
+                }
+            },
+        },
+    },
+)
+@limiter.limit('5/minute')
+async def create_renditions(
+    id: int,
+    user: Annotated[User, Depends(get_current_user)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+    renditions: RenditionsSchema,
+    request: Request,
+):
+    image = await image_service.get_image_by_id_and_user(
+        image_id=id, user_id=user.id
+    )
+    if not image:
+        raise HTTPException(status_code=404, detail='Image not found')
+
+    try:
+        return await image_service.create_renditions(
+            image, renditions.renditions
+        )
+    except ExecutorBusyError as e:
+        raise queue_full_exception(e)
+
+
+@image_router.post(
+    '/images/transform:batch',
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BatchSchema,
+    responses={
+        status.HTTP_503_SERVICE_UNAVAILABLE: queue_full_response,
+        status.HTTP_404_NOT_FOUND: {
+            'description': 'Image not found',
+            'content': {
+                'application/json': {'example': {'detail': 'Image not found'}}
+            },
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            'description': 'Too many images in the batch',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Batch exceeds 500 images.'}
+                }
+            },
+        },
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            'description': 'Rate limit exceeded',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'Rate limit exceeded'}
+                }
+            },
+        },
+    },
+)
+async def transform_images_batch(
+    user: Annotated[User, Depends(get_current_user)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+    batch: BatchTransformationSchema,
+    request: Request,
+):
+    too_large = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f'Batch exceeds {settings.BATCH_MAX_IMAGES} images.',
+    )
+    # Antes da consulta, que traz no máximo BATCH_MAX_IMAGES + 1 imagens
+    if (
+        batch.image_ids is not None
+        and len(set(batch.image_ids)) > settings.BATCH_MAX_IMAGES
+    ):
+        raise too_large
+
+    batch_filter = batch.filter
+    images = await image_service.get_batch_originals(
+        user_id=user.id,
+        image_ids=batch.image_ids,
+        uploaded_after=batch_filter and batch_filter.uploaded_after,
+        uploaded_before=batch_filter and batch_filter.uploaded_before,
+    )
+
+    missing_ids = batch.image_ids is not None and len(images) != len(
+        set(batch.image_ids)
+    )
+    if not images or missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Image not found'
+        )
+
+    if len(images) > settings.BATCH_MAX_IMAGES:
+        raise too_large
+
+    if not limiter.limiter.hit(
+        batch_rate_limit,
+        'transform:batch',
+        get_remote_address(request),
+        cost=len(images),
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail='Rate limit exceeded',
+        )
+
+    try:
+        new_batch = await image_service.apply_transformations_batch(
+            images, batch.transformations, user_id=user.id
+        )
+    except InvalidTransformationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+    except ExecutorBusyError as e:
+        raise queue_full_exception(e)
+    progress, image_ids = await image_service.get_batch_progress(new_batch.id)
+
+    return BatchSchema(
+        id=new_batch.id,
+        created_at=new_batch.created_at,
+        total=new_batch.total,
+        progress=progress,
+        image_ids=image_ids,
+    )
+
+
+@image_router.get(
+    '/images/batches/{batch_id}',
+    response_model=BatchSchema,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            'description': 'Batch not found',
+            'content': {
+                'application/json': {'example': {'detail': 'Batch not found'}}
+            },
+        },
+    },
+)
+async def get_batch(
+    batch_id: str,
+    user: Annotated[User, Depends(get_current_user)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+):
+    batch = await image_service.get_batch(batch_id=batch_id, user_id=user.id)
+
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Batch not found'
+        )
+
+    progress, image_ids = await image_service.get_batch_progress(batch.id)
+
+    return BatchSchema(
+        id=batch.id,
+        created_at=batch.created_at,
+        total=batch.total,
+        progress=progress,
+        image_ids=image_ids,
+    )
+
+
+@image_router.get(
+    '/images/stats',
+    response_model=dict[str, JobStatsSchema],
+)
+async def get_job_stats(
+    user: Annotated[User, Depends(get_current_user)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+):
+    return await image_service.get_job_stats(user_id=user.id)
+
+
+@image_router.get(
+    '/images/events',
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            'description': 'Server-sent events, one per finished job',
+            'content': {
+                'text/event-stream': {
+                    'example': (
+                        'id: 42\nevent: succeeded\n'
+                        'data: {"id": 42, "status": "succeeded", '
+                        '"error": null}\n\n'
+                    )
+                }
+            },
+        },
+        status.HTTP_404_NOT_FOUND: {
+            'description': 'Image not found',
+            'content': {
+                'application/json': {'example': {'detail': 'Image not found'}}
+            },
+        },
+    },
+)
+async def stream_image_events(
+    ids: Annotated[list[int], Query(min_length=1)],
+    user: Annotated[User, Depends(get_current_user)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+    job_notifier: Annotated[JobNotifier, Depends(get_job_notifier)],
+):
+    images = await image_service.get_images_by_ids_and_user(
+        image_ids=ids, user_id=user.id
+    )
+
+    if len(images) != len(set(ids)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Image not found'
+        )
+
+    return StreamingResponse(
+        job_notifier.stream(images, heartbeat=settings.JOB_EVENTS_HEARTBEAT),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @image_router.get(
     '/images/{id}',
     response_model=ImageSchema,
@@ -152,6 +777,35 @@ async def get_image(
     return image
 
 
+@image_router.get(
+    '/images/{id}/status',
+    response_model=JobStatusSchema,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            'description': 'Image not found',
+            'content': {
+                'application/json': {'example': {'detail': 'Image not found'}}
+            },
+        },
+    },
+)
+async def get_image_status(
+    id: int,
+    user: Annotated[User, Depends(get_current_user)],
+    image_service: Annotated[ImageService, Depends(get_image_service)],
+):
+    image = await image_service.get_image_by_id_and_user(
+        image_id=id, user_id=user.id
+    )
+
+    if not image:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='Image not found'
+        )
+
+    return image
+
+
 @image_router.get(
     '/images',
     response_model=list[ImageSchema],
@@ -166,21 +820,43 @@ async def get_image(
         },
     },
 )
-async def list_images(
+async def list_images(  # noqa: PLR0913, PLR0917
     user: Annotated[User, Depends(get_current_user)],
     image_service: Annotated[ImageService, Depends(get_image_service)],
+    response: Response,
     page: int = 1,
     limit: int = 10,
+    after: str | None = None,
+    originals_only: bool = False,
+    original_image_id: int | None = None,
+    uploaded_after: datetime | None = None,
+    uploaded_before: datetime | None = None,
 ):
-    if page < 1 or limit < 1:
+    # Com cursor a posição vem dele; page só vale para a paginação antiga
+    if page < 1 or limit < 1 or (after is not None and page != 1):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Invalid pagination parameters',
         )
 
-    images = await image_service.get_images_for_user(
-        user_id=user.id, page=page, limit=limit
-    )
+    try:
+        images, next_cursor = await image_service.get_images_for_user(
+            user_id=user.id,
+            page=page,
+            limit=limit,
+            after=after,
+            originals_only=originals_only,
+            original_image_id=original_image_id,
+            uploaded_after=uploaded_after,
+            uploaded_before=uploaded_before,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
     return images
 
 
@@ -188,6 +864,16 @@ async def list_images(
     '/images/{id}/download',
     response_class=FileResponse,
     responses={
+        status.HTTP_206_PARTIAL_CONTENT: {
+            'description': 'Requested byte range of the file',
+            'content': {'image/*': {}},
+        },
+        status.HTTP_304_NOT_MODIFIED: {
+            'description': 'If-None-Match or If-Modified-Since matched',
+        },
+        status.HTTP_307_TEMPORARY_REDIRECT: {
+            'description': 'Presigned URL of the file (S3 storage backend)',
+        },
         status.HTTP_404_NOT_FOUND: {
             'description': 'Image not found',
             'content': {
@@ -202,13 +888,28 @@ async def list_images(
                 }
             },
         },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            'description': 'Transformation failed',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'detail': 'Transformation failed: cannot identify '
+                        'image file'
+                    }
+                }
+            },
+        },
     },
 )
 async def download_image(
     id: int,
     user: Annotated[User, Depends(get_current_user)],
     image_service: Annotated[ImageService, Depends(get_image_service)],
+    request: Request,
 ):
+    """Arquivo com ETag e Last-Modified; responde 304 a requisições
+    condicionais e 206 a ``Range``. No backend S3, redireciona para uma
+    URL pré-assinada."""
     image = await image_service.get_image_by_id_and_user(
         image_id=id, user_id=user.id
     )
@@ -216,14 +917,16 @@ async def download_image(
     if not image:
         raise HTTPException(status_code=404, detail='Image not found')
 
-    if not os.path.exists(image.url):
+    if image.status == ImageStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f'Transformation failed: {image.error}',
+        )
+
+    if image.status != ImageStatus.SUCCEEDED:
         raise HTTPException(
             status_code=status.HTTP_202_ACCEPTED,
             detail='Transformations in progress.',
         )
 
-    return FileResponse(
-        path=image.url,
-        media_type='application/octet-stream',
-        filename=image.filename,
-    )
+    return await download_response(image, request)
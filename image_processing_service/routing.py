@@ -0,0 +1,54 @@
+"""Afinidade dos tasks no Celery.
+
+Os tasks de uma mesma original vão sempre para a mesma fila, e portanto
+para o mesmo worker, onde a original decodificada já pode estar no cache
+(``decoded_image_cache``). A fila é escolhida por hash consistente: mudar
+TRANSFORM_QUEUES remapeia só ~1/N das originais, e o cache dos demais
+workers continua valendo.
+"""
+
+import bisect
+import hashlib
+
+from image_processing_service.settings import settings
+
+# Pontos de cada fila no anel: mais pontos, distribuição mais uniforme
+REPLICAS = 100
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, nodes: list[str], replicas: int = REPLICAS):
+        points = sorted(
+            (_hash(f'{node}#{replica}'), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+def create_ring() -> HashRing | None:
+    if settings.TRANSFORM_QUEUES <= 0:
+        return None
+    return HashRing([
+        f'{settings.TRANSFORM_QUEUE_PREFIX}.{index}'
+        for index in range(settings.TRANSFORM_QUEUES)
+    ])
+
+
+transform_ring = create_ring()
+
+
+def transform_queue(original_image_key: str) -> str | None:
+    """Fila dos tasks desta original, ou ``None`` para a fila padrão."""
+    if transform_ring is None:
+        return None
+    return transform_ring.node_for(original_image_key)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ImageSchema(BaseModel):
@@ -12,3 +12,60 @@ class ImageSchema(BaseModel):
     uploaded_at: datetime
     user_id: int
     original_image_id: int | None = None
+    status: str
+    error: str | None = None
+    width: int | None = None
+    height: int | None = None
+    format: str | None = None
+    mode: str | None = None
+    frames: int | None = None
+    orientation: int | None = None
+    size_bytes: int | None = None
+    sha256: str | None = None
+
+
+class JobStatusSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    status: str
+    queued_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    queue_wait_seconds: float | None = None
+    processing_seconds: float | None = None
+
+
+class DurationStatsSchema(BaseModel):
+    avg: float | None = None
+    max: float | None = None
+
+
+class JobStatsSchema(BaseModel):
+    count: int
+    queue_wait_seconds: DurationStatsSchema
+    processing_seconds: DurationStatsSchema
+
+
+class BatchSchema(BaseModel):
+    id: str
+    created_at: datetime
+    total: int
+    progress: dict[str, int]
+    image_ids: list[int]
+
+
+class UploadSessionCreateSchema(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: str
+    size: int = Field(gt=0)  # bytes do arquivo completo
+
+
+class UploadSessionSchema(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int
+    chunk_size: int
+    expires_at: datetime
@@ -1,23 +1,34 @@
+from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
 class ResizeOptions(BaseModel):
-    width: int
-    height: int
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
 
 
 class CropOptions(BaseModel):
-    width: int
-    height: int
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
     x: int
     y: int
 
 
+class TintOptions(BaseModel):
+    color: str = Field(pattern=r'^#[0-9a-fA-F]{6}$')  # ex: '#ff8800'
+    strength: float = Field(default=0.5, ge=0, le=1)
+
+
 class FilterOptions(BaseModel):
     grayscale: Optional[bool] = False
     sepia: Optional[bool] = False
+    brightness: Optional[float] = Field(default=None, ge=0)  # 1.0 = original
+    contrast: Optional[float] = Field(default=None, ge=0)  # 1.0 = original
+    saturation: Optional[float] = Field(default=None, ge=0)  # 1.0 = original
+    tint: Optional[TintOptions] = None
+    invert: Optional[bool] = False
 
 
 class TransformationSchema(BaseModel):
@@ -26,3 +37,37 @@ class TransformationSchema(BaseModel):
     rotate: Optional[int] = None  # graus
     format: Optional[str] = None  # ex: 'jpeg', 'png'
     filters: Optional[FilterOptions] = None
+
+
+class RenditionOptions(BaseModel):
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
+    format: Optional[str] = None  # ex: 'jpeg', 'webp'
+
+    def as_transformation(self) -> TransformationSchema:
+        return TransformationSchema(
+            resize=ResizeOptions(width=self.width, height=self.height),
+            format=self.format,
+        )
+
+
+class RenditionsSchema(BaseModel):
+    renditions: list[RenditionOptions] = Field(min_length=1, max_length=20)
+
+
+class BatchFilterOptions(BaseModel):
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+
+class BatchTransformationSchema(BaseModel):
+    # Ou uma lista de ids, ou um filtro sobre as imagens originais
+    image_ids: Optional[list[int]] = Field(default=None, min_length=1)
+    filter: Optional[BatchFilterOptions] = None
+    transformations: TransformationSchema
+
+    @model_validator(mode='after')
+    def check_selection(self):
+        if (self.image_ids is None) == (self.filter is None):
+            raise ValueError('Provide either image_ids or filter.')
+        return self
@@ -1,3 +1,4 @@
+import time
 from datetime import datetime, timedelta
 from typing import Annotated
 from zoneinfo import ZoneInfo
@@ -5,9 +6,10 @@ from zoneinfo import ZoneInfo
 from fastapi import Depends, status
 from fastapi.exceptions import HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import DecodeError, decode, encode
+from jwt import InvalidTokenError, decode, encode
 from pwdlib import PasswordHash
 
+from image_processing_service.cache import token_cache, user_cache
 from image_processing_service.services.user_service import (
     UserService,
     get_user_service,
@@ -40,20 +42,32 @@ async def get_current_user(
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
-    try:
-        payload: dict = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        subject_username = payload.get('sub')
+    subject_username = token_cache.get(token)
+    if subject_username is None:
+        try:
+            payload: dict = decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            subject_username = payload.get('sub')
 
-        if not subject_username:
+            if not subject_username:
+                raise credentials_exception
+        except InvalidTokenError:
             raise credentials_exception
-    except DecodeError:
-        raise credentials_exception
 
-    user = await user_service.get_user(subject_username)
+        # O cache nunca aceita o token depois que ele expira
+        ttl = payload['exp'] - time.time() if 'exp' in payload else None
+        token_cache.set(token, subject_username, ttl)
 
+    user = user_cache.get(subject_username)
     if user is None:
-        raise credentials_exception
+        user = await user_service.get_user(subject_username)
+
+        if user is None:
+            raise credentials_exception
+
+        # Sessões usam expire_on_commit=False: os atributos continuam
+        # carregados depois que a sessão da requisição fecha
+        user_cache.set(subject_username, user)
 
     return user
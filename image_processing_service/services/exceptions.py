@@ -2,5 +2,25 @@ class InvalidImageError(Exception):
     """Levantada quando o arquivo não é uma imagem."""
 
 
+class UploadTooLargeError(Exception):
+    """Levantada quando o upload excede os limites de bytes ou pixels."""
+
+
+class UploadOffsetError(Exception):
+    """Levantada quando o chunk não começa no offset atual da sessão."""
+
+
 class ImageSaveError(Exception):
     """Levantada quando ocorre erro ao salvar o arquivo."""
+
+
+class InvalidTransformationError(Exception):
+    """Levantada quando a transformação não cabe na imagem."""
+
+
+class HashingBusyError(Exception):
+    """Levantada quando o pool de hashing de senhas está saturado."""
+
+
+class ExecutorBusyError(Exception):
+    """Levantada quando a fila do executor local está cheia."""
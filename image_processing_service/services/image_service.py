@@ -1,23 +1,175 @@
+import asyncio
+import base64
+import binascii
+import contextlib
+import hashlib
+import io
+import json
 import os
+import time
 import uuid
-from typing import Annotated
+from datetime import datetime
+from functools import partial
+from typing import Annotated, Any, BinaryIO, Callable
+from zoneinfo import ZoneInfo
 
-import aiofiles
 from fastapi import Depends, UploadFile
+from PIL import Image as PILImage
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import select
+from sqlalchemy.sql import func, select, tuple_
 
 from image_processing_service.database import get_session
-from image_processing_service.models import Image
+from image_processing_service.executor import inline_pool, task_executor
+from image_processing_service.metrics import metrics
+from image_processing_service.models import (
+    Batch,
+    BatchImage,
+    Image,
+    ImageStatus,
+)
+from image_processing_service.processing.decode import estimate_cost
+from image_processing_service.processing.metadata import (
+    HEADER_BYTES,
+    read_header_size,
+    read_metadata,
+    sniff_format,
+)
+from image_processing_service.processing.planner import plan_transformations
 from image_processing_service.schemas.image_transform_schemas import (
+    RenditionOptions,
     TransformationSchema,
 )
 from image_processing_service.services.exceptions import (
     ImageSaveError,
     InvalidImageError,
+    InvalidTransformationError,
+    UploadTooLargeError,
+)
+from image_processing_service.services.transform_coalescer import (
+    transform_coalescer,
 )
 from image_processing_service.settings import settings
-from image_processing_service.tasks import apply_transformations_async
+from image_processing_service.storage import scratch_path, shard_key, storage
+from image_processing_service.tasks import (
+    apply_transformations_async,
+    generate_renditions_async,
+    transform_stored_image,
+)
+from image_processing_service.utils.files import ingest_upload, sha256_file
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB por vez
+
+
+def canonical_transformations(options: TransformationSchema) -> dict:
+    """Forma normalizada da transformação: duas requisições que geram a
+    mesma imagem produzem o mesmo dicionário."""
+    canonical = options.model_dump(mode='json', exclude_none=True)
+
+    canonical['format'] = (options.format or 'jpeg').lower()
+
+    # O Pillow já faz angle % 360 e ignora rotação zero
+    rotate = canonical.pop('rotate', 0) % 360
+    if rotate:
+        canonical['rotate'] = rotate
+
+    filters = {
+        name: value
+        for name, value in canonical.pop('filters', {}).items()
+        if value is not False
+    }
+    if filters.get('tint'):
+        filters['tint']['color'] = filters['tint']['color'].lower()
+    if filters:
+        canonical['filters'] = filters
+
+    return canonical
+
+
+def transformation_key(original_image_id: int, transformations: dict) -> str:
+    payload = json.dumps(
+        {'original': original_image_id, 'transformations': transformations},
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def encode_cursor(image: Image) -> str:
+    return base64.urlsafe_b64encode(str(image.id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid cursor.')
+
+
+def pixel_limit_error() -> UploadTooLargeError:
+    return UploadTooLargeError(
+        f'Image exceeds the maximum of {settings.MAX_IMAGE_PIXELS} pixels.'
+    )
+
+
+def check_pixels(width: int, height: int):
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        raise pixel_limit_error()
+
+
+def remove_file(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def check_head(head: bytes):
+    """Assinatura e dimensões declaradas no início do arquivo."""
+    if sniff_format(head) is None:
+        raise InvalidImageError('Unsupported image format.')
+    try:
+        size = read_header_size(head)
+    except PILImage.DecompressionBombError:
+        raise pixel_limit_error()
+    if size:
+        check_pixels(*size)
+
+
+def inspect_upload(path: str) -> dict:
+    """Metadados do arquivo gravado; o cabeçalho pode não ter cabido no
+    primeiro chunk, então os limites são conferidos de novo aqui."""
+    try:
+        metadata = read_metadata(path)
+    except PILImage.DecompressionBombError:
+        raise pixel_limit_error()
+    except OSError:
+        raise InvalidImageError('Invalid image file.')
+    check_pixels(metadata['width'], metadata['height'])
+    return metadata
+
+
+def store_upload(source: BinaryIO) -> tuple[str, dict]:
+    """Grava o upload num rascunho local e lê seus metadados, numa única
+    ida à thread."""
+    path = scratch_path()
+    try:
+        _, sha256 = ingest_upload(source, path, settings.MAX_UPLOAD_BYTES)
+        return path, {**inspect_upload(path), 'sha256': sha256}
+    except BaseException:
+        remove_file(path)
+        raise
+
+
+def store_staged(path: str) -> tuple[str, dict]:
+    """Metadados de um upload retomável completo, ainda no staging."""
+    with open(path, 'rb') as staged:
+        check_head(staged.read(UPLOAD_CHUNK_SIZE))
+    return path, {**inspect_upload(path), 'sha256': sha256_file(path)}
+
+
+def _stored_cost(key: str, transformations: dict) -> int:
+    """Custo estimado pelo cabeçalho do arquivo guardado."""
+    head = storage.read_range(key, 0, HEADER_BYTES)
+    return estimate_cost(io.BytesIO(head), transformations)
 
 
 class ImageService:
@@ -25,24 +177,55 @@ class ImageService:
         self.session = session
 
     async def save_image(self, file: UploadFile, user_id: int) -> Image:
+        """Valida o upload o mais cedo possível: assinatura e dimensões no
+        primeiro chunk, tamanho antes de copiar. Arquivos recusados no meio
+        do caminho são apagados."""
         if not file.content_type.startswith('image/'):
             raise InvalidImageError('Only images are allowed.')
 
-        file_ext = os.path.splitext(file.filename)[1]
-        filename = f'{uuid.uuid4()}{file_ext}'
-        file_path = os.path.join(settings.UPLOAD_DIR, filename)
+        check_head(await file.read(UPLOAD_CHUNK_SIZE))
+        return await self._store_upload(
+            store_upload, file.file, file.filename, user_id
+        )
+
+    async def save_staged_image(
+        self, staging_path: str, filename: str, user_id: int
+    ) -> Image:
+        """Registra um upload retomável já completo em ``staging_path``."""
+        return await self._store_upload(
+            store_staged, staging_path, filename, user_id
+        )
+
+    async def _store_upload(
+        self,
+        prepare: Callable[[Any], tuple[str, dict]],
+        source: Any,
+        filename: str,
+        user_id: int,
+    ) -> Image:
+        """``prepare`` valida e deixa o arquivo num caminho local; daí ele
+        vai para o armazenamento (rename no local, multipart no S3)."""
+        storage_key = storage.new_key(os.path.splitext(filename)[1])
 
         try:
-            async with aiofiles.open(file_path, 'wb') as buffer:
-                while chunk := await file.read(1024 * 1024):  # 1MB por vez
-                    await buffer.write(chunk)
+            path, metadata = await asyncio.to_thread(prepare, source)
+        except (InvalidImageError, UploadTooLargeError):
+            raise
         except Exception:
             raise ImageSaveError('Error while saving the image.')
 
+        try:
+            await asyncio.to_thread(storage.store, path, storage_key)
+        except Exception:
+            raise ImageSaveError('Error while saving the image.')
+        finally:
+            remove_file(path)
+
         image = Image(
-            filename=file.filename,
-            url=file_path,
+            filename=filename,
+            url=storage_key,
             user_id=user_id,
+            **metadata,
         )
         self.session.add(image)
         await self.session.commit()
@@ -58,49 +241,448 @@ class ImageService:
         )
         return result.scalar_one_or_none()
 
-    async def get_images_for_user(
-        self, user_id: int, page: int, limit: int
+    async def get_images_by_ids_and_user(
+        self, image_ids: list[int], user_id: int
     ) -> list[Image]:
+        result = await self.session.execute(
+            select(Image).where(
+                Image.id.in_(image_ids), Image.user_id == user_id
+            )
+        )
+        return result.scalars().all()
+
+    async def get_images_for_user(  # noqa: PLR0913, PLR0917
+        self,
+        user_id: int,
+        page: int,
+        limit: int,
+        after: str | None = None,
+        originals_only: bool = False,
+        original_image_id: int | None = None,
+        uploaded_after: datetime | None = None,
+        uploaded_before: datetime | None = None,
+    ) -> tuple[list[Image], str | None]:
+        """Imagens do usuário, mais recentes primeiro, e o cursor da próxima
+        página (``None`` na última).
+
+        Com ``after`` a página continua do cursor em vez de usar OFFSET, e o
+        custo não cresce com a profundidade.
+        """
         if page < 1 or limit < 1:
             raise ValueError('Page and limit must be greater than 0.')
 
-        offset = (page - 1) * limit
+        query = select(Image).where(Image.user_id == user_id)
+        if originals_only:
+            query = query.where(Image.original_image_id.is_(None))
+        if original_image_id is not None:
+            query = query.where(Image.original_image_id == original_image_id)
+        if uploaded_after:
+            query = query.where(Image.uploaded_at >= uploaded_after)
+        if uploaded_before:
+            query = query.where(Image.uploaded_at < uploaded_before)
+
+        if after is not None:
+            cursor_id = decode_cursor(after)
+            # uploaded_at vem do próprio banco para não depender do formato
+            # com que o SQLite guarda datetimes
+            cursor_uploaded_at = (
+                select(Image.uploaded_at)
+                .where(Image.id == cursor_id, Image.user_id == user_id)
+                .scalar_subquery()
+            )
+            query = query.where(
+                tuple_(Image.uploaded_at, Image.id)
+                < tuple_(cursor_uploaded_at, cursor_id)
+            )
+        else:
+            query = query.offset((page - 1) * limit)
+
+        # Um a mais que o pedido para saber se existe próxima página
         result = await self.session.execute(
-            select(Image)
-            .filter(Image.user_id == user_id)
-            .offset(offset)
-            .limit(limit)
+            query.order_by(Image.uploaded_at.desc(), Image.id.desc()).limit(
+                limit + 1
+            )
         )
-        return result.scalars().all()
+        images = result.scalars().all()
+        if len(images) > limit:
+            return images[:limit], encode_cursor(images[limit - 1])
+        return images, None
+
+    async def get_derived_image(
+        self, original_image_id: int, key: str
+    ) -> Image | None:
+        result = await self.session.execute(
+            select(Image).where(
+                Image.original_image_id == original_image_id,
+                Image.transformation_key == key,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get_job_stats(self, user_id: int) -> dict:
+        """Agrega espera em fila e tempo de processamento das derivadas."""
+        result = await self.session.execute(
+            select(
+                Image.status,
+                func.count(Image.id),
+                func.avg(Image.queue_wait_seconds),
+                func.max(Image.queue_wait_seconds),
+                func.avg(Image.processing_seconds),
+                func.max(Image.processing_seconds),
+            )
+            .where(
+                Image.user_id == user_id,
+                Image.original_image_id.is_not(None),
+            )
+            .group_by(Image.status)
+        )
+        return {
+            status: {
+                'count': count,
+                'queue_wait_seconds': {'avg': avg_wait, 'max': max_wait},
+                'processing_seconds': {'avg': avg_proc, 'max': max_proc},
+            }
+            for status, count, avg_wait, max_wait, avg_proc, max_proc in (
+                result.all()
+            )
+        }
 
     async def apply_transformations(
         self, image: Image, options: TransformationSchema
     ) -> Image:
-        original_image_path = image.url
-        format_ext = options.format or 'jpeg'
-        new_filename = f'{uuid.uuid4()}.{format_ext.lower()}'
-        new_image_path = os.path.join(settings.UPLOAD_DIR, new_filename)
+        """Cria a imagem derivada e enfileira o processamento.
 
-        new_image = Image(
-            filename=new_filename,
-            url=new_image_path,
-            user_id=image.user_id,
-            original_image_id=image.id,
-        )
+        Se a mesma transformação do mesmo original já foi pedida, pronta ou
+        ainda em andamento, devolve a imagem existente sem novo task.
+        """
+        transformations = canonical_transformations(options)
+        self.check_bounds(image, transformations)
+        # O rollback expira os objetos da sessão: guarda o id antes
+        image_id = image.id
+        key = transformation_key(image_id, transformations)
+
+        cached_image = await self.get_derived_image(image_id, key)
+        if cached_image:
+            metrics.increment('transform_cache_hits')
+            return cached_image
+
+        inline = await self._is_cheap(image, transformations)
+        if not inline:
+            transform_coalescer.ensure_capacity(1)
+        new_image = self._new_derived_image(image, transformations, key)
+        if inline:
+            new_image.status = ImageStatus.RUNNING
+            new_image.started_at = new_image.queued_at
+            new_image.queue_wait_seconds = 0.0
         self.session.add(new_image)
-        await self.session.commit()
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            # Outra requisição criou a mesma derivada entre o select e o
+            # commit: usa a dela (singleflight)
+            await self.session.rollback()
+            metrics.increment('transform_cache_hits')
+            return await self.get_derived_image(image_id, key)
         await self.session.refresh(new_image)
 
-        apply_transformations_async.delay(
-            original_image_path=original_image_path,
-            new_image_path=new_image_path,
-            transformations=options.model_dump(
-                exclude_unset=True, mode='json'
-            ),
+        metrics.increment('transform_cache_misses')
+        if inline:
+            metrics.increment('transform_path_inline')
+            return await self._transform_inline(
+                image.url, new_image, transformations
+            )
+
+        metrics.increment('transform_path_queued')
+        transform_coalescer.add(
+            image.url,
+            {
+                'image_id': new_image.id,
+                'new_image_key': new_image.url,
+                'transformations': transformations,
+            },
         )
 
         return new_image
 
+    @staticmethod
+    def check_bounds(image: Image, transformations: dict):
+        """Recusa crops fora da imagem (depois do resize, se houver)."""
+        crop = transformations.get('crop')
+        if not crop or image.width is None:
+            return
+
+        resize = transformations.get('resize')
+        width, height = (
+            (resize['width'], resize['height'])
+            if resize
+            else (image.width, image.height)
+        )
+        left, top = crop['x'], crop['y']
+        right, bottom = left + crop['width'], top + crop['height']
+        if not (0 <= left < right <= width and 0 <= top < bottom <= height):
+            raise InvalidTransformationError(
+                f'Crop box exceeds image bounds ({width}x{height}).'
+            )
+
+    @staticmethod
+    async def _is_cheap(image: Image, transformations: dict) -> bool:
+        if not settings.SYNC_TRANSFORM_MAX_PIXELS:
+            return False
+        if not inline_pool.available():
+            return False
+        if image.width is not None:
+            # Metadados do upload: nem precisa abrir o arquivo
+            cost = plan_transformations(
+                transformations,
+                (image.width, image.height),
+                image.mode or 'RGB',
+            ).estimated_pixels()
+        else:
+            try:
+                # Só o começo do arquivo (no S3, uma leitura por faixa),
+                # fora do event loop
+                cost = await asyncio.to_thread(
+                    _stored_cost, image.url, transformations
+                )
+            except OSError:
+                # Arquivo ilegível: o worker registra a falha como sempre
+                return False
+        return cost <= settings.SYNC_TRANSFORM_MAX_PIXELS
+
+    async def _transform_inline(
+        self, original_image_key: str, new_image: Image, transformations: dict
+    ) -> Image:
+        """Roda a transformação na requisição e grava o status final como o
+        worker gravaria. O cache de originais decodificadas é dos workers:
+        no processo da API ele só ocuparia memória."""
+        start = time.perf_counter()
+        try:
+            metadata = await inline_pool.run(
+                partial(transform_stored_image, cached=False),
+                original_image_key,
+                new_image.url,
+                transformations,
+            )
+        except Exception as e:
+            new_image.status = ImageStatus.FAILED
+            new_image.error = str(e)
+            new_image.transformation_key = None
+        else:
+            new_image.status = ImageStatus.SUCCEEDED
+            for field, value in metadata.items():
+                setattr(new_image, field, value)
+
+        new_image.finished_at = datetime.now(tz=ZoneInfo('UTC'))
+        new_image.processing_seconds = time.perf_counter() - start
+        await self.session.commit()
+        return new_image
+
+    async def create_renditions(
+        self, image: Image, renditions: list[RenditionOptions]
+    ) -> list[Image]:
+        """Cria uma imagem derivada por rendition e enfileira um único task,
+        que decodifica o original uma vez só."""
+        image_id = image.id
+        original_image_key = image.url
+        requested = []
+        for rendition in renditions:
+            transformations = canonical_transformations(
+                rendition.as_transformation()
+            )
+            requested.append((
+                transformations,
+                transformation_key(image_id, transformations),
+            ))
+
+        result = await self.session.execute(
+            select(Image).where(
+                Image.original_image_id == image_id,
+                Image.transformation_key.in_([key for _, key in requested]),
+            )
+        )
+        existing = {
+            derived.transformation_key: derived
+            for derived in result.scalars().all()
+        }
+
+        if any(key not in existing for _, key in requested):
+            transform_coalescer.ensure_capacity(1)
+
+        jobs = []
+        derived_images = []
+        for transformations, key in requested:
+            derived = existing.get(key)
+            if derived is None:
+                derived = self._new_derived_image(image, transformations, key)
+                self.session.add(derived)
+                existing[key] = derived
+                jobs.append((transformations, derived))
+            derived_images.append(derived)
+
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            # Corrida com outra requisição: tenta de novo pelo cache
+            await self.session.rollback()
+            image = await self.get_image_by_id_and_user(
+                image_id, derived_images[0].user_id
+            )
+            return await self.create_renditions(image, renditions)
+
+        metrics.increment('transform_cache_hits', len(requested) - len(jobs))
+        metrics.increment('transform_cache_misses', len(jobs))
+        if jobs:
+            task_executor.submit(
+                generate_renditions_async,
+                original_image_key=original_image_key,
+                renditions=[
+                    {
+                        'image_id': derived.id,
+                        'new_image_key': derived.url,
+                        'transformations': transformations,
+                    }
+                    for transformations, derived in jobs
+                ],
+            )
+
+        for derived in derived_images:
+            await self.session.refresh(derived)
+        return derived_images
+
+    async def get_batch_originals(
+        self,
+        user_id: int,
+        image_ids: list[int] | None = None,
+        uploaded_after: datetime | None = None,
+        uploaded_before: datetime | None = None,
+    ) -> list[Image]:
+        query = select(Image).where(Image.user_id == user_id)
+        if image_ids is not None:
+            query = query.where(Image.id.in_(image_ids))
+        else:
+            query = query.where(Image.original_image_id.is_(None))
+        if uploaded_after:
+            query = query.where(Image.uploaded_at >= uploaded_after)
+        if uploaded_before:
+            query = query.where(Image.uploaded_at < uploaded_before)
+
+        # Um a mais que o permitido para detectar lotes grandes demais
+        result = await self.session.execute(
+            query.order_by(Image.id).limit(settings.BATCH_MAX_IMAGES + 1)
+        )
+        return result.scalars().all()
+
+    async def apply_transformations_batch(
+        self, images: list[Image], options: TransformationSchema, user_id: int
+    ) -> Batch:
+        """Cria todas as derivadas em uma transação e despacha em chunks.
+
+        Derivadas já existentes (cache) entram no lote sem novo task.
+        """
+        transformations = canonical_transformations(options)
+        for image in images:
+            self.check_bounds(image, transformations)
+        image_ids = [image.id for image in images]
+        keys = {
+            image_id: transformation_key(image_id, transformations)
+            for image_id in image_ids
+        }
+        result = await self.session.execute(
+            select(Image).where(
+                Image.original_image_id.in_(keys),
+                Image.transformation_key.in_(keys.values()),
+            )
+        )
+        existing = {
+            derived.original_image_id: derived
+            for derived in result.scalars().all()
+        }
+
+        transform_coalescer.ensure_capacity(
+            sum(image.id not in existing for image in images)
+        )
+
+        batch = Batch(id=str(uuid.uuid4()), user_id=user_id, total=len(images))
+        self.session.add(batch)
+        jobs = []
+        derived_images = []
+        for image in images:
+            derived = existing.get(image.id)
+            if derived is None:
+                derived = self._new_derived_image(
+                    image, transformations, keys[image.id]
+                )
+                self.session.add(derived)
+                jobs.append((image, derived))
+            derived_images.append(derived)
+
+        try:
+            await self.session.flush()
+            self.session.add_all(
+                BatchImage(batch_id=batch.id, image_id=derived.id)
+                for derived in derived_images
+            )
+            await self.session.commit()
+            await self.session.refresh(batch)
+        except IntegrityError:
+            # Corrida com outra requisição: as derivadas dela já estão no
+            # banco e a nova tentativa as encontra pelo cache
+            await self.session.rollback()
+            images = await self.get_images_by_ids_and_user(image_ids, user_id)
+            return await self.apply_transformations_batch(
+                images, options, user_id
+            )
+
+        metrics.increment('transform_cache_hits', len(images) - len(jobs))
+        metrics.increment('transform_cache_misses', len(jobs))
+        if jobs:
+            task_executor.submit_many(
+                apply_transformations_async,
+                [
+                    (image.url, derived.url, transformations, derived.id)
+                    for image, derived in jobs
+                ],
+                settings.BATCH_CHUNK_SIZE,
+            )
+
+        return batch
+
+    async def get_batch(self, batch_id: str, user_id: int) -> Batch | None:
+        result = await self.session.execute(
+            select(Batch).where(Batch.id == batch_id, Batch.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_batch_progress(
+        self, batch_id: str
+    ) -> tuple[dict[str, int], list[int]]:
+        result = await self.session.execute(
+            select(Image.id, Image.status)
+            .join(BatchImage, BatchImage.image_id == Image.id)
+            .where(BatchImage.batch_id == batch_id)
+            .order_by(Image.id)
+        )
+        rows = result.all()
+        progress = {status: 0 for status in ImageStatus}
+        for _, status in rows:
+            progress[status] += 1
+        return progress, [image_id for image_id, _ in rows]
+
+    @staticmethod
+    def _new_derived_image(
+        image: Image, transformations: dict, key: str
+    ) -> Image:
+        new_filename = f'{uuid.uuid4()}.{transformations["format"]}'
+        return Image(
+            filename=new_filename,
+            url=shard_key(new_filename),
+            user_id=image.user_id,
+            original_image_id=image.id,
+            transformation_key=key,
+            status=ImageStatus.QUEUED,
+            queued_at=datetime.now(tz=ZoneInfo('UTC')),
+        )
+
 
 def get_image_service(
     session: Annotated[AsyncSession, Depends(get_session)],
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import AbstractAsyncContextManager
+from typing import AsyncIterator, Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import select
+
+from image_processing_service.database import engine
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (ImageStatus.SUCCEEDED, ImageStatus.FAILED)
+
+
+def format_event(image_id: int, status: str, error: str | None) -> str:
+    data = json.dumps({'id': image_id, 'status': status, 'error': error})
+    return f'id: {image_id}\nevent: {status}\ndata: {data}\n\n'
+
+
+class JobNotifier:
+    """Distribui a conclusão de jobs para os streams abertos no processo.
+
+    Um único laço por processo consulta o banco a cada ``interval``
+    segundos, com uma query para todos os ids assinados. O banco é o ponto
+    de encontro entre o worker do Celery e os workers do uvicorn, então
+    funciona com qualquer número de processos e sem broker.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[
+            [], AbstractAsyncContextManager[AsyncSession]
+        ],
+        interval: float,
+    ):
+        self._session_factory = session_factory
+        self._interval = interval
+        self._subscriptions: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def subscribe(self, image_ids: Iterable[int]) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        for image_id in image_ids:
+            self._subscriptions[image_id].add(queue)
+        self._ensure_polling()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, image_ids: Iterable[int]):
+        for image_id in image_ids:
+            queues = self._subscriptions.get(image_id)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._subscriptions[image_id]
+
+    def _ensure_polling(self):
+        loop = asyncio.get_running_loop()
+        if self._task and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._task = loop.create_task(self._poll())
+
+    async def _poll(self):
+        while self._subscriptions:
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception('Error while polling job statuses')
+            await asyncio.sleep(self._interval)
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def poll_once(self):
+        image_ids = list(self._subscriptions)
+        if not image_ids:
+            return
+
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(Image.id, Image.status, Image.error).where(
+                    Image.id.in_(image_ids),
+                    Image.status.in_(TERMINAL_STATUSES),
+                )
+            )
+
+        for image_id, status, error in result.all():
+            for queue in self._subscriptions.pop(image_id, ()):
+                queue.put_nowait((image_id, status, error))
+
+    async def stream(
+        self, images: list[Image], heartbeat: float
+    ) -> AsyncIterator[str]:
+        """Eventos SSE até todos os jobs terminarem."""
+        pending = set()
+        for image in images:
+            if image.status in TERMINAL_STATUSES:
+                yield format_event(image.id, image.status, image.error)
+            else:
+                pending.add(image.id)
+
+        if not pending:
+            return
+
+        queue = self.subscribe(pending)
+        try:
+            while pending:
+                try:
+                    image_id, status, error = await asyncio.wait_for(
+                        queue.get(), timeout=heartbeat
+                    )
+                except TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                pending.discard(image_id)
+                yield format_event(image_id, status, error)
+        finally:
+            self.unsubscribe(queue, pending)
+
+
+job_notifier = JobNotifier(
+    lambda: AsyncSession(engine, expire_on_commit=False),
+    interval=settings.JOB_EVENTS_POLL_INTERVAL,
+)
+
+
+def get_job_notifier() -> JobNotifier:
+    return job_notifier
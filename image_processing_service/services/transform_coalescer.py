@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import update
+
+from image_processing_service.database import engine
+from image_processing_service.executor import task_executor
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.settings import settings
+from image_processing_service.tasks import (
+    apply_transformations_async,
+    transform_group_async,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def submit_jobs(original_image_key: str, jobs: list[dict]):
+    if len(jobs) == 1:
+        task_executor.submit(
+            apply_transformations_async,
+            original_image_key=original_image_key,
+            **jobs[0],
+        )
+    else:
+        task_executor.submit(
+            transform_group_async,
+            original_image_key=original_image_key,
+            jobs=jobs,
+        )
+
+
+class TransformCoalescer:
+    """Junta em um task os jobs de uma mesma original pedidos em rajada.
+
+    O primeiro job de uma original abre uma janela de ``window`` segundos;
+    o que chegar nela vai junto, num único ``transform_group_async``, que
+    decodifica a original uma vez. O grupo sai antes se chegar a
+    ``max_jobs``. Os jobs já estão gravados como ``queued``: a janela só
+    atrasa a publicação, e ``close`` publica o que estiver pendente. Se a
+    publicação falha, os jobs são gravados como ``failed``.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[
+            [], AbstractAsyncContextManager[AsyncSession]
+        ],
+        window: float,
+        max_jobs: int,
+    ):
+        self._session_factory = session_factory
+        self.window = window
+        self.max_jobs = max_jobs
+        self._groups: dict[str, list[dict]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._failures: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_jobs > 1
+
+    @property
+    def pending(self) -> int:
+        """Grupos ainda na janela; cada um vira um task."""
+        return len(self._groups)
+
+    def ensure_capacity(self, count: int):
+        """``task_executor.ensure_capacity`` contando também os grupos que
+        ainda vão ser publicados."""
+        task_executor.ensure_capacity(count + self.pending)
+
+    def add(self, original_image_key: str, job: dict):
+        """``job`` tem ``image_id``, ``new_image_key`` e
+        ``transformations``."""
+        if not self.enabled:
+            submit_jobs(original_image_key, [job])
+            return
+
+        group = self._groups.setdefault(original_image_key, [])
+        group.append(job)
+        if len(group) >= self.max_jobs:
+            self.flush(original_image_key)
+        elif len(group) == 1:
+            self._timers[original_image_key] = (
+                asyncio.get_running_loop().call_later(
+                    self.window, self._flush_later, original_image_key
+                )
+            )
+
+    def flush(self, original_image_key: str):
+        timer = self._timers.pop(original_image_key, None)
+        if timer is not None:
+            timer.cancel()
+        jobs = self._groups.pop(original_image_key, None)
+        if not jobs:
+            return
+        try:
+            submit_jobs(original_image_key, jobs)
+        except Exception as e:
+            # Nenhum worker vai gravar o status: sem isso, os jobs ficariam
+            # em queued para sempre
+            task = asyncio.get_running_loop().create_task(
+                self._fail(jobs, f'Error submitting the job: {e}')
+            )
+            self._failures.add(task)
+            task.add_done_callback(self._failures.discard)
+            raise
+
+    async def _fail(self, jobs: list[dict], error: str):
+        try:
+            async with self._session_factory() as session:
+                await session.execute(
+                    update(Image)
+                    .where(
+                        Image.id.in_([job['image_id'] for job in jobs]),
+                        Image.status == ImageStatus.QUEUED,
+                    )
+                    .values(
+                        status=ImageStatus.FAILED,
+                        error=error,
+                        finished_at=datetime.now(tz=ZoneInfo('UTC')),
+                        # Libera a chave do cache para um novo pedido
+                        transformation_key=None,
+                    )
+                )
+                await session.commit()
+        except Exception:
+            logger.exception('Error while recording failed jobs')
+
+    def _flush_later(self, original_image_key: str):
+        # Fora de uma requisição, não há a quem devolver o erro
+        try:
+            self.flush(original_image_key)
+        except Exception:
+            logger.exception(
+                'Error while submitting jobs of %s', original_image_key
+            )
+
+    async def close(self):
+        for original_image_key in list(self._groups):
+            self._flush_later(original_image_key)
+        await asyncio.gather(*self._failures)
+
+
+transform_coalescer = TransformCoalescer(
+    lambda: AsyncSession(engine, expire_on_commit=False),
+    settings.TRANSFORM_COALESCE_WINDOW,
+    settings.TRANSFORM_COALESCE_MAX_JOBS,
+)
@@ -0,0 +1,199 @@
+import asyncio
+import contextlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Annotated, AsyncIterator
+from zoneinfo import ZoneInfo
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import select
+
+from image_processing_service.database import get_session
+from image_processing_service.models import Image, UploadSession
+from image_processing_service.services.exceptions import (
+    InvalidImageError,
+    UploadOffsetError,
+    UploadTooLargeError,
+)
+from image_processing_service.services.image_service import (
+    UPLOAD_CHUNK_SIZE,
+    ImageService,
+    check_head,
+    remove_file,
+)
+from image_processing_service.settings import settings
+from image_processing_service.storage import staging_path
+from image_processing_service.utils.files import write_at
+
+
+def staged_bytes(upload: UploadSession) -> int:
+    try:
+        return os.path.getsize(staging_path(upload.id))
+    except FileNotFoundError:
+        return 0
+
+
+def read_head(path: str) -> bytes:
+    with open(path, 'rb') as staged:
+        return staged.read(UPLOAD_CHUNK_SIZE)
+
+
+def create_staging_file(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'xb'):
+        pass
+
+
+def _expiry() -> datetime:
+    return datetime.now(tz=ZoneInfo('UTC')) + timedelta(
+        seconds=settings.UPLOAD_SESSION_TTL
+    )
+
+
+class UploadService:
+    """Uploads retomáveis: o corpo chega em PUTs com offset e é gravado
+    direto num arquivo de staging, sem multipart. Ao completar, o arquivo
+    passa pelo mesmo registro de ``ImageService.save_image``."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create_session(
+        self, user_id: int, filename: str, content_type: str, size: int
+    ) -> UploadSession:
+        if not content_type.startswith('image/'):
+            raise InvalidImageError('Only images are allowed.')
+        if size > settings.UPLOAD_SESSION_MAX_BYTES:
+            raise UploadTooLargeError(
+                'File exceeds the maximum upload size of '
+                f'{settings.UPLOAD_SESSION_MAX_BYTES} bytes.'
+            )
+
+        # Coleta de lixo oportunista: cada sessão nova descarta as paradas
+        await self.purge_expired()
+
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            filename=filename,
+            content_type=content_type,
+            size=size,
+            expires_at=_expiry(),
+        )
+        await asyncio.to_thread(create_staging_file, staging_path(upload.id))
+        self.session.add(upload)
+        await self.session.commit()
+        return upload
+
+    async def get_session(
+        self, session_id: str, user_id: int
+    ) -> UploadSession | None:
+        result = await self.session.execute(
+            select(UploadSession).where(
+                UploadSession.id == session_id,
+                UploadSession.user_id == user_id,
+                UploadSession.expires_at > datetime.now(tz=ZoneInfo('UTC')),
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def write_chunk(
+        self,
+        upload: UploadSession,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+    ) -> int:
+        """Grava o corpo a partir de ``offset`` e devolve o novo offset.
+
+        Os bytes são agrupados em blocos de UPLOAD_CHUNK_SIZE antes de cada
+        ida à thread. Se a conexão cair no meio, o que já foi gravado
+        permanece e o cliente retoma do offset consultado.
+        """
+        current = staged_bytes(upload)
+        if offset != current:
+            raise UploadOffsetError(
+                f'Chunk must start at offset {current}, not {offset}.'
+            )
+
+        path = staging_path(upload.id)
+        limit = min(settings.UPLOAD_SESSION_CHUNK_SIZE, upload.size - offset)
+        received = 0
+        buffer = bytearray()
+        fd = await asyncio.to_thread(os.open, path, os.O_WRONLY)
+        try:
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > limit:
+                    await asyncio.to_thread(os.ftruncate, fd, current)
+                    raise UploadTooLargeError(
+                        f'Chunk exceeds the limit of {limit} bytes.'
+                    )
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await asyncio.to_thread(
+                        write_at, fd, bytes(buffer), offset
+                    )
+                    offset += len(buffer)
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(write_at, fd, bytes(buffer), offset)
+                offset += len(buffer)
+        finally:
+            os.close(fd)
+
+        # Assim que o início do arquivo chega, assinatura e dimensões são
+        # conferidas, sem esperar o resto
+        head_size = min(upload.size, UPLOAD_CHUNK_SIZE)
+        if current < head_size <= offset:
+            try:
+                check_head(await asyncio.to_thread(read_head, path))
+            except (InvalidImageError, UploadTooLargeError):
+                await self.delete_session(upload)
+                raise
+
+        upload.expires_at = _expiry()
+        await self.session.commit()
+        return offset
+
+    async def complete(self, upload: UploadSession) -> Image:
+        offset = staged_bytes(upload)
+        if offset != upload.size:
+            raise UploadOffsetError(
+                f'Upload is incomplete: {offset} of {upload.size} bytes.'
+            )
+
+        try:
+            return await ImageService(self.session).save_staged_image(
+                staging_path(upload.id), upload.filename, upload.user_id
+            )
+        finally:
+            await self.delete_session(upload)
+
+    async def delete_session(self, upload: UploadSession):
+        await asyncio.to_thread(remove_file, staging_path(upload.id))
+        await self.session.delete(upload)
+        await self.session.commit()
+
+    async def purge_expired(self) -> int:
+        """Remove sessões sem atividade além do TTL e seus arquivos."""
+        result = await self.session.execute(
+            select(UploadSession).where(
+                UploadSession.expires_at <= datetime.now(tz=ZoneInfo('UTC'))
+            )
+        )
+        expired = result.scalars().all()
+        for upload in expired:
+            with contextlib.suppress(OSError):
+                await asyncio.to_thread(remove_file, staging_path(upload.id))
+            await self.session.delete(upload)
+        if expired:
+            await self.session.commit()
+        return len(expired)
+
+
+def get_upload_service(
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> UploadService:
+    return UploadService(session)
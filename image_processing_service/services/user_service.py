@@ -4,10 +4,11 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import select
 
+from image_processing_service.cache import user_cache
 from image_processing_service.database import get_session
 from image_processing_service.models import User
 from image_processing_service.schemas.user_schemas import UserCreateSchema
-from image_processing_service.utils.hashing import get_password_hash
+from image_processing_service.utils.hashing import get_password_hash_async
 
 
 class UserService:
@@ -22,12 +23,14 @@ class UserService:
             raise ValueError('User already exists')
 
         new_user = User(
-            username=user.username, password=get_password_hash(user.password)
+            username=user.username,
+            password=await get_password_hash_async(user.password),
         )
 
         self.session.add(new_user)
         await self.session.commit()
         await self.session.refresh(new_user)
+        user_cache.invalidate(new_user.username)
 
         return new_user
 
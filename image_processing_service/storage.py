@@ -0,0 +1,264 @@
+"""Onde os arquivos das imagens ficam.
+
+``Image.url`` guarda uma chave de armazenamento (``ab/cd/<nome>``), não um
+caminho: os dois níveis vêm do hash do nome, o que mantém cada diretório
+com poucos milhares de arquivos mesmo com milhões de imagens. Linhas
+antigas, gravadas com caminho absoluto no diretório plano, continuam
+funcionando no backend local até o ``reshard`` movê-las.
+
+``local`` grava no UPLOAD_DIR (volume compartilhado entre API e worker).
+``s3`` grava num bucket S3 ou compatível, e API e workers podem rodar em
+máquinas diferentes. Os dois backends têm a mesma interface: arquivos são
+preparados num caminho local de rascunho e entregues com ``store``, e
+quem precisa ler um arquivo inteiro usa ``fetch``.
+"""
+
+import contextlib
+import errno
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+from image_processing_service.settings import settings
+from image_processing_service.utils.files import temporary_path
+from image_processing_service.utils.http import content_disposition
+
+# Rascunhos locais (uploads em andamento, saídas do worker) ficam dentro
+# do UPLOAD_DIR para que, no backend local, o ``store`` seja um rename
+STAGING_DIR = '.staging'
+
+# Tamanho dos blocos ao baixar um objeto inteiro
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def shard_key(name: str) -> str:
+    """Chave de um arquivo pelo nome; a mesma para o mesmo nome, então o
+    ``reshard`` sabe para onde levar cada arquivo antigo."""
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}/{name}'
+
+
+def new_key(extension: str) -> str:
+    return shard_key(f'{uuid.uuid4()}{extension}')
+
+
+def is_legacy_key(key: str) -> bool:
+    return os.path.isabs(key)
+
+
+def staging_path(name: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, STAGING_DIR, name)
+
+
+def scratch_path(extension: str = '') -> str:
+    """Caminho local para um arquivo que depois vai para ``store``."""
+    path = staging_path(f'{uuid.uuid4().hex}{extension}.part')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _remove(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class LocalStorage:
+    """Arquivos num diretório local (ou volume compartilhado com o
+    worker)."""
+
+    new_key = staticmethod(new_key)
+
+    def __init__(self, root: Path | None = None):
+        # Sem raiz fixa, segue settings.UPLOAD_DIR (os testes o trocam)
+        self._root = root
+
+    @property
+    def root(self) -> Path:
+        return self._root or settings.UPLOAD_DIR
+
+    def path(self, key: str) -> str:
+        """Caminho para leitura; chaves antigas já são caminhos."""
+        if is_legacy_key(key):
+            return key
+        return os.path.join(self.root, key)
+
+    def writable_path(self, key: str) -> str:
+        """Caminho para gravar ``key``, com o diretório do shard criado."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def store(self, path: str, key: str):
+        """Move o arquivo local para ``key`` (rename atômico)."""
+        target = self.writable_path(key)
+        try:
+            os.replace(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Chave antiga em outro sistema de arquivos: copia e renomeia
+            partial_path = temporary_path(target)
+            shutil.copyfile(path, partial_path)
+            os.replace(partial_path, target)
+            _remove(path)
+
+    def version(self, key: str) -> tuple[int, int]:
+        """Identifica o conteúdo atual de ``key`` (mtime e tamanho)."""
+        stat_result = os.stat(self.path(key))
+        return stat_result.st_mtime_ns, stat_result.st_size
+
+    @contextlib.contextmanager
+    def fetch(self, key: str) -> Iterator[str]:
+        yield self.path(key)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self.path(key), 'rb') as stored:
+            stored.seek(start)
+            return stored.read(length)
+
+    @staticmethod
+    def presigned_url(key: str, filename: str, media_type: str) -> None:
+        """Arquivos locais são servidos pela própria API (ou pelo proxy)."""
+        return None
+
+    def delete(self, key: str):
+        _remove(self.path(key))
+
+
+class S3Storage:
+    """Objetos num bucket S3 ou compatível (MinIO, R2, Ceph...).
+
+    Arquivos maiores que ``part_size`` sobem em multipart, uma parte lida
+    do disco por vez; leituras são em streaming ou por faixa de bytes; o
+    download vai direto do bucket por URL pré-assinada. O cliente do
+    boto3 é criado no primeiro uso, já no processo que vai usá-lo.
+    """
+
+    new_key = staticmethod(new_key)
+
+    def __init__(
+        self,
+        bucket: str,
+        client=None,
+        part_size: int = 8 * 1024 * 1024,
+        presigned_url_ttl: int = 300,
+    ):
+        self.bucket = bucket
+        self.part_size = part_size
+        self.presigned_url_ttl = presigned_url_ttl
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3  # noqa: PLC0415
+            except ImportError:
+                raise RuntimeError(
+                    'STORAGE_BACKEND=s3 requires the "s3" extra (boto3).'
+                )
+            self._client = boto3.client(
+                's3',
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                region_name=settings.S3_REGION,
+            )
+        return self._client
+
+    def store(self, path: str, key: str):
+        """Envia o arquivo local para ``key`` e o apaga."""
+        with open(path, 'rb') as source:
+            if os.fstat(source.fileno()).st_size <= self.part_size:
+                self.client.put_object(
+                    Bucket=self.bucket, Key=key, Body=source
+                )
+            else:
+                self._multipart_upload(source, key)
+        _remove(path)
+
+    def _multipart_upload(self, source, key: str):
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key
+        )['UploadId']
+        try:
+            parts = []
+            while chunk := source.read(self.part_size):
+                part_number = len(parts) + 1
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=chunk,
+                )
+                parts.append({
+                    'ETag': response['ETag'],
+                    'PartNumber': part_number,
+                })
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+        except BaseException:
+            # Partes órfãs seriam cobradas até o bucket expirá-las
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+
+    def version(self, key: str) -> tuple[str, int]:
+        response = self.client.head_object(Bucket=self.bucket, Key=key)
+        return response['ETag'], response['ContentLength']
+
+    @contextlib.contextmanager
+    def fetch(self, key: str) -> Iterator[str]:
+        """Baixa o objeto em streaming para um rascunho local."""
+        path = scratch_path(os.path.splitext(key)[1])
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+            with open(path, 'wb') as target:
+                while chunk := body.read(READ_CHUNK_SIZE):
+                    target.write(chunk)
+            yield path
+        finally:
+            _remove(path)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=key,
+            Range=f'bytes={start}-{start + length - 1}',
+        )
+        return response['Body'].read()
+
+    def presigned_url(self, key: str, filename: str, media_type: str) -> str:
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': key,
+                'ResponseContentType': media_type,
+                'ResponseContentDisposition': content_disposition(filename),
+            },
+            ExpiresIn=self.presigned_url_ttl,
+        )
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+def create_storage() -> LocalStorage | S3Storage:
+    if settings.STORAGE_BACKEND == 's3':
+        return S3Storage(
+            settings.S3_BUCKET,
+            part_size=settings.S3_PART_SIZE,
+            presigned_url_ttl=settings.S3_PRESIGNED_URL_TTL,
+        )
+    return LocalStorage()
+
+
+storage = create_storage()
@@ -1,62 +1,566 @@
+import io
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from celery import Task
+from celery.utils.log import get_task_logger
 from PIL import Image as PILImage
-from PIL import ImageOps
 
+from image_processing_service.cache import decoded_image_cache
 from image_processing_service.celery import celery_app
+from image_processing_service.database import WorkerSession
+from image_processing_service.memory import memory_budget
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.processing.decode import (
+    STRATEGIES,
+    estimate_memory,
+    plan_decode,
+)
+from image_processing_service.processing.metadata import (
+    HEADER_BYTES,
+    read_metadata,
+)
+from image_processing_service.processing.planner import (
+    Plan,
+    plan_transformations,
+)
+from image_processing_service.processing.tiled import (
+    can_tile,
+    estimate_tiled_memory,
+    execute_tiled,
+    open_strips,
+    plan_tiled,
+)
 from image_processing_service.services.exceptions import ImageSaveError
+from image_processing_service.settings import settings
+from image_processing_service.storage import _remove, scratch_path, storage
+
+logger = get_task_logger(__name__)
+
+# Uploads acima do limite já são recusados; aqui o Pillow protege o worker
+# de arquivos que chegaram por outro caminho
+PILImage.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
+
+# Originais que passaram pelo cache, por id: outro task pode estar usando
+# cada uma mesmo depois de despejada, então ``release`` não as fecha
+_shared_images: weakref.WeakValueDictionary[int, PILImage.Image] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite devolve datetimes sem fuso mesmo com timezone=True
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=ZoneInfo('UTC'))
+    return moment
 
 
-@celery_app.task
-def apply_transformations_async(
-    original_image_path: str, new_image_path: str, transformations: dict
+def mark_running(image_id: int) -> datetime:
+    started_at = datetime.now(tz=ZoneInfo('UTC'))
+    with WorkerSession() as session:
+        image = session.get(Image, image_id)
+        if image is None:
+            # Apagada enquanto esperava na fila: o task roda, mas não há
+            # status a gravar
+            logger.warning('Image %s not found, status not recorded', image_id)
+            return started_at
+        image.status = ImageStatus.RUNNING
+        image.started_at = started_at
+        if image.queued_at:
+            image.queue_wait_seconds = (
+                started_at - _as_utc(image.queued_at)
+            ).total_seconds()
+        session.commit()
+    return started_at
+
+
+def mark_finished(
+    image_id: int,
+    started_at: datetime,
+    error: str | None = None,
+    metadata: dict | None = None,
 ):
+    finished_at = datetime.now(tz=ZoneInfo('UTC'))
+    with WorkerSession() as session:
+        image = session.get(Image, image_id)
+        if image is None:
+            logger.warning('Image %s not found, status not recorded', image_id)
+            return
+        for field, value in (metadata or {}).items():
+            setattr(image, field, value)
+        image.finished_at = finished_at
+        image.processing_seconds = (finished_at - started_at).total_seconds()
+        if error is None:
+            image.status = ImageStatus.SUCCEEDED
+        else:
+            image.status = ImageStatus.FAILED
+            image.error = error
+            # Libera a chave do cache para que um novo pedido tente de novo
+            image.transformation_key = None
+        session.commit()
+
+
+def open_original(
+    original_image_key: str, transformations: dict, cached: bool = True
+) -> tuple[PILImage.Image, Plan]:
+    """Original decodificada (reduzida quando o plano permite) e o plano.
+
+    Originais decodificadas em resolução total ficam no cache do processo,
+    pela chave e pela versão do arquivo: transformações seguidas da mesma
+    original (o roteamento por afinidade as manda para o mesmo worker)
+    pulam a leitura e a decodificação. ``cached=False`` ignora o cache,
+    para quem não é worker (a API, no caminho inline).
+    """
+    cache_key = None
+    if cached and settings.DECODED_CACHE_BYTES:
+        cache_key = (original_image_key, storage.version(original_image_key))
+        decoded = decoded_image_cache.get(cache_key)
+        if decoded is not None:
+            _shared_images[id(decoded)] = decoded
+            return plan_decode(
+                decoded, transformations, settings.DECODE_STRATEGY
+            )
+
+    with (
+        storage.fetch(original_image_key) as original_image_path,
+        PILImage.open(original_image_path) as original,
+    ):
+        full_size = original.size
+        pil_image, plan = plan_decode(
+            original, transformations, settings.DECODE_STRATEGY
+        )
+        pil_image.load()
+
+        # O draft do JPEG decodifica reduzido, o que não serve para as
+        # próximas; quadros de animações continuam presos ao arquivo
+        if (
+            cache_key
+            and original.size == full_size
+            and not getattr(original, 'is_animated', False)
+        ):
+            original.load()
+            _shared_images[id(original)] = original
+            decoded_image_cache.set(cache_key, original)
+    return pil_image, plan
+
+
+def release(*images: PILImage.Image | None):
+    """Fecha as imagens assim que o task termina com elas: os pixels saem
+    da memória na hora, mesmo que um traceback guardado ainda referencie o
+    frame. As originais do cache continuam abertas."""
+    for pil_image in images:
+        if (
+            pil_image is not None
+            and _shared_images.get(id(pil_image)) is not pil_image
+        ):
+            pil_image.close()
+
+
+def store_output(
+    pil_image: PILImage.Image, new_image_key: str, format_ext: str
+) -> dict:
+    """Grava a imagem em ``new_image_key`` e devolve os metadados; a saída
+    passa por um rascunho local entregue com ``store``."""
+    output_path = scratch_path(f'.{format_ext}')
     try:
-        pil_image = PILImage.open(original_image_path)
-
-        if transformations.get('resize'):
-            pil_image = pil_image.resize((
-                transformations['resize']['width'],
-                transformations['resize']['height'],
-            ))
-
-        if transformations.get('crop'):
-            box = (
-                transformations['crop']['x'],
-                transformations['crop']['y'],
-                (
-                    transformations['crop']['x']
-                    + transformations['crop']['width']
-                ),
-                (
-                    transformations['crop']['y']
-                    + transformations['crop']['height']
-                ),
+        pil_image.save(output_path, format=format_ext.upper())
+        metadata = read_metadata(output_path)
+        storage.store(output_path, new_image_key)
+    finally:
+        _remove(output_path)
+    return metadata
+
+
+def save_transformed(
+    pil_image: PILImage.Image, plan: Plan, new_image_key: str, format_ext: str
+) -> dict:
+    """Executa o plano e grava o resultado em ``new_image_key``."""
+    logger.info('Transformation plan for %s: %s', new_image_key, plan)
+    result = plan.execute(pil_image)
+    try:
+        return store_output(result, new_image_key, format_ext)
+    finally:
+        if result is not pil_image:
+            release(result)
+
+
+def is_tiled(original_image_key: str) -> bool:
+    """Se a original, pelo cabeçalho, é grande o bastante para ir em faixas
+    (``TILED_MIN_PIXELS``) e pode ser lida assim."""
+    if not settings.TILED_MIN_PIXELS:
+        return False
+    head = storage.read_range(original_image_key, 0, HEADER_BYTES)
+    return can_tile(head, settings.TILED_MIN_PIXELS)
+
+
+def transform_stored_image(
+    original_image_key: str,
+    new_image_key: str,
+    transformations: dict,
+    cached: bool = True,
+) -> dict:
+    """Gera a imagem derivada e devolve os metadados do arquivo salvo."""
+    format_ext = transformations.get('format', 'jpeg')
+    if is_tiled(original_image_key):
+        with storage.fetch(original_image_key) as original_image_path:
+            reader = open_strips(original_image_path)
+            plan = reader and plan_tiled(
+                reader, transformations, settings.TILED_MAX_OUTPUT_PIXELS
             )
-            pil_image = pil_image.crop(box)
+            if plan:
+                logger.info('Tiled plan for %s: %s', new_image_key, plan)
+                result = execute_tiled(
+                    reader, plan, settings.TILED_STRIP_PIXELS
+                )
+                try:
+                    return store_output(result, new_image_key, format_ext)
+                finally:
+                    release(result)
+        # Rotação livre e afins: segue pelo caminho normal
+
+    pil_image, plan = open_original(
+        original_image_key, transformations, cached=cached
+    )
+    try:
+        return save_transformed(pil_image, plan, new_image_key, format_ext)
+    finally:
+        release(pil_image)
+
+
+def shared_decode(jobs: list[dict]) -> dict:
+    """Transformações que guiam a decodificação comum a ``jobs``.
+
+    Se todos começam com resize, um resize com a maior largura e a maior
+    altura pedidas: a decodificação reduz só o que serve a todos, e cada
+    job reduz o resto a partir daí. Sem resize, os recortes são em
+    coordenadas da original e ela vai em resolução total.
+    """
+    resizes = [job['transformations'].get('resize') for job in jobs]
+    if not all(resizes):
+        return {}
+    return {
+        'resize': {
+            'width': max(resize['width'] for resize in resizes),
+            'height': max(resize['height'] for resize in resizes),
+        }
+    }
+
+
+def _transform_job(original_image_key: str, job: dict) -> dict | Exception:
+    try:
+        return transform_stored_image(
+            original_image_key, job['new_image_key'], job['transformations']
+        )
+    except Exception as e:
+        return e
+
+
+def transform_stored_group(
+    original_image_key: str, jobs: list[dict]
+) -> list[dict | Exception]:
+    """Gera as derivadas de ``jobs`` (``{'new_image_key',
+    'transformations'}``) com uma única decodificação da original.
+
+    Devolve, na ordem dos jobs, os metadados de cada saída ou a exceção
+    que a impediu; uma falha ao ler a original é propagada.
+    """
+    if is_tiled(original_image_key):
+        # Decodificar a original inteira é o que as faixas evitam: cada job
+        # a lê de novo, faixa por faixa
+        return [_transform_job(original_image_key, job) for job in jobs]
+
+    source, _ = open_original(original_image_key, shared_decode(jobs))
+    results = []
+    try:
+        for job in jobs:
+            transformations = job['transformations']
+            pil_image = None
+            try:
+                pil_image, plan = plan_decode(
+                    source, transformations, settings.DECODE_STRATEGY
+                )
+                results.append(
+                    save_transformed(
+                        pil_image,
+                        plan,
+                        job['new_image_key'],
+                        transformations.get('format', 'jpeg'),
+                    )
+                )
+            except Exception as e:
+                results.append(e)
+            finally:
+                if pil_image is not source:
+                    release(pil_image)
+    finally:
+        release(source)
+    return results
 
-        if transformations.get('rotate'):
-            pil_image = pil_image.rotate(
-                transformations['rotate'], expand=True
+
+def estimate_task_memory(
+    original_image_key: str,
+    transformations: list[dict],
+    decode: dict | None = None,
+) -> int:
+    """Pico de memória estimado pelo cabeçalho da original (veja
+    ``estimate_memory``), no caminho em faixas quando ele se aplica."""
+    if not memory_budget.enabled:
+        return 0
+    try:
+        head = storage.read_range(original_image_key, 0, HEADER_BYTES)
+        if settings.TILED_MIN_PIXELS and can_tile(
+            head, settings.TILED_MIN_PIXELS
+        ):
+            estimate = estimate_tiled_memory(
+                head,
+                transformations,
+                settings.TILED_STRIP_PIXELS,
+                settings.TILED_MAX_OUTPUT_PIXELS,
             )
+            if estimate is not None:
+                return estimate
+        return estimate_memory(
+            io.BytesIO(head),
+            transformations,
+            settings.DECODE_STRATEGY,
+            decode,
+        )
+    except Exception:
+        # O próprio task registra a falha ao abrir a original
+        return 0
+
 
-        if transformations.get('filters'):
-            if transformations['filters'].get('grayscale'):
-                pil_image = ImageOps.grayscale(pil_image)
-            if transformations['filters'].get('sepia'):
-                sepia = PILImage.new('RGB', pil_image.size)
-                pixels = pil_image.convert('RGB').load()
-                for y in range(pil_image.size[1]):
-                    for x in range(pil_image.size[0]):
-                        r, g, b = pixels[x, y]
-                        tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                        tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                        tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                        sepia.putpixel(
-                            (x, y),
-                            (min(tr, 255), min(tg, 255), min(tb, 255)),
-                        )
-                pil_image = sepia
-
-        format_ext: str = transformations.get('format', 'jpeg')
-        pil_image.save(new_image_path, format=format_ext.upper())
+@contextmanager
+def admitted(task: Task, nbytes: int):
+    """Mantém ``nbytes`` reservados no orçamento do worker durante o bloco.
+
+    Sem espaço, o task volta para a fila (ou vai para
+    TRANSFORM_OVERFLOW_QUEUE) antes de marcar qualquer imagem como
+    running, e roda de novo depois de MEMORY_RETRY_DELAY segundos: um
+    worker de overflow também cheio não fica devolvendo o task sem pausa.
+    Chamado direto (``LocalExecutor``, chunks de lote) ou depois de
+    ``max_retries`` devoluções, espera a vez.
+    """
+    if not memory_budget.try_reserve(nbytes):
+        if (
+            task.request.called_directly
+            or task.request.retries >= task.max_retries
+        ):
+            memory_budget.reserve(nbytes)
+        else:
+            logger.info(
+                'Deferring %s: %d bytes over the memory budget',
+                task.request.id,
+                nbytes,
+            )
+            raise task.retry(
+                countdown=settings.MEMORY_RETRY_DELAY,
+                queue=settings.TRANSFORM_OVERFLOW_QUEUE,
+            )
+    try:
+        yield
+    finally:
+        memory_budget.release(nbytes)
+
+
+@celery_app.task(bind=True, max_retries=settings.MEMORY_MAX_RETRIES)
+def apply_transformations_async(  # noqa: PLR0913
+    self: Task,
+    original_image_key: str | None = None,
+    new_image_key: str | None = None,
+    transformations: dict | None = None,
+    image_id: int | None = None,
+    *,
+    original_image_path: str | None = None,
+    new_image_path: str | None = None,
+):
+    """``original_image_path`` e ``new_image_path`` são os nomes de antes
+    das chaves de storage: mensagens publicadas antes do deploy ainda os
+    usam, com caminhos absolutos, que o storage resolve. Remover na
+    próxima versão."""
+    original_image_key = original_image_key or original_image_path
+    new_image_key = new_image_key or new_image_path
+    estimate = estimate_task_memory(original_image_key, [transformations])
+    with admitted(self, estimate):
+        _apply_transformations(
+            original_image_key, new_image_key, transformations, image_id
+        )
+
+
+def _apply_transformations(
+    original_image_key: str,
+    new_image_key: str,
+    transformations: dict,
+    image_id: int | None,
+):
+    started_at = mark_running(image_id) if image_id else None
+
+    try:
+        metadata = transform_stored_image(
+            original_image_key, new_image_key, transformations
+        )
     except Exception as e:
+        if image_id:
+            mark_finished(image_id, started_at, error=str(e))
         raise ImageSaveError(f'Error applying transformations: {str(e)}')
+
+    if image_id:
+        mark_finished(image_id, started_at, metadata=metadata)
+
+
+def _area(rendition: dict) -> int:
+    resize = rendition['transformations']['resize']
+    return resize['width'] * resize['height']
+
+
+@celery_app.task(bind=True, max_retries=settings.MEMORY_MAX_RETRIES)
+def generate_renditions_async(
+    self: Task,
+    original_image_key: str | None = None,
+    renditions: list | None = None,
+    *,
+    original_image_path: str | None = None,
+):
+    """Gera várias renditions com uma única decodificação da origem.
+
+    ``renditions`` é uma lista de ``{'image_id', 'new_image_key',
+    'transformations'}``. Da maior para a menor, cada uma é reduzida a
+    partir da anterior quando esta ainda é grande o bastante; cada imagem
+    tem seu próprio status. Originais enormes vão em faixas, uma rendition
+    por vez, como um grupo de jobs (``_transform_group``).
+
+    ``original_image_path`` e ``new_image_path`` (nas renditions) são os
+    nomes antigos, como em ``apply_transformations_async``.
+    """
+    original_image_key = original_image_key or original_image_path
+    renditions = sorted(
+        (
+            {'new_image_key': rendition.get('new_image_path'), **rendition}
+            for rendition in renditions
+        ),
+        key=_area,
+        reverse=True,
+    )
+    estimate = estimate_task_memory(
+        original_image_key,
+        [rendition['transformations'] for rendition in renditions],
+        renditions[0]['transformations'],
+    )
+    with admitted(self, estimate):
+        if is_tiled(original_image_key):
+            _transform_group(original_image_key, renditions)
+        else:
+            _generate_renditions(original_image_key, renditions)
+
+
+def _generate_renditions(original_image_key: str, renditions: list[dict]):
+    started_at = {
+        rendition['image_id']: mark_running(rendition['image_id'])
+        for rendition in renditions
+    }
+
+    try:
+        # A maior rendition define até onde a decodificação pode reduzir
+        source, _ = open_original(
+            original_image_key, renditions[0]['transformations']
+        )
+    except Exception as e:
+        for rendition in renditions:
+            image_id = rendition['image_id']
+            mark_finished(image_id, started_at[image_id], error=str(e))
+        raise ImageSaveError(f'Error applying transformations: {str(e)}')
+
+    reducing_gap = STRATEGIES[settings.DECODE_STRATEGY].reducing_gap
+    previous = source
+    try:
+        for rendition in renditions:
+            previous = _generate_rendition(
+                rendition, source, previous, reducing_gap, started_at
+            )
+    finally:
+        if previous is not source:
+            release(previous)
+        release(source)
+
+
+def _generate_rendition(
+    rendition: dict,
+    source: PILImage.Image,
+    previous: PILImage.Image,
+    reducing_gap: float | None,
+    started_at: dict[int, datetime],
+) -> PILImage.Image:
+    """Gera uma rendition e devolve a imagem de onde reduzir a próxima."""
+    image_id = rendition['image_id']
+    transformations = rendition['transformations']
+    resize = transformations['resize']
+    # Reduzir a partir da anterior só vale se ela não for menor
+    base = previous
+    if previous.width < resize['width'] or previous.height < resize['height']:
+        base = source
+
+    result = base
+    try:
+        plan = plan_transformations(
+            transformations, base.size, base.mode, reducing_gap
+        )
+        logger.info(
+            'Rendition plan for %s: %s', rendition['new_image_key'], plan
+        )
+        result = plan.execute(base)
+        metadata = store_output(
+            result,
+            rendition['new_image_key'],
+            transformations.get('format', 'jpeg'),
+        )
+    except Exception as e:
+        mark_finished(image_id, started_at[image_id], error=str(e))
+        if result is not base:
+            release(result)
+        result = base
+    else:
+        mark_finished(image_id, started_at[image_id], metadata=metadata)
+
+    if previous is not source and previous is not result:
+        release(previous)
+    return result
+
+
+@celery_app.task(bind=True, max_retries=settings.MEMORY_MAX_RETRIES)
+def transform_group_async(self: Task, original_image_key: str, jobs: list):
+    """Jobs da mesma original agrupados na API (``TransformCoalescer``).
+
+    ``jobs`` é uma lista de ``{'image_id', 'new_image_key',
+    'transformations'}``; a original é decodificada uma vez e cada imagem
+    tem seu próprio status.
+    """
+    estimate = estimate_task_memory(
+        original_image_key,
+        [job['transformations'] for job in jobs],
+        shared_decode(jobs),
+    )
+    with admitted(self, estimate):
+        _transform_group(original_image_key, jobs)
+
+
+def _transform_group(original_image_key: str, jobs: list[dict]):
+    started_at = {
+        job['image_id']: mark_running(job['image_id']) for job in jobs
+    }
+
+    try:
+        results = transform_stored_group(original_image_key, jobs)
+    except Exception as e:
+        for job in jobs:
+            image_id = job['image_id']
+            mark_finished(image_id, started_at[image_id], error=str(e))
+        raise ImageSaveError(f'Error applying transformations: {str(e)}')
+
+    for job, result in zip(jobs, results):
+        image_id = job['image_id']
+        if isinstance(result, Exception):
+            mark_finished(image_id, started_at[image_id], error=str(result))
+        else:
+            mark_finished(image_id, started_at[image_id], metadata=result)
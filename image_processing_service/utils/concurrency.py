@@ -0,0 +1,21 @@
+import asyncio
+
+
+class LoopSemaphore:
+    """``asyncio.Semaphore`` com ``value`` vagas, um por event loop.
+
+    O semáforo fica preso ao loop em que foi usado pela primeira vez; os
+    testes criam vários loops no mesmo processo.
+    """
+
+    def __init__(self, value: int):
+        self.value = value
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.value)
+            self._loop = loop
+        return self._semaphore
@@ -0,0 +1,146 @@
+import contextlib
+import errno
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import uuid
+from typing import BinaryIO
+
+from image_processing_service.services.exceptions import UploadTooLargeError
+
+# Erros com que copy_file_range/sendfile recusam o par de arquivos (outro
+# sistema de arquivos em kernels antigos, fs sem suporte etc.)
+_UNSUPPORTED_COPY = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+
+
+def temporary_path(path: str) -> str:
+    """Nome temporário no mesmo diretório, para o ``os.replace`` final ser
+    atômico; o sufixo ``.part`` nunca é lido pelo worker."""
+    return f'{path}.{uuid.uuid4().hex}.part'
+
+
+def _copy_range(copy, src_fd: int, dst_fd: int, size: int):
+    offset = 0
+    while offset < size:
+        copied = copy(src_fd, dst_fd, size - offset, offset)
+        if copied == 0:
+            break
+        offset += copied
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, count: int, offset: int):
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+
+def _sendfile(src_fd: int, dst_fd: int, count: int, offset: int):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def _kernel_copies():
+    if hasattr(os, 'copy_file_range'):
+        yield _copy_file_range
+    if hasattr(os, 'sendfile'):
+        yield _sendfile
+
+
+def copy_fd(src_fd: int, dst_fd: int, size: int):
+    """Copia ``size`` bytes dentro do kernel: ``copy_file_range`` (reflink
+    quando o fs permite), depois ``sendfile`` e, por último, cópia comum."""
+    for copy in _kernel_copies():
+        try:
+            _copy_range(copy, src_fd, dst_fd, size)
+            return
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_COPY:
+                raise
+        os.ftruncate(dst_fd, 0)
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    with (
+        os.fdopen(os.dup(src_fd), 'rb') as source,
+        os.fdopen(os.dup(dst_fd), 'wb') as target,
+    ):
+        shutil.copyfileobj(source, target)
+
+
+def _hash_fd(fd: int, size: int):
+    digest = hashlib.sha256()
+    if size:
+        with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as view:
+            digest.update(view)
+    return digest
+
+
+def sha256_file(path: str) -> str:
+    with open(path, 'rb') as source:
+        fd = source.fileno()
+        return _hash_fd(fd, os.fstat(fd).st_size).hexdigest()
+
+
+def write_at(fd: int, data: bytes, offset: int):
+    """``os.pwrite`` até o fim; a escrita pode ser parcial."""
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _file_descriptor(source: BinaryIO) -> int | None:
+    # Mesmo teste que o Starlette faz em UploadFile._in_memory; chamar
+    # fileno() num SpooledTemporaryFile em memória o gravaria em disco
+    if getattr(source, '_rolled', True) is False:
+        return None
+    try:
+        return source.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return None
+
+
+def too_large_error(max_bytes: int) -> UploadTooLargeError:
+    return UploadTooLargeError(
+        f'File exceeds the maximum upload size of {max_bytes} bytes.'
+    )
+
+
+def ingest_upload(
+    source: BinaryIO, path: str, max_bytes: int
+) -> tuple[int, str]:
+    """Move o corpo já recebido para ``path`` e devolve tamanho e SHA-256.
+
+    O arquivo em disco do ``UploadFile`` é anônimo e o Starlette o apaga
+    ao fim da requisição, então não dá para renomeá-lo: os bytes vão de
+    descritor para descritor sem passar pelo Python, e o hash lê a mesma
+    origem por ``mmap``. Corpos pequenos, ainda em memória, são gravados
+    direto. A escrita vai para um nome temporário e só então é renomeada,
+    e nada é gravado se o corpo passar de ``max_bytes``.
+    """
+    source.flush()
+    src_fd = _file_descriptor(source)
+    if src_fd is None:
+        source.seek(0)
+        data = source.read()
+        size = len(data)
+    else:
+        size = os.fstat(src_fd).st_size
+    if size > max_bytes:
+        raise too_large_error(max_bytes)
+
+    partial_path = temporary_path(path)
+    try:
+        with open(partial_path, 'wb') as target:
+            if src_fd is None:
+                digest = hashlib.sha256(data)
+                target.write(data)
+            else:
+                digest = _hash_fd(src_fd, size)
+                copy_fd(src_fd, target.fileno(), size)
+        os.replace(partial_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partial_path)
+        raise
+    return size, digest.hexdigest()
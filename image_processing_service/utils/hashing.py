@@ -1,5 +1,13 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from pwdlib import PasswordHash
 
+from image_processing_service.metrics import metrics
+from image_processing_service.services.exceptions import HashingBusyError
+from image_processing_service.settings import settings
+from image_processing_service.utils.concurrency import LoopSemaphore
+
 pwd_context = PasswordHash.recommended()
 
 
@@ -9,3 +17,59 @@ def get_password_hash(password: str):
 
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingPool:
+    """Roda o Argon2 fora do event loop, com concorrência limitada.
+
+    O argon2-cffi libera o GIL, então threads bastam. Quem espera mais que
+    ``queue_timeout`` por uma vaga recebe ``HashingBusyError`` em vez de
+    acumular trabalho que vai expirar no cliente de qualquer forma.
+    """
+
+    def __init__(self, concurrency: int, queue_timeout: float):
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots = LoopSemaphore(concurrency)
+
+    async def run(self, func, *args):
+        slots = self._slots.get()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            metrics.increment('password_hash_rejected')
+            raise HashingBusyError('Password hashing is saturated.')
+
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.concurrency, thread_name_prefix='argon2'
+                )
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            slots.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+hashing_pool = HashingPool(
+    settings.PASSWORD_HASH_CONCURRENCY, settings.PASSWORD_HASH_QUEUE_TIMEOUT
+)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await hashing_pool.run(get_password_hash, password)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> bool:
+    return await hashing_pool.run(
+        verify_password, plain_password, hashed_password
+    )
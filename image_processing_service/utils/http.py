@@ -0,0 +1,134 @@
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from fastapi import Response, status
+from fastapi.responses import FileResponse
+from PIL import Image as PILImage
+from starlette.datastructures import Headers
+
+from image_processing_service.models import Image
+from image_processing_service.settings import settings
+
+# Derivadas nunca são regravadas: o mesmo id sempre tem os mesmos bytes
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+# Originais também revalidam pelo ETag, mas sem prazo de validade
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def media_type(image: Image) -> str:
+    """Content-Type pelo formato gravado; linhas antigas, sem formato, usam
+    a extensão do arquivo."""
+    if image.format:
+        PILImage.init()
+        mime = PILImage.MIME.get(image.format.upper())
+        if mime:
+            return mime
+    return (
+        mimetypes.guess_type(image.filename)[0] or 'application/octet-stream'
+    )
+
+
+def entity_tag(image: Image, stat_result: os.stat_result) -> str:
+    """ETag forte: o hash do conteúdo quando conhecido (uploads), senão
+    inode, mtime e tamanho do arquivo."""
+    if image.sha256:
+        return f'"{image.sha256}"'
+    return (
+        f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}'
+        f'-{stat_result.st_size:x}"'
+    )
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match usa comparação fraca (RFC 9110, 13.1.2)
+    if if_none_match.strip() == '*':
+        return True
+    tags = (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    return etag in tags
+
+
+def not_modified(headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        # Com If-None-Match, If-Modified-Since é ignorado
+        return _matches(if_none_match, etag)
+
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since.timestamp()
+
+
+def content_disposition(filename: str) -> str:
+    # Mesmo formato do FileResponse
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def offload_header(path: str) -> tuple[str, str] | None:
+    """Cabeçalho que entrega o arquivo ao proxy, ou ``None`` no modo
+    direto (ou para arquivos fora do UPLOAD_DIR, que o proxy não vê)."""
+    if settings.DOWNLOAD_OFFLOAD == 'sendfile':
+        return 'X-Sendfile', os.path.abspath(path)
+    if settings.DOWNLOAD_OFFLOAD == 'nginx':
+        relative = os.path.relpath(path, settings.UPLOAD_DIR)
+        if relative.startswith(os.pardir):
+            return None
+        prefix = settings.DOWNLOAD_OFFLOAD_PREFIX.rstrip('/')
+        return 'X-Accel-Redirect', f'{prefix}/{quote(relative)}'
+    return None
+
+
+def image_file_response(
+    image: Image, path: str, stat_result: os.stat_result, headers: Headers
+) -> Response:
+    """Resposta de download com validadores e cache.
+
+    O 304 sai só com o ``stat``, sem abrir o arquivo; requisições com
+    ``Range``/``If-Range`` ficam com o ``FileResponse``, que devolve 206.
+    Com DOWNLOAD_OFFLOAD a resposta vai vazia e o proxy envia os bytes
+    (e trata o ``Range``), sem ocupar o worker.
+    """
+    etag = entity_tag(image, stat_result)
+    cache_headers = {
+        'ETag': etag,
+        'Last-Modified': formatdate(stat_result.st_mtime, usegmt=True),
+        'Cache-Control': (
+            IMMUTABLE_CACHE_CONTROL
+            if image.original_image_id
+            else REVALIDATE_CACHE_CONTROL
+        ),
+    }
+
+    if not_modified(headers, etag, stat_result.st_mtime):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers
+        )
+
+    offload = offload_header(path)
+    if offload:
+        header, location = offload
+        return Response(
+            media_type=media_type(image),
+            headers={
+                **cache_headers,
+                'Content-Disposition': content_disposition(image.filename),
+                header: location,
+            },
+        )
+
+    return FileResponse(
+        path=path,
+        media_type=media_type(image),
+        filename=image.filename,
+        headers=cache_headers,
+        stat_result=stat_result,
+    )
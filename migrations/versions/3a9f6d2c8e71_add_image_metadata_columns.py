@@ -0,0 +1,40 @@
+"""add image metadata columns
+
+Revision ID: 3a9f6d2c8e71
+Revises: e1d4a7c93b52
+Create Date: 2026-10-18 16:21:09.402716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a9f6d2c8e71'
+down_revision: Union[str, None] = 'e1d4a7c93b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.add_column(sa.Column('width', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('height', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('format', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('mode', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('frames', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('orientation', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('size_bytes', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.drop_column('size_bytes')
+        batch_op.drop_column('orientation')
+        batch_op.drop_column('frames')
+        batch_op.drop_column('mode')
+        batch_op.drop_column('format')
+        batch_op.drop_column('height')
+        batch_op.drop_column('width')
@@ -0,0 +1,40 @@
+"""add job status columns
+
+Revision ID: 4f8a1c6e2b90
+Revises: 9c2e4b7d1a3f
+Create Date: 2026-10-18 11:03:27.118902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8a1c6e2b90'
+down_revision: Union[str, None] = '9c2e4b7d1a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(), nullable=False, server_default='succeeded'))
+        batch_op.add_column(sa.Column('queued_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('error', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('queue_wait_seconds', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('processing_seconds', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.drop_column('processing_seconds')
+        batch_op.drop_column('queue_wait_seconds')
+        batch_op.drop_column('error')
+        batch_op.drop_column('finished_at')
+        batch_op.drop_column('started_at')
+        batch_op.drop_column('queued_at')
+        batch_op.drop_column('status')
@@ -0,0 +1,28 @@
+"""add image sha256 column
+
+Revision ID: 5d2b8e0f4a17
+Revises: 3a9f6d2c8e71
+Create Date: 2026-10-18 17:42:55.180364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b8e0f4a17'
+down_revision: Union[str, None] = '3a9f6d2c8e71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.drop_column('sha256')
@@ -0,0 +1,33 @@
+"""add transformation_key column
+
+Revision ID: 9c2e4b7d1a3f
+Revises: 311ec12fad70
+Create Date: 2026-10-18 09:12:41.305518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e4b7d1a3f'
+down_revision: Union[str, None] = '311ec12fad70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.add_column(sa.Column('transformation_key', sa.String(), nullable=True))
+        batch_op.create_unique_constraint(
+            'uq_images_original_image_id_transformation_key',
+            ['original_image_id', 'transformation_key']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("images", schema=None) as batch_op:
+        batch_op.drop_constraint('uq_images_original_image_id_transformation_key', type_='unique')
+        batch_op.drop_column('transformation_key')
@@ -0,0 +1,31 @@
+"""add images user_id uploaded_at index
+
+Revision ID: e1d4a7c93b52
+Revises: b7e3d52f9c14
+Create Date: 2026-10-18 14:03:27.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1d4a7c93b52'
+down_revision: Union[str, None] = 'b7e3d52f9c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_images_user_id_uploaded_at_id',
+        'images',
+        ['user_id', 'uploaded_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_images_user_id_uploaded_at_id', table_name='images')
@@ -9,13 +9,31 @@ from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.pool import StaticPool
 
+from image_processing_service.cache import token_cache, user_cache
 from image_processing_service.database import get_session
 from image_processing_service.main import app
-from image_processing_service.models import Image, table_registry
+from image_processing_service.models import Image, ImageStatus, table_registry
 from image_processing_service.utils.hashing import get_password_hash
 from tests.factories import UserFactory
 
 
+@pytest.fixture(autouse=True)
+def upload_dir(monkeypatch: pytest.MonkeyPatch, tmp_path_factory):
+    # Rascunhos e chaves novas nunca caem no UPLOAD_DIR do projeto
+    directory = tmp_path_factory.mktemp('uploads')
+    monkeypatch.setattr(
+        'image_processing_service.storage.settings.UPLOAD_DIR', directory
+    )
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Cada teste tem seu banco: usuários de um não podem vazar para outro
+    token_cache.clear()
+    user_cache.clear()
+
+
 @pytest_asyncio.fixture
 async def session():
     engine = create_async_engine(
@@ -87,6 +105,23 @@ async def image_id(session, user, tmp_path) -> int:
     return image.id
 
 
+@pytest_asyncio.fixture
+async def queued_image_id(session, user, image_id, tmp_path) -> int:
+    image = Image(
+        filename='derived.jpeg',
+        url=str(tmp_path / f'{uuid.uuid4()}.jpeg'),
+        user_id=user.id,
+        original_image_id=image_id,
+        status=ImageStatus.QUEUED,
+        queued_at=datetime(2025, 1, 1),
+    )
+    session.add(image)
+    await session.commit()
+    await session.refresh(image)
+
+    return image.id
+
+
 @contextmanager
 def _mock_db_time(*, model, time=datetime(2025, 1, 1)):
     def fake_time_hook(mapper, connection, target):
@@ -0,0 +1,64 @@
+import io
+import itertools
+from urllib.parse import urlencode
+
+
+class FakeS3Client:
+    """Cliente S3 em memória com as chamadas que ``S3Storage`` usa."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+        self._ids = itertools.count(1)
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Bucket, Key] = Body.read()
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = str(next(self._ids))
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(
+        self, Bucket, Key, UploadId, MultipartUpload
+    ):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Bucket, Key] = b''.join(
+            parts[part['PartNumber']] for part in MultipartUpload['Parts']
+        )
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(UploadId)
+
+    def head_object(self, Bucket, Key):
+        data = self.objects[Bucket, Key]
+        return {'ETag': f'"{hash(data):x}"', 'ContentLength': len(data)}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[Bucket, Key]
+        if Range:
+            start, end = Range.removeprefix('bytes=').split('-')
+            data = data[int(start) : int(end) + 1]
+        return {'Body': io.BytesIO(data)}
+
+    @staticmethod
+    def generate_presigned_url(ClientMethod, Params, ExpiresIn):
+        query = {
+            name: value
+            for name, value in Params.items()
+            if name not in {'Bucket', 'Key'}
+        }
+        query['X-Amz-Expires'] = ExpiresIn
+        return (
+            f'https://{Params["Bucket"]}.s3.test/{Params["Key"]}'
+            f'?{urlencode(query)}'
+        )
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
@@ -0,0 +1,91 @@
+from image_processing_service.cache import SizedLRUCache, TTLCache
+from image_processing_service.metrics import metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache('test_cache', maxsize=10, ttl=60, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=10)
+
+    clock.now = 30
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+    clock.now = 60
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_cache_ttl_never_exceeds_default():
+    clock = FakeClock()
+    cache = TTLCache('test_cache', maxsize=10, ttl=60, clock=clock)
+    cache.set('a', 1, ttl=3600)
+    cache.set('expired', 2, ttl=-1)
+
+    clock.now = 61
+    assert cache.get('a') is None
+    assert cache.get('expired') is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache('test_cache', maxsize=2, ttl=60, clock=FakeClock())
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3  # noqa: PLR2004
+
+
+def test_cache_counts_hits_and_misses():
+    cache = TTLCache('counted_cache', maxsize=2, ttl=60, clock=FakeClock())
+    hits = metrics.get('counted_cache_hits')
+    misses = metrics.get('counted_cache_misses')
+
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('b')
+    cache.invalidate('a')
+    cache.get('a')
+
+    assert metrics.get('counted_cache_hits') == hits + 1
+    assert metrics.get('counted_cache_misses') == misses + 2
+
+
+def test_sized_cache_evicts_by_total_size():
+    cache = SizedLRUCache('sized_cache', max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'xxxx')
+    cache.get('a')
+    cache.set('c', 'xxxx')
+    cache.set('huge', 'x' * 11)
+
+    assert cache.get('b') is None
+    assert cache.get('huge') is None
+    assert cache.get('a') == 'xxxx'
+    assert cache.bytes == 8  # noqa: PLR2004
+
+
+def test_sized_cache_stats():
+    cache = SizedLRUCache('stats_cache', max_bytes=10, sizeof=len)
+    cache.set('a', 'xyz')
+    cache.get('a')
+    cache.get('b')
+
+    stats = cache.stats()
+
+    assert (stats['entries'], stats['bytes']) == (1, 3)
+    assert stats['hit_rate'] == metrics.get('stats_cache_hits') / (
+        metrics.get('stats_cache_hits') + metrics.get('stats_cache_misses')
+    )
@@ -0,0 +1,21 @@
+import asyncio
+
+from image_processing_service.utils.concurrency import LoopSemaphore
+
+
+def test_loop_semaphore_is_recreated_per_event_loop():
+    slots = LoopSemaphore(1)
+
+    async def acquire() -> asyncio.Semaphore:
+        semaphore = slots.get()
+        assert slots.get() is semaphore
+        await semaphore.acquire()
+        return semaphore
+
+    first = asyncio.run(acquire())
+    second = asyncio.run(acquire())
+
+    # A vaga presa no primeiro loop não conta no segundo
+    assert first is not second
+    assert first.locked()
+    assert second.locked()
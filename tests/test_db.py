@@ -4,6 +4,7 @@ import pytest
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from image_processing_service.database import sync_database_url
 from image_processing_service.models import User
 
 
@@ -22,3 +23,18 @@ async def test_user(session: AsyncSession, mock_db_time: callable):
         'password': 'secret',
         'created_at': time,
     }
+
+
+@pytest.mark.parametrize(
+    ('database_url', 'expected'),
+    [
+        ('sqlite+aiosqlite:///database.db', 'sqlite:///database.db'),
+        (
+            'postgresql+asyncpg://app:secret@db:5432/images',
+            'postgresql://app:secret@db:5432/images',
+        ),
+        ('sqlite:///database.db', 'sqlite:///database.db'),
+    ],
+)
+def test_sync_database_url(database_url, expected):
+    assert sync_database_url(database_url) == expected
@@ -0,0 +1,106 @@
+import pytest
+from PIL import Image as PILImage
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from image_processing_service.executor import CeleryExecutor, LocalExecutor
+from image_processing_service.models import (
+    Image,
+    ImageStatus,
+    User,
+    table_registry,
+)
+from image_processing_service.services.exceptions import ExecutorBusyError
+from image_processing_service.tasks import apply_transformations_async
+
+
+def test_celery_executor_publishes_to_broker(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+    monkeypatch.setattr(
+        apply_transformations_async,
+        'delay',
+        lambda *args, **kwargs: calls.append(kwargs),
+    )
+
+    CeleryExecutor.submit(
+        apply_transformations_async, original_image_key='a.png', image_id=1
+    )
+
+    assert calls == [{'original_image_key': 'a.png', 'image_id': 1}]
+
+
+def test_celery_executor_routes_by_original(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+    monkeypatch.setattr(
+        'image_processing_service.executor.transform_queue',
+        lambda key: f'transforms.{len(key)}',
+    )
+    monkeypatch.setattr(
+        apply_transformations_async,
+        'apply_async',
+        lambda kwargs, queue: calls.append((queue, kwargs['image_id'])),
+    )
+
+    for image_id, key in enumerate(['a.png', 'bb.png', 'a.png']):
+        CeleryExecutor.submit(
+            apply_transformations_async,
+            original_image_key=key,
+            image_id=image_id,
+        )
+
+    assert calls == [
+        ('transforms.5', 0),
+        ('transforms.6', 1),
+        ('transforms.5', 2),
+    ]
+
+
+def test_local_executor_rejects_when_queue_is_full():
+    executor = LocalExecutor(workers=1, max_queue=2)
+
+    executor.ensure_capacity(2)
+    with pytest.raises(ExecutorBusyError):
+        executor.ensure_capacity(3)
+
+
+def test_local_executor_runs_task_and_records_status(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    # Os processos filhos leem a configuração do ambiente
+    database_url = f'sqlite:///{tmp_path / "worker.db"}'
+    monkeypatch.setenv('WORKER_DATABASE_URL', database_url)
+    engine = create_engine(database_url)
+    table_registry.metadata.create_all(engine)
+    original_path = tmp_path / 'original.png'
+    PILImage.new('RGB', (40, 30)).save(original_path)
+    with Session(engine, expire_on_commit=False) as session:
+        user = User(username='local', password='secret')
+        session.add(user)
+        session.flush()
+        derived = Image(
+            filename='derived.png',
+            url=str(tmp_path / 'derived.png'),
+            user_id=user.id,
+            status=ImageStatus.QUEUED,
+        )
+        session.add(derived)
+        session.commit()
+
+    executor = LocalExecutor(workers=1, max_queue=1)
+    executor.submit(
+        apply_transformations_async,
+        original_image_key=str(original_path),
+        new_image_key=derived.url,
+        transformations={'rotate': 90, 'format': 'png'},
+        image_id=derived.id,
+    )
+    with pytest.raises(ExecutorBusyError):
+        executor.ensure_capacity(1)
+    executor.shutdown()
+
+    with Session(engine) as session:
+        image = session.get(Image, derived.id)
+        assert image.status == ImageStatus.SUCCEEDED
+    assert executor.pending == 0
+    assert PILImage.open(derived.url).size == (30, 40)
+    engine.dispose()
@@ -0,0 +1,70 @@
+import errno
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+from image_processing_service.services.exceptions import UploadTooLargeError
+from image_processing_service.utils.files import ingest_upload
+
+CONTENT = os.urandom(64 * 1024)
+
+
+def spooled(max_size: int) -> tempfile.SpooledTemporaryFile:
+    source = tempfile.SpooledTemporaryFile(max_size=max_size)
+    source.write(CONTENT)
+    source.seek(0)
+    return source
+
+
+@pytest.mark.parametrize('max_size', [1, 1024 * 1024])
+def test_ingest_copies_and_hashes(tmp_path, max_size):
+    # max_size=1 força o arquivo para o disco; o outro fica em memória
+    path = tmp_path / 'image.png'
+
+    with spooled(max_size) as source:
+        size, sha256 = ingest_upload(source, str(path), len(CONTENT))
+
+    assert size == len(CONTENT)
+    assert sha256 == hashlib.sha256(CONTENT).hexdigest()
+    assert path.read_bytes() == CONTENT
+    assert os.listdir(tmp_path) == ['image.png']
+
+
+def test_ingest_falls_back_when_copy_range_is_unsupported(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    def cross_device(*args):
+        raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+    monkeypatch.setattr(os, 'copy_file_range', cross_device, raising=False)
+    path = tmp_path / 'image.png'
+
+    with spooled(1) as source:
+        ingest_upload(source, str(path), len(CONTENT))
+
+    assert path.read_bytes() == CONTENT
+
+
+def test_ingest_rejects_oversized_body_before_writing(tmp_path):
+    with spooled(1) as source, pytest.raises(UploadTooLargeError):
+        ingest_upload(source, str(tmp_path / 'image.png'), 100)
+
+    assert not os.listdir(tmp_path)
+
+
+def test_ingest_removes_partial_file_on_error(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    def broken_copy(*args):
+        raise OSError(errno.EIO, 'Input/output error')
+
+    monkeypatch.setattr(
+        'image_processing_service.utils.files.copy_fd', broken_copy
+    )
+
+    with spooled(1) as source, pytest.raises(OSError, match='Input/output'):
+        ingest_upload(source, str(tmp_path / 'image.png'), len(CONTENT))
+
+    assert not os.listdir(tmp_path)
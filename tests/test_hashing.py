@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+import pytest
+
+from image_processing_service.services.exceptions import HashingBusyError
+from image_processing_service.utils.hashing import (
+    HashingPool,
+    get_password_hash_async,
+    verify_password_async,
+)
+
+
+@pytest.mark.asyncio
+async def test_async_hash_round_trip():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_saturated():
+    pool = HashingPool(concurrency=1, queue_timeout=0.05)
+    release = threading.Event()
+
+    busy = asyncio.create_task(pool.run(release.wait))
+    await asyncio.sleep(0.01)
+    with pytest.raises(HashingBusyError):
+        await pool.run(lambda: None)
+
+    release.set()
+    assert await busy is True
+    pool.shutdown()
@@ -0,0 +1,74 @@
+import multiprocessing
+
+import pytest
+
+from image_processing_service.celery import enable_memory_budget
+from image_processing_service.memory import MemoryBudget, memory_budget
+
+
+def test_budget_admits_until_full():
+    budget = MemoryBudget(100)
+
+    # Sozinho, um task maior que o orçamento ainda roda
+    assert budget.try_reserve(150)
+    assert not budget.try_reserve(1)
+    budget.release(150)
+
+    assert budget.try_reserve(60)
+    assert budget.try_reserve(40)
+    assert not budget.try_reserve(1)
+    budget.release(40)
+
+    assert budget.stats() == {
+        'limit': 100,
+        'reserved': 60,
+        'usage': 0.6,
+        'peak': 150,
+        'rejected': 2,
+    }
+
+
+def _reserve_and_die(budget: MemoryBudget):
+    budget.try_reserve(80)
+
+
+def test_reservation_of_dead_process_is_dropped():
+    budget = MemoryBudget(100)
+    # fork: o filho herda o orçamento, como os filhos do prefork
+    child = multiprocessing.get_context('fork').Process(
+        target=_reserve_and_die, args=(budget,)
+    )
+    child.start()
+    child.join()
+
+    assert budget.stats()['peak'] == 80  # noqa: PLR2004
+    assert budget.reserved == 0
+    assert budget.try_reserve(100)
+
+
+def test_disabled_budget_admits_everything():
+    budget = MemoryBudget(0)
+
+    assert budget.try_reserve(10**12)
+    assert budget.try_reserve(10**12)
+    assert budget.reserved == 0
+
+
+def test_budget_is_enabled_by_the_worker_init_hook(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    budget = MemoryBudget(0)
+    monkeypatch.setattr(
+        'image_processing_service.celery.memory_budget', budget
+    )
+    monkeypatch.setattr(
+        'image_processing_service.celery.settings.WORKER_MEMORY_BUDGET', 100
+    )
+
+    # Importado pela API e pelos filhos do LocalExecutor: desligado
+    assert not memory_budget.enabled
+    enable_memory_budget()
+
+    assert budget.enabled
+    assert budget.try_reserve(60)
+    assert not budget.try_reserve(60)
@@ -0,0 +1,137 @@
+import pytest
+from PIL import Image as PILImage
+from PIL import ImageChops, ImageStat
+
+from image_processing_service.processing.decode import (
+    PIXEL_BYTES,
+    estimate_memory,
+    open_planned,
+    plan_decode,
+)
+
+MEAN_TOLERANCE = 3
+
+
+@pytest.fixture
+def photo() -> PILImage.Image:
+    return PILImage.merge(
+        'RGB',
+        [
+            PILImage.effect_mandelbrot((1600, 1200), (-2, -1.5, 1, 1.5), 60),
+            PILImage.linear_gradient('L').resize((1600, 1200)),
+            PILImage.radial_gradient('L').resize((1600, 1200)),
+        ],
+    )
+
+
+@pytest.fixture
+def jpeg_path(tmp_path, photo) -> str:
+    path = tmp_path / 'photo.jpg'
+    photo.save(path, format='JPEG', quality=95)
+    return str(path)
+
+
+@pytest.fixture
+def png_path(tmp_path, photo) -> str:
+    path = tmp_path / 'photo.png'
+    photo.save(path, format='PNG')
+    return str(path)
+
+
+def mean_difference(first: PILImage.Image, second: PILImage.Image) -> float:
+    diff = ImageChops.difference(first, second)
+    return max(ImageStat.Stat(diff).mean)
+
+
+def full_decode(path: str, transformations: dict) -> PILImage.Image:
+    pil_image, plan = open_planned(path, transformations, 'quality')
+    return plan.execute(pil_image)
+
+
+@pytest.mark.parametrize(
+    ('strategy', 'decoded_width'),
+    [('quality', 1600), ('balanced', 400), ('speed', 200)],
+)
+def test_jpeg_draft_scale_follows_strategy(jpeg_path, strategy, decoded_width):
+    transformations = {'resize': {'width': 200, 'height': 150}}
+
+    pil_image, plan = open_planned(jpeg_path, transformations, strategy)
+
+    assert plan.source_size == (decoded_width, decoded_width * 3 // 4)
+    result = plan.execute(pil_image)
+    assert result.size == (200, 150)
+    assert (
+        mean_difference(result, full_decode(jpeg_path, transformations))
+        <= MEAN_TOLERANCE
+    )
+
+
+def test_png_uses_reduce(png_path):
+    transformations = {'resize': {'width': 200, 'height': 150}}
+
+    pil_image, plan = open_planned(png_path, transformations, 'balanced')
+
+    assert pil_image.size == (400, 300)
+    result = plan.execute(pil_image)
+    assert (
+        mean_difference(result, full_decode(png_path, transformations))
+        <= MEAN_TOLERANCE
+    )
+
+
+def test_folded_crop_is_replanned_for_decoded_size(jpeg_path):
+    transformations = {
+        'resize': {'width': 400, 'height': 300},
+        'crop': {'x': 100, 'y': 50, 'width': 100, 'height': 100},
+    }
+
+    pil_image, plan = open_planned(jpeg_path, transformations, 'speed')
+
+    assert plan.source_size == (400, 300)
+    result = plan.execute(pil_image)
+    assert result.size == (100, 100)
+    assert (
+        mean_difference(result, full_decode(jpeg_path, transformations))
+        <= MEAN_TOLERANCE
+    )
+
+
+def test_no_reduction_without_leading_resize(jpeg_path):
+    pil_image, plan = open_planned(jpeg_path, {'rotate': 90}, 'speed')
+
+    assert plan.source_size == (1600, 1200)
+
+
+def test_decoded_jpeg_is_reduced_instead_of_drafted(jpeg_path):
+    decoded = PILImage.open(jpeg_path)
+    decoded.load()
+    transformations = {'resize': {'width': 200, 'height': 150}}
+
+    pil_image, plan = plan_decode(decoded, transformations, 'balanced')
+
+    assert decoded.size == (1600, 1200)
+    assert plan.source_size == pil_image.size == (400, 300)
+
+
+@pytest.mark.parametrize(('mode', 'extension'), [('P', 'gif'), ('1', 'png')])
+def test_unreducible_modes_decode_in_full(tmp_path, photo, mode, extension):
+    path = tmp_path / f'photo.{extension}'
+    photo.convert(mode).save(path)
+    transformations = {'resize': {'width': 200, 'height': 150}}
+
+    pil_image, plan = open_planned(str(path), transformations, 'speed')
+
+    assert plan.source_size == (1600, 1200)
+    result = plan.execute(pil_image)
+    assert (result.size, result.mode) == ((200, 150), mode)
+
+
+def test_memory_estimate_follows_decode_reduction(jpeg_path, png_path):
+    thumbnail = [{'resize': {'width': 200, 'height': 150}}]
+    full = 1600 * 1200 * PIXEL_BYTES
+
+    # JPEG decodifica a 1/4 pelo draft; o PNG é lido inteiro e só então
+    # reduzido
+    assert estimate_memory(jpeg_path, thumbnail) < full / 8
+    assert estimate_memory(png_path, thumbnail) > full
+    assert estimate_memory(jpeg_path, [{'rotate': 90}]) == 2 * full
@@ -0,0 +1,152 @@
+import pytest
+from PIL import Image as PILImage
+from PIL import ImageChops, ImageOps
+
+from image_processing_service.processing.filters import (
+    CHANNEL_MAX,
+    SEPIA,
+    apply_color_matrix,
+    apply_filters,
+    brightness,
+    build_color_matrices,
+    contrast,
+)
+
+ROUNDING_TOLERANCE = 2
+
+
+@pytest.fixture
+def gradient() -> PILImage.Image:
+    image = PILImage.new('RGB', (64, 48))
+    image.putdata([
+        (x * 4, y * 5, (x + y) * 2) for y in range(48) for x in range(64)
+    ])
+    return image
+
+
+def legacy_sepia(image: PILImage.Image) -> PILImage.Image:
+    sepia = PILImage.new('RGB', image.size)
+    pixels = image.convert('RGB').load()
+    for y in range(image.size[1]):
+        for x in range(image.size[0]):
+            r, g, b = pixels[x, y]
+            tr = int(0.393 * r + 0.769 * g + 0.189 * b)
+            tg = int(0.349 * r + 0.686 * g + 0.168 * b)
+            tb = int(0.272 * r + 0.534 * g + 0.131 * b)
+            sepia.putpixel((x, y), (min(tr, 255), min(tg, 255), min(tb, 255)))
+    return sepia
+
+
+def max_difference(first: PILImage.Image, second: PILImage.Image) -> int:
+    extrema = ImageChops.difference(first, second).getextrema()
+    if first.mode == 'L':
+        extrema = [extrema]
+    return max(high for _, high in extrema)
+
+
+def test_sepia_matches_legacy_loop(gradient):
+    result = apply_filters(gradient, {'sepia': True})
+
+    assert result.mode == 'RGB'
+    assert max_difference(result, legacy_sepia(gradient)) <= 1
+
+
+def test_grayscale_keeps_l_mode(gradient):
+    result = apply_filters(gradient, {'grayscale': True})
+
+    assert result.mode == 'L'
+    assert max_difference(result, ImageOps.grayscale(gradient)) == 0
+
+
+def test_grayscale_then_sepia_matches_legacy(gradient):
+    result = apply_filters(gradient, {'grayscale': True, 'sepia': True})
+
+    expected = legacy_sepia(ImageOps.grayscale(gradient))
+    assert max_difference(result, expected) <= ROUNDING_TOLERANCE
+
+
+def test_gray_chain_stays_single_channel(gradient):
+    result = apply_filters(
+        gradient, {'grayscale': True, 'contrast': 1.2, 'invert': True}
+    )
+
+    assert result.mode == 'L'
+
+
+def test_fused_matrix_matches_sequential_passes(gradient):
+    filters = {'sepia': True, 'brightness': 0.8, 'contrast': 1.1}
+
+    sequential = apply_color_matrix(gradient, SEPIA)
+    sequential = apply_color_matrix(sequential, brightness(0.8))
+    sequential = apply_color_matrix(sequential, contrast(1.1))
+
+    result = apply_filters(gradient, filters)
+    assert max_difference(result, sequential) <= ROUNDING_TOLERANCE
+
+
+def test_chain_without_clipping_fuses_into_one_matrix():
+    filters = {
+        'brightness': 0.9,
+        'saturation': 0.5,
+        'tint': {'color': '#336699', 'strength': 0.3},
+        'invert': True,
+    }
+
+    assert len(build_color_matrices(filters)) == 1
+
+
+def test_saturating_step_splits_the_chain():
+    matrices = build_color_matrices({'sepia': True, 'brightness': 0.5})
+
+    assert matrices[0] == SEPIA
+    assert matrices[1] == brightness(0.5)
+
+
+def test_gray_input_uses_lookup_tables():
+    level = 100
+    image = PILImage.new('L', (2, 2), level)
+
+    inverted = apply_filters(image, {'invert': True})
+    assert inverted.getpixel((0, 0)) == CHANNEL_MAX - level
+    assert apply_filters(image, {'sepia': True}).getpixel((0, 0)) == (
+        135,
+        120,
+        94,
+    )
+
+
+def test_invert():
+    image = PILImage.new('RGB', (2, 2), (10, 20, 30))
+
+    result = apply_filters(image, {'invert': True})
+
+    assert result.getpixel((0, 0)) == (245, 235, 225)
+
+
+def test_saturation_zero_is_gray(gradient):
+    result = apply_filters(gradient, {'saturation': 0})
+
+    assert result.mode == 'L'
+
+
+def test_full_tint():
+    image = PILImage.new('RGB', (2, 2), (10, 20, 30))
+
+    result = apply_filters(
+        image, {'tint': {'color': '#ff8000', 'strength': 1}}
+    )
+
+    assert result.getpixel((0, 0)) == (255, 128, 0)
+
+
+def test_rgba_input_is_flattened_to_rgb():
+    image = PILImage.new('RGBA', (2, 2), (10, 20, 30, 128))
+
+    result = apply_filters(image, {'sepia': True})
+
+    assert result.mode == 'RGB'
+
+
+def test_no_color_filters_returns_same_image(gradient):
+    assert build_color_matrices({'grayscale': False}) == []
+    assert apply_filters(gradient, {}) is gradient
@@ -0,0 +1,70 @@
+import io
+import os
+
+import pytest
+from PIL import ExifTags, UnidentifiedImageError
+from PIL import Image as PILImage
+
+from image_processing_service.processing.metadata import (
+    read_header_size,
+    read_metadata,
+    sniff_format,
+)
+
+
+def test_read_metadata_from_jpeg_header(tmp_path):
+    path = tmp_path / 'photo.jpg'
+    exif = PILImage.Exif()
+    exif[ExifTags.Base.Orientation] = 6
+    PILImage.new('RGB', (120, 80)).save(path, exif=exif)
+
+    assert read_metadata(str(path)) == {
+        'width': 120,
+        'height': 80,
+        'format': 'jpeg',
+        'mode': 'RGB',
+        'frames': 1,
+        'orientation': 6,
+        'size_bytes': os.path.getsize(path),
+    }
+
+
+def test_read_metadata_counts_frames(tmp_path):
+    path = tmp_path / 'animation.gif'
+    frames = [
+        PILImage.new('RGB', (10, 10), color)
+        for color in ('red', 'green', 'blue')
+    ]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+    metadata = read_metadata(str(path))
+
+    assert metadata['frames'] == 3  # noqa: PLR2004
+    assert metadata['orientation'] is None
+
+
+def test_read_metadata_rejects_non_images(tmp_path):
+    path = tmp_path / 'notes.png'
+    path.write_bytes(b'not an image')
+
+    with pytest.raises(UnidentifiedImageError):
+        read_metadata(str(path))
+
+
+@pytest.mark.parametrize('image_format', ['jpeg', 'png', 'gif', 'webp', 'bmp'])
+def test_sniff_format_from_magic_bytes(image_format):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (8, 8)).save(buffer, format=image_format.upper())
+
+    assert sniff_format(buffer.getvalue()[:16]) == image_format
+
+
+def test_sniff_format_ignores_unknown_bytes():
+    assert sniff_format(b'<?xml version="1.0"?>') is None
+
+
+def test_read_header_size_from_partial_file():
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (640, 480)).save(buffer, format='PNG')
+
+    assert read_header_size(buffer.getvalue()[:64]) == (640, 480)
@@ -0,0 +1,254 @@
+import pytest
+from PIL import Image as PILImage
+from PIL import ImageChops, ImageStat
+
+from image_processing_service.processing.filters import apply_filters
+from image_processing_service.processing.planner import (
+    ColorFilters,
+    Resize,
+    Rotate,
+    Transpose,
+    plan_transformations,
+)
+
+MEAN_TOLERANCE = 1.5
+
+
+@pytest.fixture
+def photo() -> PILImage.Image:
+    return PILImage.merge(
+        'RGB',
+        [
+            PILImage.effect_mandelbrot((640, 480), (-2, -1.5, 1, 1.5), 60),
+            PILImage.linear_gradient('L').resize((640, 480)),
+            PILImage.radial_gradient('L').resize((640, 480)),
+        ],
+    )
+
+
+def legacy_pipeline(
+    pil_image: PILImage.Image, transformations: dict
+) -> PILImage.Image:
+    """Ordem fixa aplicada pelo worker antes do planejador."""
+    if transformations.get('resize'):
+        pil_image = pil_image.resize((
+            transformations['resize']['width'],
+            transformations['resize']['height'],
+        ))
+    if transformations.get('crop'):
+        crop = transformations['crop']
+        pil_image = pil_image.crop((
+            crop['x'],
+            crop['y'],
+            crop['x'] + crop['width'],
+            crop['y'] + crop['height'],
+        ))
+    if transformations.get('rotate'):
+        pil_image = pil_image.rotate(transformations['rotate'], expand=True)
+    if transformations.get('filters'):
+        pil_image = apply_filters(pil_image, transformations['filters'])
+    return pil_image
+
+
+def mean_difference(first: PILImage.Image, second: PILImage.Image) -> float:
+    diff = ImageChops.difference(first, second)
+    return max(ImageStat.Stat(diff).mean)
+
+
+@pytest.mark.parametrize(
+    'transformations',
+    [
+        {'resize': {'width': 320, 'height': 240}},
+        {
+            'resize': {'width': 1280, 'height': 960},
+            'crop': {'x': 100, 'y': 50, 'width': 200, 'height': 150},
+        },
+        {
+            'resize': {'width': 64, 'height': 48},
+            'crop': {'x': 10, 'y': 5, 'width': 30, 'height': 20},
+            'rotate': 90,
+        },
+        {'rotate': 270, 'filters': {'sepia': True}},
+        {'rotate': 30, 'filters': {'invert': True}},
+        {
+            'resize': {'width': 1280, 'height': 960},
+            'rotate': -90,
+            'filters': {'grayscale': True, 'contrast': 1.3},
+        },
+        {
+            'resize': {'width': 100, 'height': 100},
+            'crop': {'x': 50, 'y': 50, 'width': 100, 'height': 100},
+        },
+    ],
+)
+def test_plan_matches_legacy_pipeline(photo, transformations):
+    plan = plan_transformations(transformations, photo.size, photo.mode)
+
+    result = plan.execute(photo)
+    expected = legacy_pipeline(photo, transformations)
+
+    assert result.size == expected.size
+    assert result.mode == expected.mode
+    assert mean_difference(result, expected) <= MEAN_TOLERANCE
+
+
+def test_crop_is_folded_into_resize_box():
+    plan = plan_transformations(
+        {
+            'resize': {'width': 4000, 'height': 3000},
+            'crop': {'x': 400, 'y': 300, 'width': 200, 'height': 200},
+        },
+        (8000, 6000),
+    )
+
+    assert plan.operations == [
+        Resize(size=(200, 200), box=(800.0, 600.0, 1200.0, 1000.0))
+    ]
+
+
+def test_out_of_bounds_crop_is_not_folded():
+    plan = plan_transformations(
+        {
+            'resize': {'width': 100, 'height': 100},
+            'crop': {'x': 50, 'y': 50, 'width': 100, 'height': 100},
+        },
+        (400, 400),
+    )
+
+    expected_operations = 2
+    assert len(plan.operations) == expected_operations
+
+
+@pytest.mark.parametrize(
+    ('angle', 'method'),
+    [
+        (90, PILImage.Transpose.ROTATE_90),
+        (-90, PILImage.Transpose.ROTATE_270),
+        (540, PILImage.Transpose.ROTATE_180),
+    ],
+)
+def test_right_angle_rotation_uses_transpose(angle, method):
+    plan = plan_transformations({'rotate': angle}, (10, 20))
+
+    assert plan.operations == [Transpose(method)]
+
+
+def test_arbitrary_rotation_is_kept():
+    plan = plan_transformations({'rotate': 45}, (10, 20))
+
+    assert plan.operations == [Rotate(45)]
+
+
+def test_full_turn_is_dropped():
+    assert plan_transformations({'rotate': 360}, (10, 20)).operations == []
+
+
+def test_large_downscale_uses_reducing_gap():
+    plan = plan_transformations(
+        {'resize': {'width': 600, 'height': 400}}, (6000, 4000)
+    )
+
+    assert plan.operations[0].reducing_gap
+
+
+def test_small_downscale_skips_reducing_gap():
+    plan = plan_transformations(
+        {'resize': {'width': 3000, 'height': 2000}}, (6000, 4000)
+    )
+
+    assert plan.operations[0].reducing_gap is None
+
+
+def test_zero_size_resize_is_planned_without_reduction():
+    plan = plan_transformations(
+        {'resize': {'width': 0, 'height': 100}}, (6000, 4000)
+    )
+
+    assert plan.operations[0].reducing_gap is None
+    assert plan.decode_scale() == 1.0
+
+
+def test_filters_stay_after_downscale():
+    plan = plan_transformations(
+        {'resize': {'width': 60, 'height': 40}, 'filters': {'sepia': True}},
+        (600, 400),
+    )
+
+    assert isinstance(plan.operations[-1], ColorFilters)
+
+
+def test_filters_move_before_upscale():
+    plan = plan_transformations(
+        {'resize': {'width': 600, 'height': 400}, 'filters': {'sepia': True}},
+        (60, 40),
+    )
+
+    assert isinstance(plan.operations[0], ColorFilters)
+
+
+def test_filters_are_not_moved_across_arbitrary_rotation():
+    plan = plan_transformations(
+        {
+            'resize': {'width': 600, 'height': 400},
+            'rotate': 10,
+            'filters': {'invert': True},
+        },
+        (60, 40),
+    )
+
+    assert isinstance(plan.operations[-1], ColorFilters)
+
+
+def test_filters_are_not_moved_for_palette_images():
+    plan = plan_transformations(
+        {'resize': {'width': 600, 'height': 400}, 'filters': {'sepia': True}},
+        (60, 40),
+        mode='P',
+    )
+
+    assert isinstance(plan.operations[-1], ColorFilters)
+
+
+def test_describe_plan():
+    plan = plan_transformations(
+        {
+            'resize': {'width': 400, 'height': 300},
+            'crop': {'x': 0, 'y': 0, 'width': 100, 'height': 100},
+            'rotate': 90,
+        },
+        (800, 600),
+    )
+
+    assert str(plan) == (
+        '800x600: resize(100x100, box=(0, 0, 200, 200)) '
+        '-> transpose(ROTATE_90)'
+    )
+
+
+def test_plan_output_size(photo):
+    transformations = {
+        'resize': {'width': 300, 'height': 200},
+        'rotate': 90,
+    }
+
+    plan = plan_transformations(transformations, photo.size)
+
+    assert plan.output_size() == plan.execute(photo).size
+
+
+def test_plan_estimated_pixels():
+    plan = plan_transformations(
+        {'resize': {'width': 100, 'height': 50}, 'rotate': 90}, (400, 200)
+    )
+
+    # origem + resize + transpose
+    assert plan.estimated_pixels() == 400 * 200 + 2 * 100 * 50
+
+
+def test_plan_peak_pixels():
+    plan = plan_transformations(
+        {'resize': {'width': 100, 'height': 50}, 'rotate': 90}, (400, 200)
+    )
+
+    # A origem fica viva; no transpose, entrada e saída ao mesmo tempo
+    assert plan.peak_pixels() == 400 * 200 + 2 * 100 * 50
@@ -0,0 +1,196 @@
+import os
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image as PILImage
+from PIL import ImageChops, ImageStat
+
+from image_processing_service.processing.planner import plan_transformations
+from image_processing_service.processing.tiled import (
+    can_tile,
+    estimate_tiled_memory,
+    execute_tiled,
+    open_strips,
+    plan_tiled,
+)
+
+# Poucas linhas por faixa, para que toda transformação cruze várias
+STRIP_PIXELS = 50_000
+MAX_OUTPUT_PIXELS = 4_000_000
+
+
+@pytest.fixture
+def photo() -> PILImage.Image:
+    # Tamanho ímpar: faixas e reduções não caem em números redondos
+    return PILImage.effect_mandelbrot(
+        (1201, 901), (-2, -1.5, 1, 1.5), 60
+    ).convert('RGB')
+
+
+@pytest.fixture(params=['bmp', 'tiff', 'ppm'])
+def raw_path(request, tmp_path, photo) -> str:
+    path = tmp_path / f'photo.{request.param}'
+    photo.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    'transformations',
+    [
+        {},
+        {'resize': {'width': 300, 'height': 200}},
+        {'resize': {'width': 2000, 'height': 1500}},
+        {'crop': {'x': 100, 'y': 50, 'width': 400, 'height': 300}},
+        # Recorte que passa da borda: o resto vem preto, como no Pillow
+        {'crop': {'x': 1000, 'y': 800, 'width': 400, 'height': 300}},
+        {'rotate': 90, 'resize': {'width': 300, 'height': 200}},
+        {'flip': True, 'mirror': True},
+        {'filters': {'grayscale': True}, 'rotate': 270},
+        {
+            'resize': {'width': 400, 'height': 300},
+            'crop': {'x': 10, 'y': 20, 'width': 100, 'height': 120},
+            'rotate': 180,
+            'filters': {'sepia': True},
+        },
+    ],
+)
+def test_strips_match_full_decode(raw_path, transformations):
+    reader = open_strips(raw_path)
+    plan = plan_tiled(reader, transformations, MAX_OUTPUT_PIXELS)
+
+    tiled = execute_tiled(reader, plan, STRIP_PIXELS)
+
+    with PILImage.open(raw_path) as pil_image:
+        pil_image.load()
+        expected = plan_transformations(
+            transformations, pil_image.size, pil_image.mode, reducing_gap=None
+        ).execute(pil_image)
+    assert tiled.size == expected.size
+    diff = ImageChops.difference(tiled.convert('RGB'), expected.convert('RGB'))
+    assert max(high for _, high in ImageStat.Stat(diff).extrema) <= 1
+
+
+def test_compressed_and_free_rotation_are_not_tiled(tmp_path, photo):
+    png_path = tmp_path / 'photo.png'
+    photo.save(png_path)
+    bmp_path = tmp_path / 'photo.bmp'
+    photo.save(bmp_path)
+
+    assert open_strips(str(png_path)) is None
+    assert not can_tile(png_path.read_bytes()[:4096], 1)
+    assert can_tile(bmp_path.read_bytes()[:4096], 1201 * 901)
+    assert not can_tile(bmp_path.read_bytes()[:4096], 1201 * 901 + 1)
+    assert (
+        plan_tiled(
+            open_strips(str(bmp_path)), {'rotate': 45}, MAX_OUTPUT_PIXELS
+        )
+        is None
+    )
+
+
+def test_outputs_over_the_limit_are_not_tiled(raw_path):
+    reader = open_strips(raw_path)
+    head = Path(raw_path).read_bytes()[:4096]
+    filters = {'filters': {'grayscale': True}}
+    thumbnail = {'resize': {'width': 120, 'height': 90}}
+
+    # A saída inteira fica em memória: só miniaturas e recortes cabem
+    assert plan_tiled(reader, filters, 1201 * 901 - 1) is None
+    assert plan_tiled(reader, thumbnail, 1201 * 901 - 1)
+    assert estimate_tiled_memory(head, [filters], 1000, 120 * 90) is None
+    assert estimate_tiled_memory(head, [thumbnail], 1000, 120 * 90)
+
+
+def test_palette_images_are_not_tiled(tmp_path, photo):
+    path = tmp_path / 'photo.bmp'
+    photo.convert('P').save(path)
+
+    assert open_strips(str(path)) is None
+
+
+def write_bmp(path, width: int, height: int):
+    """BMP de 24 bits escrito linha a linha, sem montá-lo em memória."""
+    row = bytes(index * 7 % 256 for index in range(width * 3))
+    header_size = 14 + 40
+    data_size = len(row) * height
+    with open(path, 'wb') as file:
+        file.write(
+            b'BM' + struct.pack('<IHHI', header_size + data_size, 0, 0, 54)
+        )
+        # BITMAPINFOHEADER: altura positiva, linhas de baixo para cima
+        file.write(
+            struct.pack('<IiiHHII', 40, width, height, 1, 24, 0, data_size)
+            + struct.pack('<iiII', 2835, 2835, 0, 0)
+        )
+        for _ in range(height):
+            file.write(row)
+
+
+# Roda em outro processo e mede o crescimento do pico de RSS (VmHWM) a
+# partir de /proc/self/clear_refs: ru_maxrss herda o pico do pai no exec
+PEAK_SCRIPT = """
+import sys
+
+from PIL import Image as PILImage
+
+from image_processing_service.processing.planner import plan_transformations
+from image_processing_service.processing.tiled import (
+    execute_tiled, open_strips, plan_tiled,
+)
+
+
+def status_kb(field):
+    with open('/proc/self/status', encoding='ascii') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+
+path, mode = sys.argv[1:]
+transformations = {
+    'resize': {'width': 1200, 'height': 800},
+    'rotate': 90,
+    'filters': {'grayscale': True},
+}
+with open('/proc/self/clear_refs', 'w', encoding='ascii') as clear:
+    clear.write('5')
+baseline = status_kb('VmRSS')
+if mode == 'tiled':
+    reader = open_strips(path)
+    result = execute_tiled(
+        reader, plan_tiled(reader, transformations, 1_000_000), 1_000_000
+    )
+else:
+    with PILImage.open(path) as pil_image:
+        pil_image.load()
+        result = plan_transformations(
+            transformations, pil_image.size, pil_image.mode
+        ).execute(pil_image)
+assert result.size == (800, 1200)
+print((status_kb('VmHWM') - baseline) * 1024)
+"""
+
+
+def peak_growth(path, mode: str) -> int:
+    output = subprocess.run(
+        [sys.executable, '-c', PEAK_SCRIPT, str(path), mode],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(output.stdout)
+
+
+def test_peak_memory_stays_within_budget(tmp_path):
+    if not os.access('/proc/self/clear_refs', os.W_OK):
+        pytest.skip('needs /proc/self/clear_refs')
+    width, height = 6000, 4000  # 72MB decodificada
+    path = tmp_path / 'large.bmp'
+    write_bmp(path, width, height)
+
+    # Controle: decodificada inteira, a medida tem de ver a imagem toda
+    assert peak_growth(path, 'full') > width * height * 3
+    assert peak_growth(path, 'tiled') < width * height * 3 // 4
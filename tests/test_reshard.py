@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from image_processing_service.models import (
+    Image,
+    ImageStatus,
+    User,
+    table_registry,
+)
+from image_processing_service.reshard import reshard
+from image_processing_service.storage import shard_key
+
+
+@pytest.fixture
+def worker_session(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "worker.db"}')
+    table_registry.metadata.create_all(engine)
+
+    yield sessionmaker(engine, expire_on_commit=False)
+
+    engine.dispose()
+
+
+def test_reshard_moves_flat_files(worker_session, upload_dir):
+    with worker_session() as session:
+        user = User(username='owner', password='secret')
+        session.add(user)
+        session.flush()
+        for name in ('a.png', 'b.png', 'missing.png'):
+            if name != 'missing.png':
+                (upload_dir / name).write_bytes(name.encode())
+            session.add(
+                Image(
+                    filename=name, url=str(upload_dir / name), user_id=user.id
+                )
+            )
+        # Ainda na fila: o worker vai gravar no caminho antigo
+        session.add(
+            Image(
+                filename='queued.png',
+                url=str(upload_dir / 'queued.png'),
+                user_id=user.id,
+                status=ImageStatus.QUEUED,
+            )
+        )
+        session.commit()
+
+    report = reshard(worker_session, workers=2, batch_size=2)
+
+    assert (report.moved, report.missing) == (2, 1)
+    with worker_session() as session:
+        urls = {
+            image.filename: image.url for image in session.query(Image).all()
+        }
+    assert urls['a.png'] == shard_key('a.png')
+    assert (upload_dir / urls['a.png']).read_bytes() == b'a.png'
+    assert not (upload_dir / 'a.png').exists()
+    assert urls['missing.png'] == str(upload_dir / 'missing.png')
+    assert urls['queued.png'] == str(upload_dir / 'queued.png')
+
+    # Rodar de novo não faz nada
+    assert reshard(worker_session).moved == 0
+
+
+def test_reshard_skips_originals_with_pending_derivatives(
+    worker_session, upload_dir
+):
+    (upload_dir / 'busy.png').write_bytes(b'busy')
+    with worker_session() as session:
+        user = User(username='owner', password='secret')
+        session.add(user)
+        session.flush()
+        original = Image(
+            filename='busy.png',
+            url=str(upload_dir / 'busy.png'),
+            user_id=user.id,
+        )
+        session.add(original)
+        session.flush()
+        # O task enfileirado carrega o caminho antigo da original
+        derived = Image(
+            filename='derived.png',
+            url=shard_key('derived.png'),
+            user_id=user.id,
+            original_image_id=original.id,
+            status=ImageStatus.QUEUED,
+        )
+        session.add(derived)
+        session.commit()
+
+    assert reshard(worker_session).moved == 0
+    assert (upload_dir / 'busy.png').exists()
+
+    with worker_session() as session:
+        session.get(Image, derived.id).status = ImageStatus.SUCCEEDED
+        session.commit()
+    assert reshard(worker_session).moved == 1
+    assert not (upload_dir / 'busy.png').exists()
@@ -12,3 +12,12 @@ def test_root():
 
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Hello World!'}
+
+
+def test_metrics():
+    client = TestClient(app)
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert isinstance(response.json(), dict)
@@ -5,6 +5,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from image_processing_service.schemas.user_schemas import UserCreateSchema
+from image_processing_service.services.exceptions import HashingBusyError
 from image_processing_service.services.user_service import get_user_service
 
 
@@ -88,3 +89,23 @@ async def test_login_wrong_password(client: TestClient, session: AsyncSession):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Incorrect username or password'}
+
+
+def test_login_returns_503_when_hashing_is_saturated(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, user
+):
+    async def saturated(*args):
+        raise HashingBusyError('Password hashing is saturated.')
+
+    monkeypatch.setattr(
+        'image_processing_service.routers.auth_router.verify_password_async',
+        saturated,
+    )
+
+    response = client.post(
+        '/login',
+        data={'username': user.username, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
@@ -1,23 +1,56 @@
+import hashlib
 import io
-from unittest.mock import AsyncMock
+import os
 
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
+from limits import parse
+from PIL import Image as PILImage
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from image_processing_service.cache import SizedLRUCache
+from image_processing_service.metrics import metrics
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.processing.decode import image_nbytes
+from image_processing_service.routers.image_router import limiter
+from image_processing_service.services.exceptions import ExecutorBusyError
+from image_processing_service.storage import S3Storage
+from tests.fakes import FakeS3Client
 
-def test_upload_valid_image(
-    monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str
-):
-    file_content = b'fake image content'
-    file = io.BytesIO(file_content)
-    file.name = 'photo.png'
 
-    # Mock da função open para evitar salvar no disco
-    mock_file = AsyncMock()
-    mock_file.__aenter__.return_value.write = AsyncMock()
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    # O limite de 5/minute de /transform é global entre os testes
+    limiter.reset()
+
+
+def png_bytes(size=(64, 48)) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new('RGB', size).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def stored_files(directory) -> list:
+    # Os diretórios dos shards ficam; só os arquivos importam
+    return [path for path in directory.rglob('*') if path.is_file()]
+
 
-    monkeypatch.setattr('aiofiles.open', lambda *args, **kwargs: mock_file)
+@pytest.fixture
+def upload_dir(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.settings.UPLOAD_DIR',
+        tmp_path,
+    )
+    return tmp_path
+
+
+def test_upload_valid_image(client: TestClient, token: str, upload_dir):
+    file = io.BytesIO(png_bytes())
+    file.name = 'photo.png'
 
     response = client.post(
         '/images',
@@ -30,6 +63,7 @@ def test_upload_valid_image(
     assert data['filename'] == 'photo.png'
     assert data['url']
     assert data['uploaded_at']
+    assert data['sha256'] == hashlib.sha256(png_bytes()).hexdigest()
     assert 'id' in data
     assert 'user_id' in data
 
@@ -51,15 +85,15 @@ def test_upload_invalid_file_type(client: TestClient, token: str):
 def test_upload_fails_on_save(
     monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str
 ):
-    # Cria um mock de context manager que levanta erro ao entrar
-    mock_context_manager = AsyncMock()
-    mock_context_manager.__aenter__.side_effect = IOError('Disk is full')
+    def disk_full(*args):
+        raise OSError('Disk is full')
 
     monkeypatch.setattr(
-        'aiofiles.open', lambda *args, **kwargs: mock_context_manager
+        'image_processing_service.services.image_service.ingest_upload',
+        disk_full,
     )
 
-    file = io.BytesIO(b'fake image content')
+    file = io.BytesIO(png_bytes())
     file.name = 'photo.png'
 
     response = client.post(
@@ -72,6 +106,78 @@ def test_upload_fails_on_save(
     assert response.json()['detail'] == 'Error while saving the image.'
 
 
+def test_upload_rejects_unknown_signature(
+    client: TestClient, token: str, upload_dir
+):
+    response = client.post(
+        '/images',
+        files={'file': ('photo.png', b'fake image content', 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['detail'] == 'Unsupported image format.'
+    assert not stored_files(upload_dir)
+
+
+def test_upload_rejects_too_many_pixels_before_writing(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str, upload_dir
+):
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.settings.MAX_IMAGE_PIXELS',
+        1000,
+    )
+
+    response = client.post(
+        '/images',
+        files={'file': ('photo.png', png_bytes(), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert response.json()['detail'] == (
+        'Image exceeds the maximum of 1000 pixels.'
+    )
+    assert not stored_files(upload_dir)
+
+
+def test_upload_aborts_and_deletes_oversized_file(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str, upload_dir
+):
+    # O corpo passa pelo Content-Length (folga do multipart), mas o arquivo
+    # é maior que o limite e é recusado antes da cópia
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.settings.MAX_UPLOAD_BYTES',
+        100,
+    )
+
+    response = client.post(
+        '/images',
+        files={'file': ('photo.png', png_bytes((256, 256)), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert not stored_files(upload_dir)
+
+
+def test_upload_rejected_by_content_length(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str
+):
+    monkeypatch.setattr(
+        'image_processing_service.main.settings.MAX_UPLOAD_BYTES', 0
+    )
+    monkeypatch.setattr('image_processing_service.main.MULTIPART_OVERHEAD', 0)
+
+    response = client.post(
+        '/images',
+        files={'file': ('photo.png', png_bytes(), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
 def test_get_image_success(client: TestClient, token: str, image_id: int):
     response = client.get(
         f'/images/{image_id}', headers={'Authorization': f'Bearer {token}'}
@@ -107,6 +213,31 @@ def test_list_images_invalid_pagination(client: TestClient, token: str):
     assert response.json()['detail'] == 'Invalid pagination parameters'
 
 
+def test_list_images_with_cursor(
+    client: TestClient, token: str, image_id: int, queued_image_id: int
+):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/images?limit=1', headers=headers)
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get(f'/images?limit=1&after={cursor}', headers=headers)
+
+    assert [image['id'] for image in first.json() + second.json()] == [
+        queued_image_id,
+        image_id,
+    ]
+    assert 'X-Next-Cursor' not in second.headers
+
+
+def test_list_images_invalid_cursor(client: TestClient, token: str):
+    response = client.get(
+        '/images?after=***', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['detail'] == 'Invalid cursor.'
+
+
 def test_transform_image_success(
     monkeypatch: pytest.MonkeyPatch,
     client: TestClient,
@@ -128,6 +259,327 @@ def test_transform_image_success(
     data = response.json()
     assert 'filename' in data
     assert data['original_image_id'] == image_id
+    assert data['status'] == 'queued'
+
+
+def test_transform_image_queue_full(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    def full(count):
+        raise ExecutorBusyError('Processing queue is full.')
+
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.task_executor.ensure_capacity',
+        full,
+    )
+
+    response = client.post(
+        f'/images/{image_id}/transform',
+        json={'rotate': 90},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()['detail'] == 'Processing queue is full.'
+
+
+@pytest_asyncio.fixture
+async def png_image_id(
+    monkeypatch: pytest.MonkeyPatch, session: AsyncSession, user, tmp_path
+) -> int:
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.settings.UPLOAD_DIR',
+        tmp_path,
+    )
+    path = tmp_path / 'small.png'
+    PILImage.new('RGB', (300, 200), (10, 20, 30)).save(path)
+    image = Image(
+        filename='small.png',
+        url=str(path),
+        user_id=user.id,
+        width=300,
+        height=200,
+        format='png',
+        mode='RGB',
+    )
+    session.add(image)
+    await session.commit()
+    return image.id
+
+
+def test_transform_image_inline(
+    client: TestClient, token: str, png_image_id: int
+):
+    inline = metrics.get('transform_path_inline')
+
+    response = client.post(
+        f'/images/{png_image_id}/transform',
+        json={'crop': {'x': 0, 'y': 0, 'width': 200, 'height': 200}},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['status'] == ImageStatus.SUCCEEDED
+    assert metrics.get('transform_path_inline') == inline + 1
+
+
+def test_transform_image_inline_download(
+    client: TestClient, token: str, png_image_id: int
+):
+    response = client.post(
+        f'/images/{png_image_id}/transform?download=true',
+        json={'rotate': 90, 'format': 'png'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert PILImage.open(io.BytesIO(response.content)).size == (200, 300)
+
+
+def test_transform_image_inline_skips_decoded_cache(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    token: str,
+    png_image_id: int,
+):
+    cache = SizedLRUCache('api_cache', 10**8, image_nbytes)
+    monkeypatch.setattr(
+        'image_processing_service.tasks.decoded_image_cache', cache
+    )
+
+    response = client.post(
+        f'/images/{png_image_id}/transform',
+        json={'rotate': 90, 'format': 'png'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['status'] == ImageStatus.SUCCEEDED
+    assert len(cache) == 0
+
+
+def test_transform_image_above_threshold_is_queued(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    token: str,
+    png_image_id: int,
+):
+    calls = []
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.apply_transformations_async.delay',
+        lambda *args, **kwargs: calls.append(kwargs),
+    )
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.settings.SYNC_TRANSFORM_MAX_PIXELS',
+        1000,
+    )
+
+    response = client.post(
+        f'/images/{png_image_id}/transform?download=true',
+        json={'rotate': 90},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['status'] == ImageStatus.QUEUED
+    assert len(calls) == 1
+
+
+def test_transform_image_inline_records_metadata(
+    client: TestClient, token: str, png_image_id: int
+):
+    response = client.post(
+        f'/images/{png_image_id}/transform',
+        json={'resize': {'width': 150, 'height': 100}, 'format': 'png'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert (data['width'], data['height']) == (150, 100)
+    assert data['format'] == 'png'
+    assert data['size_bytes'] > 0
+
+
+@pytest.mark.parametrize(
+    'transformations',
+    [
+        {'crop': {'x': 250, 'y': 0, 'width': 100, 'height': 100}},
+        {'crop': {'x': -1, 'y': 0, 'width': 10, 'height': 10}},
+        {
+            'resize': {'width': 100, 'height': 100},
+            'crop': {'x': 0, 'y': 0, 'width': 150, 'height': 50},
+        },
+    ],
+)
+def test_transform_image_rejects_crop_out_of_bounds(
+    client: TestClient, token: str, png_image_id: int, transformations
+):
+    response = client.post(
+        f'/images/{png_image_id}/transform',
+        json=transformations,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'exceeds image bounds' in response.json()['detail']
+
+
+@pytest.mark.parametrize(
+    'transformations',
+    [
+        {'resize': {'width': 0, 'height': 100}},
+        {'resize': {'width': 100, 'height': -1}},
+        {'crop': {'x': 0, 'y': 0, 'width': 10, 'height': 0}},
+    ],
+)
+def test_transform_image_rejects_empty_sizes(
+    client: TestClient, token: str, png_image_id: int, transformations
+):
+    response = client.post(
+        f'/images/{png_image_id}/transform',
+        json=transformations,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_upload_records_metadata(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str, tmp_path
+):
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.settings.UPLOAD_DIR',
+        tmp_path,
+    )
+    content = io.BytesIO()
+    PILImage.new('L', (64, 48)).save(content, format='PNG')
+
+    response = client.post(
+        '/images',
+        files={'file': ('gray.png', content.getvalue(), 'image/png')},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert response.status_code == status.HTTP_201_CREATED
+    assert (data['width'], data['height']) == (64, 48)
+    assert (data['format'], data['mode'], data['frames']) == ('png', 'L', 1)
+    assert data['size_bytes'] == len(content.getvalue())
+
+
+def create_upload_session(client: TestClient, token: str, size: int) -> str:
+    response = client.post(
+        '/images/uploads',
+        json={
+            'filename': 'big.png',
+            'content_type': 'image/png',
+            'size': size,
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()['id']
+
+
+def test_resumable_upload(client: TestClient, token: str, upload_dir):
+    content = png_bytes()
+    headers = {'Authorization': f'Bearer {token}'}
+    half = len(content) // 2
+    session_id = create_upload_session(client, token, len(content))
+
+    response = client.put(
+        f'/images/uploads/{session_id}?offset=0',
+        content=content[:half],
+        headers=headers,
+    )
+    assert response.json()['offset'] == half
+
+    # Um chunk repetido (ex.: resposta perdida) é recusado com o offset
+    # certo, que o cliente também pode consultar
+    response = client.put(
+        f'/images/uploads/{session_id}?offset=0',
+        content=content[:half],
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = client.get(f'/images/uploads/{session_id}', headers=headers)
+    assert response.json()['offset'] == half
+
+    client.put(
+        f'/images/uploads/{session_id}?offset={half}',
+        content=content[half:],
+        headers=headers,
+    )
+    response = client.post(
+        f'/images/uploads/{session_id}/complete', headers=headers
+    )
+
+    data = response.json()
+    assert response.status_code == status.HTTP_201_CREATED
+    assert data['filename'] == 'big.png'
+    assert (data['width'], data['height']) == (64, 48)
+    assert data['sha256'] == hashlib.sha256(content).hexdigest()
+    assert not list((upload_dir / '.staging').iterdir())
+    assert (upload_dir / data['url']).read_bytes() == content
+    response = client.get(f'/images/uploads/{session_id}', headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_resumable_upload_rejects_oversized_chunk(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, token: str, upload_dir
+):
+    monkeypatch.setattr(
+        'image_processing_service.services.upload_service.settings.UPLOAD_SESSION_CHUNK_SIZE',
+        50,
+    )
+    content = png_bytes()
+    headers = {'Authorization': f'Bearer {token}'}
+    session_id = create_upload_session(client, token, len(content))
+
+    response = client.put(
+        f'/images/uploads/{session_id}?offset=0',
+        content=content[:60],
+        headers=headers,
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    response = client.get(f'/images/uploads/{session_id}', headers=headers)
+    assert response.json()['offset'] == 0
+
+
+def test_resumable_upload_rejects_non_image_head(
+    client: TestClient, token: str, upload_dir
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    session_id = create_upload_session(client, token, 18)
+
+    response = client.put(
+        f'/images/uploads/{session_id}?offset=0',
+        content=b'fake image content',
+        headers=headers,
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not list((upload_dir / '.staging').iterdir())
+    response = client.get(f'/images/uploads/{session_id}', headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_resumable_upload_complete_requires_all_bytes(
+    client: TestClient, token: str, upload_dir
+):
+    session_id = create_upload_session(client, token, 1000)
+
+    response = client.post(
+        f'/images/uploads/{session_id}/complete',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()['detail'] == (
+        'Upload is incomplete: 0 of 1000 bytes.'
+    )
 
 
 def test_transform_image_not_found(client: TestClient, token: str):
@@ -167,6 +619,205 @@ def test_download_image_success(
     assert 'attachment' in response.headers.get('content-disposition', '')
 
 
+def test_download_image_redirects_to_presigned_url(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    monkeypatch.setattr(
+        'image_processing_service.routers.image_router.storage',
+        S3Storage('bucket', client=FakeS3Client()),
+    )
+
+    response = client.get(
+        f'/images/{image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+        follow_redirects=False,
+    )
+
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    location = response.headers['location']
+    assert location.startswith('https://bucket.s3.test/')
+    assert 'test_image.png' in location
+
+
+def test_download_image_sets_validators(
+    client: TestClient, token: str, png_image_id: int
+):
+    response = client.get(
+        f'/images/{png_image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['cache-control'] == 'private, no-cache'
+    assert response.headers['etag'].startswith('"')
+    assert response.headers['last-modified']
+    assert response.headers['accept-ranges'] == 'bytes'
+
+
+@pytest.mark.parametrize('validator', ['etag', 'last-modified'])
+def test_download_image_not_modified(
+    client: TestClient, token: str, png_image_id: int, validator: str
+):
+    url = f'/images/{png_image_id}/download'
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get(url, headers=headers)
+    condition = {
+        'etag': 'If-None-Match',
+        'last-modified': 'If-Modified-Since',
+    }[validator]
+
+    response = client.get(
+        url, headers={**headers, condition: first.headers[validator]}
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not response.content
+    assert response.headers['etag'] == first.headers['etag']
+
+
+def test_download_image_modified_since_older_date(
+    client: TestClient, token: str, png_image_id: int
+):
+    response = client.get(
+        f'/images/{png_image_id}/download',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'If-Modified-Since': 'Wed, 01 Jan 2020 00:00:00 GMT',
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_download_image_range(
+    client: TestClient, token: str, png_image_id: int
+):
+    url = f'/images/{png_image_id}/download'
+    headers = {'Authorization': f'Bearer {token}'}
+    full = client.get(url, headers=headers)
+
+    response = client.get(url, headers={**headers, 'Range': 'bytes=8-'})
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == full.content[8:]
+    assert response.headers['content-range'] == (
+        f'bytes 8-{len(full.content) - 1}/{len(full.content)}'
+    )
+
+
+def test_download_image_resumes_only_unchanged_file(
+    client: TestClient, token: str, png_image_id: int
+):
+    url = f'/images/{png_image_id}/download'
+    headers = {'Authorization': f'Bearer {token}', 'Range': 'bytes=8-'}
+
+    response = client.get(url, headers={**headers, 'If-Range': '"stale"'})
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_download_derived_image_is_immutable(
+    client: TestClient,
+    session: AsyncSession,
+    token: str,
+    queued_image_id: int,
+):
+    image = await session.get(Image, queued_image_id)
+    PILImage.new('RGB', (8, 8)).save(image.url, format='JPEG')
+    image.status = ImageStatus.SUCCEEDED
+    image.format = 'jpeg'
+    await session.commit()
+
+    response = client.get(
+        f'/images/{queued_image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'image/jpeg'
+    assert response.headers['cache-control'] == (
+        'private, max-age=31536000, immutable'
+    )
+
+
+@pytest.mark.asyncio
+async def test_download_image_offloaded_to_nginx(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    session: AsyncSession,
+    token: str,
+    png_image_id: int,
+):
+    monkeypatch.setattr(
+        'image_processing_service.utils.http.settings.DOWNLOAD_OFFLOAD',
+        'nginx',
+    )
+    image = await session.get(Image, png_image_id)
+
+    response = client.get(
+        f'/images/{png_image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not response.content
+    assert response.headers['x-accel-redirect'] == (
+        f'/protected-uploads/{os.path.basename(image.url)}'
+    )
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['etag']
+    assert 'attachment' in response.headers['content-disposition']
+
+
+@pytest.mark.asyncio
+async def test_download_image_offloaded_with_x_sendfile(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    session: AsyncSession,
+    token: str,
+    png_image_id: int,
+):
+    monkeypatch.setattr(
+        'image_processing_service.utils.http.settings.DOWNLOAD_OFFLOAD',
+        'sendfile',
+    )
+    image = await session.get(Image, png_image_id)
+
+    response = client.get(
+        f'/images/{png_image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not response.content
+    assert response.headers['x-sendfile'] == image.url
+
+
+def test_download_image_offload_still_answers_not_modified(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    token: str,
+    png_image_id: int,
+):
+    url = f'/images/{png_image_id}/download'
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get(url, headers=headers).headers['etag']
+    monkeypatch.setattr(
+        'image_processing_service.utils.http.settings.DOWNLOAD_OFFLOAD',
+        'nginx',
+    )
+
+    response = client.get(url, headers={**headers, 'If-None-Match': etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert 'x-accel-redirect' not in response.headers
+
+
 def test_download_image_not_found(client: TestClient, token: str):
     response = client.get(
         '/images/999999/download',
@@ -178,17 +829,359 @@ def test_download_image_not_found(client: TestClient, token: str):
 
 
 def test_download_image_file_not_ready(
+    client: TestClient,
+    token: str,
+    queued_image_id: int,
+):
+    response = client.get(
+        f'/images/{queued_image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()['detail'] == 'Transformations in progress.'
+
+
+@pytest.mark.asyncio
+async def test_download_image_failed(
+    client: TestClient,
+    session: AsyncSession,
+    token: str,
+    queued_image_id: int,
+):
+    image = await session.get(Image, queued_image_id)
+    image.status = ImageStatus.FAILED
+    image.error = 'cannot identify image file'
+    await session.commit()
+
+    response = client.get(
+        f'/images/{queued_image_id}/download',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()['detail'] == (
+        'Transformation failed: cannot identify image file'
+    )
+
+
+def test_get_image_status(
+    client: TestClient, token: str, queued_image_id: int
+):
+    response = client.get(
+        f'/images/{queued_image_id}/status',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data['status'] == 'queued'
+    assert data['queued_at']
+    assert data['started_at'] is None
+
+
+def test_get_image_status_not_found(client: TestClient, token: str):
+    response = client.get(
+        '/images/999999/status',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_get_job_stats(
+    client: TestClient,
+    session: AsyncSession,
+    token: str,
+    queued_image_id: int,
+):
+    image = await session.get(Image, queued_image_id)
+    image.status = ImageStatus.SUCCEEDED
+    image.queue_wait_seconds = 0.5
+    image.processing_seconds = 1.5
+    await session.commit()
+
+    response = client.get(
+        '/images/stats', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        'succeeded': {
+            'count': 1,
+            'queue_wait_seconds': {'avg': 0.5, 'max': 0.5},
+            'processing_seconds': {'avg': 1.5, 'max': 1.5},
+        }
+    }
+
+
+def test_transform_image_reuses_existing_derived_image(
+    monkeypatch: pytest.MonkeyPatch,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    calls = []
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.apply_transformations_async.delay',
+        lambda *args, **kwargs: calls.append(kwargs),
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.post(
+        f'/images/{image_id}/transform',
+        json={'rotate': -90, 'filters': {'sepia': True}},
+        headers=headers,
+    )
+    second = client.post(
+        f'/images/{image_id}/transform',
+        json={
+            'rotate': 270,
+            'format': 'JPEG',
+            'filters': {'sepia': True, 'grayscale': False},
+        },
+        headers=headers,
+    )
+    other = client.post(
+        f'/images/{image_id}/transform',
+        json={'rotate': 90},
+        headers=headers,
+    )
+
+    assert first.json()['id'] == second.json()['id']
+    assert other.json()['id'] != first.json()['id']
+    assert len(calls) == 2  # noqa: PLR2004
+
+
+def test_create_renditions(
     monkeypatch: pytest.MonkeyPatch,
     client: TestClient,
     token: str,
     image_id: int,
 ):
-    monkeypatch.setattr('os.path.exists', lambda path: False)
+    calls = []
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.generate_renditions_async.delay',
+        lambda *args, **kwargs: calls.append(kwargs),
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+    body = {
+        'renditions': [
+            {'width': 100, 'height': 100},
+            {'width': 50, 'height': 50, 'format': 'webp'},
+        ]
+    }
+
+    first = client.post(
+        f'/images/{image_id}/renditions', json=body, headers=headers
+    )
+    second = client.post(
+        f'/images/{image_id}/renditions', json=body, headers=headers
+    )
+
+    assert first.status_code == status.HTTP_200_OK
+    assert [image['status'] for image in first.json()] == ['queued'] * 2
+    assert [image['id'] for image in first.json()] == [
+        image['id'] for image in second.json()
+    ]
+    # Uma única task para todas as renditions, e nenhuma na repetição
+    assert len(calls) == 1
+    assert [r['transformations'] for r in calls[0]['renditions']] == [
+        {'resize': {'width': 100, 'height': 100}, 'format': 'jpeg'},
+        {'resize': {'width': 50, 'height': 50}, 'format': 'webp'},
+    ]
+
+
+def test_create_renditions_not_found(client: TestClient, token: str):
+    response = client.post(
+        '/images/999/renditions',
+        json={'renditions': [{'width': 10, 'height': 10}]},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_stream_image_events_for_finished_job(
+    client: TestClient, token: str, image_id: int
+):
+    with client.stream(
+        'GET',
+        f'/images/events?ids={image_id}',
+        headers={'Authorization': f'Bearer {token}'},
+    ) as response:
+        body = ''.join(response.iter_text())
 
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert body == (
+        f'id: {image_id}\nevent: succeeded\n'
+        f'data: {{"id": {image_id}, "status": "succeeded", "error": null}}\n\n'
+    )
+
+
+def test_stream_image_events_not_found(
+    client: TestClient, token: str, image_id: int
+):
     response = client.get(
-        f'/images/{image_id}/download',
+        f'/images/events?ids={image_id}&ids=999999',
         headers={'Authorization': f'Bearer {token}'},
     )
 
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.fixture
+def dispatched_chunks(monkeypatch: pytest.MonkeyPatch) -> list:
+    calls = []
+
+    class FakeChunks:
+        def __init__(self, items, size):
+            calls.append((list(items), size))
+
+        @staticmethod
+        def apply_async():
+            return None
+
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.apply_transformations_async.chunks',
+        FakeChunks,
+    )
+    return calls
+
+
+def test_transform_images_batch(
+    dispatched_chunks: list,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    body = {'image_ids': [image_id], 'transformations': {'rotate': 90}}
+
+    response = client.post(
+        '/images/transform:batch', json=body, headers=headers
+    )
+
     assert response.status_code == status.HTTP_202_ACCEPTED
-    assert response.json()['detail'] == 'Transformations in progress.'
+    data = response.json()
+    assert data['total'] == 1
+    assert data['progress']['queued'] == 1
+    assert len(data['image_ids']) == 1
+    [(items, _)] = dispatched_chunks
+    assert items[0][3] == data['image_ids'][0]
+
+    progress = client.get(f'/images/batches/{data["id"]}', headers=headers)
+    assert progress.status_code == status.HTTP_200_OK
+    assert progress.json()['image_ids'] == data['image_ids']
+
+    repeated = client.post(
+        '/images/transform:batch', json=body, headers=headers
+    )
+    assert repeated.json()['image_ids'] == data['image_ids']
+    assert len(dispatched_chunks) == 1
+
+
+def test_transform_images_batch_by_filter(
+    dispatched_chunks: list,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    response = client.post(
+        '/images/transform:batch',
+        json={
+            'filter': {'uploaded_after': '2000-01-01T00:00:00'},
+            'transformations': {'filters': {'grayscale': True}},
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()['total'] == 1
+
+
+def test_transform_images_batch_unknown_image(
+    client: TestClient, token: str, image_id: int
+):
+    response = client.post(
+        '/images/transform:batch',
+        json={'image_ids': [image_id, 999999], 'transformations': {}},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_transform_images_batch_too_many_ids(
+    monkeypatch: pytest.MonkeyPatch,
+    dispatched_chunks: list,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    monkeypatch.setattr(
+        'image_processing_service.routers.image_router.settings.BATCH_MAX_IMAGES',
+        1,
+    )
+
+    # Mais ids que o limite + 1: a consulta truncada não pode virar 404
+    response = client.post(
+        '/images/transform:batch',
+        json={
+            'image_ids': [image_id, image_id + 1, image_id + 2],
+            'transformations': {},
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {'detail': 'Batch exceeds 1 images.'}
+    assert not dispatched_chunks
+
+
+def test_transform_images_batch_requires_selection(
+    client: TestClient, token: str
+):
+    response = client.post(
+        '/images/transform:batch',
+        json={'transformations': {}},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_transform_images_batch_rate_limited_by_cost(
+    monkeypatch: pytest.MonkeyPatch,
+    dispatched_chunks: list,
+    client: TestClient,
+    token: str,
+    image_id: int,
+):
+    monkeypatch.setattr(
+        'image_processing_service.routers.image_router.batch_rate_limit',
+        parse('1/minute'),
+    )
+    monkeypatch.setattr(
+        'image_processing_service.routers.image_router.limiter',
+        Limiter(key_func=get_remote_address),
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+    body = {'image_ids': [image_id], 'transformations': {}}
+
+    first = client.post('/images/transform:batch', json=body, headers=headers)
+    second = client.post('/images/transform:batch', json=body, headers=headers)
+
+    assert first.status_code == status.HTTP_202_ACCEPTED
+    assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def test_get_batch_not_found(client: TestClient, token: str):
+    response = client.get(
+        '/images/batches/unknown',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,25 @@
+from image_processing_service.routing import HashRing
+
+KEYS = [f'ab/cd/{index}.png' for index in range(2000)]
+
+
+def test_ring_is_stable_and_uses_every_queue():
+    ring = HashRing(['q.0', 'q.1', 'q.2'])
+
+    assignments = [ring.node_for(key) for key in KEYS]
+
+    assert assignments == [ring.node_for(key) for key in KEYS]
+    assert set(assignments) == {'q.0', 'q.1', 'q.2'}
+
+
+def test_adding_a_queue_only_moves_its_share_of_originals():
+    before = HashRing(['q.0', 'q.1', 'q.2'])
+    after = HashRing(['q.0', 'q.1', 'q.2', 'q.3'])
+
+    moved = [
+        key for key in KEYS if before.node_for(key) != after.node_for(key)
+    ]
+
+    # Só as que passaram para a fila nova mudam de lugar (~1/4)
+    assert all(after.node_for(key) == 'q.3' for key in moved)
+    assert len(moved) < len(KEYS) / 3
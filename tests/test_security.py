@@ -5,6 +5,7 @@ import pytest
 from fastapi import HTTPException, status
 from jwt import decode, encode
 
+from image_processing_service.cache import token_cache
 from image_processing_service.models import User
 from image_processing_service.security import (
     create_access_token,
@@ -16,8 +17,10 @@ from image_processing_service.settings import settings
 class MockUserService:
     def __init__(self, user: User | None):
         self._user = user
+        self.calls = 0
 
     async def get_user(self, username: str):
+        self.calls += 1
         if self._user and self._user.username == username:
             return self._user
         return None
@@ -74,3 +77,30 @@ async def test_get_current_user_user_not_found():
 
     assert exc.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert exc.value.detail == 'Could not validate credentials'
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_is_cached():
+    user = User(username='cacheduser', password='hashed')
+    token = fake_generate_token(user.username)
+    user_service = MockUserService(user)
+
+    first = await get_current_user(user_service=user_service, token=token)
+    second = await get_current_user(user_service=user_service, token=token)
+
+    assert first is second
+    assert user_service.calls == 1
+    assert token_cache.get(token) == user.username
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_does_not_cache_expired_token():
+    user = User(username='expireduser', password='hashed')
+    token = fake_generate_token(user.username, expires_delta_minutes=-1)
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(user_service=MockUserService(user), token=token)
+
+    assert exc.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+    assert token_cache.get(token) is None
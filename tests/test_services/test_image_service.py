@@ -0,0 +1,147 @@
+import threading
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from image_processing_service.metrics import metrics
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.schemas.image_transform_schemas import (
+    TransformationSchema,
+)
+from image_processing_service.services.image_service import (
+    ImageService,
+    canonical_transformations,
+    transformation_key,
+)
+
+
+def test_canonical_transformations_normalizes_equivalent_requests():
+    first = TransformationSchema.model_validate({
+        'rotate': 450,
+        'filters': {'grayscale': True, 'sepia': False},
+    })
+    second = TransformationSchema.model_validate({
+        'rotate': 90,
+        'format': 'JPEG',
+        'filters': {'grayscale': True},
+    })
+
+    assert canonical_transformations(first) == canonical_transformations(
+        second
+    )
+    assert canonical_transformations(first) == {
+        'format': 'jpeg',
+        'rotate': 90,
+        'filters': {'grayscale': True},
+    }
+
+
+def test_transformation_key_depends_on_original():
+    transformations = {'format': 'png'}
+
+    assert transformation_key(1, transformations) != transformation_key(
+        2, transformations
+    )
+
+
+@pytest.mark.asyncio
+async def test_apply_transformations_counts_hits_and_misses(
+    monkeypatch: pytest.MonkeyPatch,
+    session: AsyncSession,
+    image_id: int,
+):
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.apply_transformations_async.delay',
+        lambda *args, **kwargs: None,
+    )
+    service = ImageService(session)
+    image = await session.get(Image, image_id)
+    options = TransformationSchema(format='png')
+    hits = metrics.get('transform_cache_hits')
+    misses = metrics.get('transform_cache_misses')
+
+    first = await service.apply_transformations(image, options)
+    second = await service.apply_transformations(image, options)
+
+    assert first.id == second.id
+    assert first.transformation_key
+    assert metrics.get('transform_cache_misses') == misses + 1
+    assert metrics.get('transform_cache_hits') == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_cost_of_legacy_original_is_read_off_the_event_loop(
+    monkeypatch: pytest.MonkeyPatch,
+    session: AsyncSession,
+    image_id: int,
+):
+    threads = []
+
+    def read_range(key, start, length):
+        threads.append(threading.current_thread())
+        raise OSError('unreadable')
+
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.storage.read_range',
+        read_range,
+    )
+    monkeypatch.setattr(
+        'image_processing_service.services.image_service.apply_transformations_async.delay',
+        lambda *args, **kwargs: None,
+    )
+    service = ImageService(session)
+    image = await session.get(Image, image_id)
+
+    # Sem largura gravada (linha antiga): o custo vem do cabeçalho
+    new_image = await service.apply_transformations(
+        image, TransformationSchema(format='png')
+    )
+
+    assert new_image.status == ImageStatus.QUEUED
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+@pytest.mark.asyncio
+async def test_get_images_for_user_walks_cursor_pages(
+    session: AsyncSession, user, image_id: int
+):
+    # No mesmo commit todas recebem o mesmo uploaded_at: o id desempata
+    for index in range(4):
+        session.add(
+            Image(
+                filename=f'{index}.png',
+                url=f'{index}.png',
+                user_id=user.id,
+                original_image_id=image_id if index % 2 else None,
+            )
+        )
+    await session.commit()
+    service = ImageService(session)
+
+    seen = []
+    cursor = None
+    while True:
+        images, cursor = await service.get_images_for_user(
+            user.id, page=1, limit=2, after=cursor, originals_only=True
+        )
+        seen.extend(image.id for image in images)
+        if cursor is None:
+            break
+
+    originals, _ = await service.get_images_for_user(
+        user.id, page=1, limit=10, originals_only=True
+    )
+    assert seen == [image.id for image in originals]
+    assert len(seen) == 3  # noqa: PLR2004
+    assert all(image.original_image_id is None for image in originals)
+
+
+@pytest.mark.asyncio
+async def test_get_images_for_user_rejects_invalid_cursor(
+    session: AsyncSession, user
+):
+    with pytest.raises(ValueError, match='Invalid cursor.'):
+        await ImageService(session).get_images_for_user(
+            user.id, page=1, limit=10, after='not a cursor'
+        )
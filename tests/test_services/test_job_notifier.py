@@ -0,0 +1,72 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.services.job_notifier import JobNotifier
+
+
+@pytest_asyncio.fixture
+async def notifier(session: AsyncSession):
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    notifier = JobNotifier(session_factory, interval=0.01)
+
+    yield notifier
+
+    await notifier.close()
+
+
+@pytest.mark.asyncio
+async def test_subscribers_get_completion(
+    notifier: JobNotifier, session: AsyncSession, queued_image_id: int
+):
+    first = notifier.subscribe([queued_image_id])
+    second = notifier.subscribe([queued_image_id])
+
+    image = await session.get(Image, queued_image_id)
+    image.status = ImageStatus.SUCCEEDED
+    await session.commit()
+
+    for queue in (first, second):
+        event = await asyncio.wait_for(queue.get(), timeout=1)
+        assert event == (queued_image_id, 'succeeded', None)
+
+
+@pytest.mark.asyncio
+async def test_stream_waits_for_pending_jobs(
+    notifier: JobNotifier, session: AsyncSession, queued_image_id: int
+):
+    image = await session.get(Image, queued_image_id)
+    events = notifier.stream([image], heartbeat=0.01)
+
+    assert await anext(events) == ': keep-alive\n\n'
+
+    image.status = ImageStatus.FAILED
+    image.error = 'boom'
+    await session.commit()
+
+    event = await anext(events)
+    while event.startswith(':'):
+        event = await anext(events)
+
+    assert event.startswith(f'id: {queued_image_id}\nevent: failed\n')
+    assert '"error": "boom"' in event
+    with pytest.raises(StopAsyncIteration):
+        await anext(events)
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_removes_queue(
+    notifier: JobNotifier, queued_image_id: int
+):
+    queue = notifier.subscribe([queued_image_id])
+
+    notifier.unsubscribe(queue, [queued_image_id])
+
+    assert not notifier._subscriptions
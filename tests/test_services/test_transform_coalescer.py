@@ -0,0 +1,136 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from image_processing_service.models import Image, ImageStatus
+from image_processing_service.services.exceptions import ExecutorBusyError
+from image_processing_service.services.transform_coalescer import (
+    TransformCoalescer,
+)
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.calls = []
+        self.capacity_checks = []
+        self.error = None
+
+    def ensure_capacity(self, count):
+        self.capacity_checks.append(count)
+
+    def submit(self, task, **kwargs):
+        if self.error:
+            raise self.error
+        self.calls.append((task.name.rsplit('.', 1)[1], kwargs))
+
+
+@pytest.fixture
+def executor(monkeypatch: pytest.MonkeyPatch) -> RecordingExecutor:
+    executor = RecordingExecutor()
+    monkeypatch.setattr(
+        'image_processing_service.services.transform_coalescer.task_executor',
+        executor,
+    )
+    return executor
+
+
+@pytest.fixture
+def session_factory(session: AsyncSession):
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    return session_factory
+
+
+def job(image_id: int) -> dict:
+    return {
+        'image_id': image_id,
+        'new_image_key': f'{image_id}.png',
+        'transformations': {'format': 'png'},
+    }
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_one_original_in_the_window_become_one_task(
+    executor: RecordingExecutor, session_factory
+):
+    coalescer = TransformCoalescer(session_factory, window=0.01, max_jobs=10)
+
+    coalescer.add('a.png', job(1))
+    coalescer.add('b.png', job(2))
+    coalescer.add('a.png', job(3))
+    assert not executor.calls
+
+    await asyncio.sleep(0.05)
+
+    assert executor.calls == [
+        (
+            'transform_group_async',
+            {'original_image_key': 'a.png', 'jobs': [job(1), job(3)]},
+        ),
+        (
+            'apply_transformations_async',
+            {'original_image_key': 'b.png', **job(2)},
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_full_group_and_close_submit_without_waiting(
+    executor: RecordingExecutor, session_factory
+):
+    coalescer = TransformCoalescer(session_factory, window=60, max_jobs=2)
+
+    coalescer.add('a.png', job(1))
+    coalescer.add('a.png', job(2))
+    coalescer.add('b.png', job(3))
+    assert [kwargs['original_image_key'] for _, kwargs in executor.calls] == [
+        'a.png'
+    ]
+
+    await coalescer.close()
+
+    assert executor.calls[-1] == (
+        'apply_transformations_async',
+        {'original_image_key': 'b.png', **job(3)},
+    )
+
+
+@pytest.mark.asyncio
+async def test_groups_in_the_window_count_toward_capacity(
+    executor: RecordingExecutor, session_factory
+):
+    coalescer = TransformCoalescer(session_factory, window=60, max_jobs=10)
+
+    coalescer.add('a.png', job(1))
+    coalescer.add('a.png', job(2))
+    coalescer.add('b.png', job(3))
+    coalescer.ensure_capacity(1)
+
+    assert executor.capacity_checks == [3]
+    await coalescer.close()
+
+
+@pytest.mark.asyncio
+async def test_jobs_that_cannot_be_submitted_are_marked_failed(
+    executor: RecordingExecutor,
+    session_factory,
+    session: AsyncSession,
+    queued_image_id: int,
+):
+    coalescer = TransformCoalescer(session_factory, window=0.01, max_jobs=10)
+    executor.error = ExecutorBusyError('Processing queue is full.')
+
+    coalescer.add('a.png', job(queued_image_id))
+    await asyncio.sleep(0.05)
+    await coalescer.close()
+
+    image = await session.get(Image, queued_image_id)
+    await session.refresh(image)
+    assert image.status == ImageStatus.FAILED
+    assert 'Processing queue is full.' in image.error
+    assert image.transformation_key is None
+    assert image.finished_at
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from image_processing_service.services.exceptions import UploadTooLargeError
+from image_processing_service.services.upload_service import (
+    UploadService,
+    staging_path,
+)
+
+
+@pytest.fixture
+def upload_dir(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.setattr(
+        'image_processing_service.services.upload_service.settings.UPLOAD_DIR',
+        tmp_path,
+    )
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_new_session_purges_expired_ones(
+    monkeypatch: pytest.MonkeyPatch, session: AsyncSession, user, upload_dir
+):
+    service = UploadService(session)
+    monkeypatch.setattr(
+        'image_processing_service.services.upload_service.settings.UPLOAD_SESSION_TTL',
+        0,
+    )
+    abandoned = await service.create_session(user.id, 'a.png', 'image/png', 10)
+    assert await service.get_session(abandoned.id, user.id) is None
+
+    monkeypatch.setattr(
+        'image_processing_service.services.upload_service.settings.UPLOAD_SESSION_TTL',
+        60,
+    )
+    active = await service.create_session(user.id, 'b.png', 'image/png', 10)
+
+    assert not os.path.exists(staging_path(abandoned.id))
+    assert os.path.exists(staging_path(active.id))
+    assert await service.purge_expired() == 0
+
+
+@pytest.mark.asyncio
+async def test_session_rejects_size_above_limit(
+    session: AsyncSession, user, upload_dir
+):
+    service = UploadService(session)
+
+    with pytest.raises(UploadTooLargeError):
+        await service.create_session(
+            user.id, 'huge.tiff', 'image/tiff', 2 * 1024**3
+        )
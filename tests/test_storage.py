@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from image_processing_service.storage import (
+    LocalStorage,
+    S3Storage,
+    scratch_path,
+    shard_key,
+)
+from tests.fakes import FakeS3Client
+
+
+def test_shard_key_is_stable_and_two_levels_deep():
+    key = shard_key('photo.png')
+
+    assert key == shard_key('photo.png')
+    assert key.endswith('/photo.png')
+    assert [len(part) for part in key.split('/')[:2]] == [2, 2]
+
+
+def test_local_storage_paths(tmp_path):
+    storage = LocalStorage(tmp_path)
+    key = storage.new_key('.png')
+
+    path = storage.writable_path(key)
+
+    assert path == os.path.join(tmp_path, key)
+    assert os.path.isdir(os.path.dirname(path))
+    # Linhas antigas guardam o caminho absoluto
+    assert storage.path('/srv/uploads/old.png') == '/srv/uploads/old.png'
+
+
+@pytest.fixture
+def s3_client():
+    return FakeS3Client()
+
+
+def scratch_file(content: bytes) -> str:
+    path = scratch_path()
+    with open(path, 'wb') as scratch:
+        scratch.write(content)
+    return path
+
+
+def test_s3_storage_round_trip(s3_client):
+    storage = S3Storage('bucket', client=s3_client, part_size=1024)
+    path = scratch_file(b'image bytes')
+
+    storage.store(path, 'ab/cd/photo.png')
+
+    assert s3_client.objects['bucket', 'ab/cd/photo.png'] == b'image bytes'
+    assert not os.path.exists(path)
+    with storage.fetch('ab/cd/photo.png') as fetched:
+        with open(fetched, 'rb') as local:
+            assert local.read() == b'image bytes'
+    assert not os.path.exists(fetched)
+    assert storage.read_range('ab/cd/photo.png', 6, 5) == b'bytes'
+
+
+def test_s3_storage_uploads_large_files_in_parts(s3_client):
+    storage = S3Storage('bucket', client=s3_client, part_size=4)
+
+    storage.store(scratch_file(b'0123456789'), 'key.png')
+
+    assert s3_client.objects['bucket', 'key.png'] == b'0123456789'
+    assert not s3_client.uploads
+
+
+def test_s3_storage_aborts_failed_multipart_upload(
+    monkeypatch: pytest.MonkeyPatch, s3_client
+):
+    def broken_part(**kwargs):
+        raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(s3_client, 'upload_part', broken_part)
+    storage = S3Storage('bucket', client=s3_client, part_size=4)
+
+    with pytest.raises(ConnectionError):
+        storage.store(scratch_file(b'0123456789'), 'key.png')
+
+    assert s3_client.aborted == ['1']
+    assert not s3_client.uploads
+    assert ('bucket', 'key.png') not in s3_client.objects
+
+
+def test_s3_storage_presigned_url(s3_client):
+    storage = S3Storage('bucket', client=s3_client, presigned_url_ttl=60)
+
+    url = storage.presigned_url('ab/cd/photo.png', 'foto.png', 'image/png')
+
+    assert url.startswith('https://bucket.s3.test/ab/cd/photo.png?')
+    assert 'ResponseContentType=image%2Fpng' in url
+    assert 'X-Amz-Expires=60' in url
+    assert LocalStorage().presigned_url('key', 'foto.png', 'image/png') is None
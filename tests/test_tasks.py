@@ -0,0 +1,468 @@
+import io
+import threading
+
+import pytest
+from celery.exceptions import Retry
+from PIL import Image as PILImage
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from image_processing_service.cache import SizedLRUCache
+from image_processing_service.memory import MemoryBudget
+from image_processing_service.models import (
+    Image,
+    ImageStatus,
+    User,
+    table_registry,
+)
+from image_processing_service.processing.decode import image_nbytes
+from image_processing_service.services.exceptions import ImageSaveError
+from image_processing_service.settings import settings
+from image_processing_service.storage import S3Storage
+from image_processing_service.tasks import (
+    apply_transformations_async,
+    generate_renditions_async,
+    open_original,
+    transform_group_async,
+    transform_stored_image,
+)
+from tests.fakes import FakeS3Client
+
+
+@pytest.fixture
+def worker_session(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "worker.db"}')
+    table_registry.metadata.create_all(engine)
+    factory = sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(
+        'image_processing_service.tasks.WorkerSession', factory
+    )
+
+    yield factory
+
+    engine.dispose()
+
+
+@pytest.fixture
+def original_path(tmp_path) -> str:
+    path = tmp_path / 'original.png'
+    PILImage.new('RGB', (40, 30), (200, 100, 50)).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def queued_image(worker_session, original_path, tmp_path) -> Image:
+    with worker_session() as session:
+        user = User(username='worker', password='secret')
+        session.add(user)
+        session.flush()
+        original = Image(
+            filename='original.png', url=original_path, user_id=user.id
+        )
+        session.add(original)
+        session.flush()
+        derived = Image(
+            filename='derived.png',
+            url=str(tmp_path / 'derived.png'),
+            user_id=user.id,
+            original_image_id=original.id,
+            transformation_key='key',
+            status=ImageStatus.QUEUED,
+        )
+        session.add(derived)
+        session.commit()
+        return derived
+
+
+def test_task_records_success(worker_session, queued_image, original_path):
+    apply_transformations_async(
+        original_image_key=original_path,
+        new_image_key=queued_image.url,
+        transformations={'rotate': 90, 'format': 'png'},
+        image_id=queued_image.id,
+    )
+
+    with worker_session() as session:
+        image = session.get(Image, queued_image.id)
+
+    assert image.status == ImageStatus.SUCCEEDED
+    assert image.started_at
+    assert image.finished_at
+    assert image.processing_seconds >= 0
+    assert PILImage.open(image.url).size == (30, 40)
+    assert (image.width, image.height, image.format) == (30, 40, 'png')
+
+
+def test_tasks_accept_argument_names_of_queued_messages(
+    worker_session, queued_image, original_path, tmp_path
+):
+    # Publicadas antes das chaves de storage
+    apply_transformations_async(
+        original_image_path=original_path,
+        new_image_path=str(tmp_path / 'rotated.png'),
+        transformations={'rotate': 90, 'format': 'png'},
+    )
+    generate_renditions_async(
+        original_image_path=original_path,
+        renditions=[
+            {
+                'image_id': queued_image.id,
+                'new_image_path': queued_image.url,
+                'transformations': {
+                    'resize': {'width': 20, 'height': 15},
+                    'format': 'png',
+                },
+            }
+        ],
+    )
+
+    with worker_session() as session:
+        image = session.get(Image, queued_image.id)
+    assert image.status == ImageStatus.SUCCEEDED
+    assert PILImage.open(image.url).size == (20, 15)
+    assert PILImage.open(tmp_path / 'rotated.png').size == (30, 40)
+
+
+def test_task_for_deleted_image_still_runs(
+    worker_session, queued_image, original_path
+):
+    with worker_session() as session:
+        session.delete(session.get(Image, queued_image.id))
+        session.commit()
+
+    apply_transformations_async(
+        original_image_key=original_path,
+        new_image_key=queued_image.url,
+        transformations={'format': 'png'},
+        image_id=queued_image.id,
+    )
+
+    assert PILImage.open(queued_image.url).size == (40, 30)
+
+
+def test_transforms_reuse_decoded_original(
+    monkeypatch: pytest.MonkeyPatch, original_path, tmp_path
+):
+    cache = SizedLRUCache('worker_cache', 10**8, image_nbytes)
+    monkeypatch.setattr(
+        'image_processing_service.tasks.decoded_image_cache', cache
+    )
+
+    for angle in (90, 180):
+        transform_stored_image(
+            original_path,
+            str(tmp_path / f'rotated-{angle}.png'),
+            {'rotate': angle, 'format': 'png'},
+        )
+    assert (cache.stats()['hits'], len(cache)) == (1, 1)
+
+    # Arquivo regravado: outra versão, outra entrada
+    PILImage.new('RGB', (20, 10)).save(original_path)
+    transform_stored_image(
+        original_path, str(tmp_path / 'new.png'), {'format': 'png'}
+    )
+    assert (cache.stats()['misses'], len(cache)) == (2, 2)
+    assert PILImage.open(tmp_path / 'new.png').size == (20, 10)
+
+
+def test_uncached_transform_skips_decoded_cache(
+    monkeypatch: pytest.MonkeyPatch, original_path, tmp_path
+):
+    cache = SizedLRUCache('worker_cache', 10**8, image_nbytes)
+    monkeypatch.setattr(
+        'image_processing_service.tasks.decoded_image_cache', cache
+    )
+
+    for angle in (90, 180):
+        transform_stored_image(
+            original_path,
+            str(tmp_path / f'rotated-{angle}.png'),
+            {'rotate': angle, 'format': 'png'},
+            cached=False,
+        )
+
+    assert len(cache) == 0
+
+
+def test_group_decodes_once_and_records_each_job(
+    monkeypatch: pytest.MonkeyPatch,
+    worker_session,
+    queued_image,
+    original_path,
+    tmp_path,
+):
+    opened = []
+    monkeypatch.setattr(
+        'image_processing_service.tasks.open_original',
+        lambda key, transformations: (
+            opened.append(transformations)
+            or open_original(key, transformations)
+        ),
+    )
+    with worker_session() as session:
+        images = [
+            Image(
+                filename=f'job-{index}.png',
+                url=str(tmp_path / f'job-{index}.png'),
+                user_id=queued_image.user_id,
+                original_image_id=queued_image.original_image_id,
+                status=ImageStatus.QUEUED,
+            )
+            for index in range(3)
+        ]
+        session.add_all(images)
+        session.commit()
+    transformations = [
+        {'resize': {'width': 20, 'height': 15}, 'format': 'png'},
+        {'resize': {'width': 8, 'height': 30}, 'format': 'png'},
+        {'resize': {'width': 10, 'height': 10}, 'format': 'nope'},
+    ]
+
+    transform_group_async(
+        original_image_key=original_path,
+        jobs=[
+            {
+                'image_id': image.id,
+                'new_image_key': image.url,
+                'transformations': options,
+            }
+            for image, options in zip(images, transformations)
+        ],
+    )
+
+    # Uma decodificação, grande o bastante nos dois eixos
+    assert opened == [{'resize': {'width': 20, 'height': 30}}]
+    with worker_session() as session:
+        first, second, broken = (session.get(Image, i.id) for i in images)
+    assert first.status == second.status == ImageStatus.SUCCEEDED
+    assert PILImage.open(second.url).size == (8, 30)
+    assert broken.status == ImageStatus.FAILED
+
+
+def test_task_reads_and_writes_through_s3(
+    monkeypatch: pytest.MonkeyPatch,
+    worker_session,
+    queued_image,
+    original_path,
+):
+    s3_client = FakeS3Client()
+    storage = S3Storage('bucket', client=s3_client)
+    monkeypatch.setattr('image_processing_service.tasks.storage', storage)
+    with open(original_path, 'rb') as original:
+        s3_client.put_object(Bucket='bucket', Key='ab/cd/o.png', Body=original)
+
+    apply_transformations_async(
+        original_image_key='ab/cd/o.png',
+        new_image_key='ef/01/d.png',
+        transformations={'rotate': 90, 'format': 'png'},
+        image_id=queued_image.id,
+    )
+
+    with worker_session() as session:
+        image = session.get(Image, queued_image.id)
+
+    assert image.status == ImageStatus.SUCCEEDED
+    derived = io.BytesIO(s3_client.objects['bucket', 'ef/01/d.png'])
+    assert PILImage.open(derived).size == (30, 40)
+
+
+def test_large_originals_are_processed_in_strips(
+    monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    monkeypatch.setattr(
+        'image_processing_service.tasks.settings.TILED_MIN_PIXELS', 1000
+    )
+    monkeypatch.setattr(
+        'image_processing_service.tasks.settings.TILED_STRIP_PIXELS', 500
+    )
+    original_path = tmp_path / 'original.bmp'
+    PILImage.linear_gradient('L').convert('RGB').save(original_path)
+    png_path = tmp_path / 'original.png'
+    PILImage.new('RGB', (40, 30)).save(png_path)
+
+    # Decodificar a original inteira só é permitido para o PNG
+    decoded = []
+    monkeypatch.setattr(
+        'image_processing_service.tasks.open_original',
+        lambda key, transformations, **kwargs: (
+            decoded.append(key) or open_original(key, transformations)
+        ),
+    )
+    transform_stored_image(
+        str(original_path),
+        str(tmp_path / 'small.png'),
+        {'resize': {'width': 64, 'height': 32}, 'rotate': 90, 'format': 'png'},
+    )
+    transform_stored_image(
+        str(png_path), str(tmp_path / 'copy.png'), {'format': 'png'}
+    )
+
+    assert decoded == [str(png_path)]
+    assert PILImage.open(tmp_path / 'small.png').size == (32, 64)
+
+    # Saída grande demais para ficar inteira em memória: caminho normal
+    monkeypatch.setattr(
+        'image_processing_service.tasks.settings.TILED_MAX_OUTPUT_PIXELS',
+        64 * 32,
+    )
+    transform_stored_image(
+        str(original_path),
+        str(tmp_path / 'gray.png'),
+        {'filters': {'grayscale': True}, 'format': 'png'},
+    )
+    assert decoded == [str(png_path), str(original_path)]
+
+
+def test_task_over_memory_budget_goes_back_to_queue(
+    monkeypatch: pytest.MonkeyPatch,
+    worker_session,
+    queued_image,
+    original_path,
+):
+    budget = MemoryBudget(1000)
+    monkeypatch.setattr('image_processing_service.tasks.memory_budget', budget)
+    monkeypatch.setattr(
+        'image_processing_service.tasks.settings.TRANSFORM_OVERFLOW_QUEUE',
+        'transforms.large',
+    )
+    retries = []
+    monkeypatch.setattr(
+        apply_transformations_async,
+        'retry',
+        lambda **options: retries.append(options) or Retry(),
+    )
+    task_kwargs = {
+        'original_image_key': original_path,
+        'new_image_key': queued_image.url,
+        'transformations': {'rotate': 90, 'format': 'png'},
+        'image_id': queued_image.id,
+    }
+    # Outro task em andamento; este (40x30, ~10KB) não cabe no resto
+    budget.try_reserve(500)
+
+    apply_transformations_async.push_request(id='t1', called_directly=False)
+    try:
+        with pytest.raises(Retry):
+            apply_transformations_async.run(**task_kwargs)
+    finally:
+        apply_transformations_async.pop_request()
+
+    # Com pausa também no overflow: lá o task pode não caber de novo
+    assert retries == [
+        {'countdown': settings.MEMORY_RETRY_DELAY, 'queue': 'transforms.large'}
+    ]
+    with worker_session() as session:
+        assert session.get(Image, queued_image.id).status == ImageStatus.QUEUED
+
+    budget.release(500)
+    apply_transformations_async(**task_kwargs)
+    with worker_session() as session:
+        image = session.get(Image, queued_image.id)
+    assert image.status == ImageStatus.SUCCEEDED
+    assert budget.reserved == 0
+
+
+def test_task_waits_for_budget_after_max_retries(
+    monkeypatch: pytest.MonkeyPatch,
+    worker_session,
+    queued_image,
+    original_path,
+):
+    budget = MemoryBudget(1000)
+    monkeypatch.setattr('image_processing_service.tasks.memory_budget', budget)
+    budget.try_reserve(500)
+    # O outro task termina enquanto este espera
+    threading.Timer(0.2, budget.release, args=(500,)).start()
+
+    apply_transformations_async.push_request(
+        id='t1',
+        called_directly=False,
+        retries=apply_transformations_async.max_retries,
+    )
+    try:
+        apply_transformations_async.run(
+            original_image_key=original_path,
+            new_image_key=queued_image.url,
+            transformations={'rotate': 90, 'format': 'png'},
+            image_id=queued_image.id,
+        )
+    finally:
+        apply_transformations_async.pop_request()
+
+    with worker_session() as session:
+        image = session.get(Image, queued_image.id)
+    assert image.status == ImageStatus.SUCCEEDED
+    assert budget.reserved == 0
+
+
+def test_task_records_failure(worker_session, queued_image, tmp_path):
+    with pytest.raises(ImageSaveError):
+        apply_transformations_async(
+            original_image_key=str(tmp_path / 'missing.png'),
+            new_image_key=queued_image.url,
+            transformations={'format': 'png'},
+            image_id=queued_image.id,
+        )
+
+    with worker_session() as session:
+        image = session.get(Image, queued_image.id)
+
+    assert image.status == ImageStatus.FAILED
+    assert 'missing.png' in image.error
+    assert image.transformation_key is None
+
+
+@pytest.mark.parametrize('tiled', [False, True])
+def test_renditions_record_each_output(
+    monkeypatch: pytest.MonkeyPatch,
+    worker_session,
+    queued_image,
+    tmp_path,
+    tiled,
+):
+    sizes = [(10, 8), (40, 30), (20, 15)]
+    with worker_session() as session:
+        images = [
+            Image(
+                filename=f'rendition-{width}.png',
+                url=str(tmp_path / f'rendition-{width}.png'),
+                user_id=queued_image.user_id,
+                original_image_id=queued_image.original_image_id,
+                status=ImageStatus.QUEUED,
+            )
+            for width, _ in sizes
+        ]
+        session.add_all(images)
+        session.commit()
+
+    original = tmp_path / 'original.png'
+    if tiled:
+        # Em faixas, cada rendition lê a original de novo: nunca inteira
+        monkeypatch.setattr(
+            'image_processing_service.tasks.settings.TILED_MIN_PIXELS', 1000
+        )
+        monkeypatch.setattr(
+            'image_processing_service.tasks.open_original', None
+        )
+        PILImage.open(original).save(tmp_path / 'original.bmp')
+        original = tmp_path / 'original.bmp'
+    generate_renditions_async(
+        original_image_key=str(original),
+        renditions=[
+            {
+                'image_id': image.id,
+                'new_image_key': image.url,
+                'transformations': {
+                    'resize': {'width': width, 'height': height},
+                    'format': 'png',
+                },
+            }
+            for image, (width, height) in zip(images, sizes)
+        ],
+    )
+
+    with worker_session() as session:
+        for image, size in zip(images, sizes):
+            stored = session.get(Image, image.id)
+            assert stored.status == ImageStatus.SUCCEEDED
+            assert PILImage.open(stored.url).size == size